@@ -1,10 +1,39 @@
 import json
+import os
+import tempfile
+import threading
+from contextlib import closing
 from pathlib import Path
 
+from agent_studio.agents.patch_schema import PATCH_SCHEMA, validate_patch
+from agent_studio.agents.stream_json import PatchStreamParser
+
+MAX_PATCH_FILES = 3
+MAX_REPAIRS = 2
+MAX_REPAIR_ECHO = 8000
+OVERWRITE_PREVIEW_CHARS = 800
+DECLINED = "Overwrite declined."
+
+
+def write_atomic(target: Path, content: str):
+    """Write via a temp file in the same directory and os.replace, so readers never see a partial file."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            fh.write(content)
+        os.replace(tmp, target)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
 
 class BuilderAgent:
-    def __init__(self, llm_client):
+    def __init__(self, llm_client, max_repairs: int = MAX_REPAIRS):
         self.llm = llm_client
+        self.max_repairs = max_repairs
+        self._stats_lock = threading.Lock()
+        self.parse_stats = {"requests": 0, "first_try": 0, "repaired": 0, "fallback": 0, "repair_calls": 0}
 
     def propose_patch(
         self,
@@ -14,27 +43,73 @@ class BuilderAgent:
         editable_paths: list[str],
         temperature: float,
         num_ctx: int,
+        cancel=None,
     ) -> dict:
-        prompt = (
+        prompt = self._patch_prompt(brief, plan, editable_paths)
+        # Ollama constrains decoding to the schema, so most replies parse on the first try.
+        result = self.llm.generate_full(
+            model=model, prompt=prompt, temperature=temperature, num_ctx=num_ctx, format=PATCH_SCHEMA, cancel=cancel
+        )
+        return self._parse_or_repair(model, brief, result, editable_paths, num_ctx, cancel)
+
+    def _parse_or_repair(
+        self, model: str, brief: str, result: dict, editable_paths: list[str], num_ctx: int, cancel=None
+    ) -> dict:
+        raw = result.get("response", "")
+        parsed = self._extract_json(raw)
+        errors = validate_patch(parsed, editable_paths, MAX_PATCH_FILES) if parsed is not None else ["Output is not valid JSON."]
+
+        repairs = 0
+        while errors and repairs < self.max_repairs:
+            repairs += 1
+            result = self._repair(model, raw, errors, result.get("context"), num_ctx, cancel)
+            raw = result.get("response", "")
+            parsed = self._extract_json(raw)
+            errors = validate_patch(parsed, editable_paths, MAX_PATCH_FILES) if parsed is not None else ["Output is not valid JSON."]
+
+        outcome = "fallback" if errors else "repaired" if repairs else "first_try"
+        self._count(outcome, repairs)
+        if errors:
+            return self._fallback_patch(brief)
+        return parsed
+
+    def _count(self, outcome: str, repairs: int = 0):
+        with self._stats_lock:
+            self.parse_stats["requests"] += 1
+            self.parse_stats["repair_calls"] += repairs
+            self.parse_stats[outcome] += 1
+
+    def _patch_prompt(self, brief: str, plan: str, editable_paths: list[str]) -> str:
+        return (
             "You are BuilderAgent. Return JSON only. Produce a minimal scoped patch plan.\n"
             "Rules:\n"
             "- Output JSON object with keys: summary, files.\n"
             "- files must be an array of objects: {path, content}.\n"
             "- Only use file paths under these allowed roots: "
             f"{', '.join(editable_paths)}\n"
-            "- Keep files count <= 3.\n"
+            f"- Keep files count <= {MAX_PATCH_FILES}.\n"
             "- Do not include markdown fences.\n\n"
             f"Plan:\n{plan}\n\n"
             f"Brief:\n{brief}\n"
         )
-        raw = self.llm.generate(model=model, prompt=prompt, temperature=temperature, num_ctx=num_ctx)
-        parsed = self._extract_json(raw)
-        if not isinstance(parsed, dict) or "files" not in parsed:
-            return self._fallback_patch(brief)
-        files = parsed.get("files")
-        if not isinstance(files, list):
-            return self._fallback_patch(brief)
-        return parsed
+
+    def _repair(self, model: str, raw: str, errors: list[str], context, num_ctx: int, cancel=None) -> dict:
+        # With the previous generation's context only the error list is sent; the plan and
+        # brief are not prefilled again. Without it the rejected output is quoted instead.
+        problems = "\n".join(f"- {e}" for e in errors[:10])
+        prompt = f"Your JSON was rejected:\n{problems}\nReturn the corrected JSON object only."
+        if not context:
+            prompt = f"This JSON patch plan was rejected:\n{raw[:MAX_REPAIR_ECHO]}\n\nProblems:\n{problems}\nReturn the corrected JSON object only."
+        return self.llm.generate_full(
+            model=model, prompt=prompt, temperature=0.0, num_ctx=num_ctx, format=PATCH_SCHEMA, context=context, cancel=cancel
+        )
+
+    @property
+    def parse_success_rate(self) -> float | None:
+        with self._stats_lock:
+            total = self.parse_stats["requests"]
+            ok = self.parse_stats["first_try"] + self.parse_stats["repaired"]
+        return ok / total if total else None
 
     def _extract_json(self, raw: str):
         cleaned = raw.strip()
@@ -42,13 +117,13 @@ class BuilderAgent:
             cleaned = cleaned.strip("`")
             cleaned = cleaned.replace("json\n", "", 1)
         try:
-            return json.loads(cleaned)
+            return json.loads(cleaned, strict=False)
         except Exception:
             start = cleaned.find("{")
             end = cleaned.rfind("}")
             if start != -1 and end != -1 and end > start:
                 try:
-                    return json.loads(cleaned[start : end + 1])
+                    return json.loads(cleaned[start : end + 1], strict=False)
                 except Exception:
                     return None
             return None
@@ -70,24 +145,154 @@ class BuilderAgent:
         patch_plan: dict,
         editable_roots: list[str],
         max_files: int,
+        confirm_overwrite=None,
     ) -> dict:
+        """Write every file of ``patch_plan``, or none of them.
+
+        ``confirm_overwrite(path, preview)`` is asked before an existing file
+        gets different content; declined files are left alone and listed in
+        ``skipped``. If an entry is rejected, the files already written are restored.
+        """
         files = patch_plan.get("files", [])
         if len(files) > max_files:
-            return {"ok": False, "reason": f"File cap exceeded ({len(files)}>{max_files}).", "changes": []}
+            return {"ok": False, "reason": f"File cap exceeded ({len(files)}>{max_files}).", "changes": [], "skipped": []}
 
         changes = []
+        skipped = []
         for entry in files:
-            rel = str(entry.get("path", "")).replace("\\", "/").strip("/")
-            content = entry.get("content", "")
-            if not rel:
-                return {"ok": False, "reason": "Empty path in patch plan.", "changes": changes}
-            if not any(rel == root or rel.startswith(root + "/") for root in editable_roots):
-                return {"ok": False, "reason": f"Out-of-scope path: {rel}", "changes": changes}
-
-            target = project_root / rel
-            target.parent.mkdir(parents=True, exist_ok=True)
-            old = target.read_text(encoding="utf-8") if target.exists() else ""
-            target.write_text(content, encoding="utf-8")
-            changes.append({"path": rel, "old": old, "new": content})
-
-        return {"ok": True, "reason": "Patch applied", "changes": changes}
+            change, reason = self._apply_entry(project_root, entry, editable_roots, confirm_overwrite)
+            if change is None and reason == DECLINED:
+                skipped.append(str(entry.get("path", "")))
+                continue
+            if change is None:
+                self._undo(project_root, changes)
+                return {"ok": False, "reason": reason, "changes": [], "skipped": skipped}
+            changes.append(change)
+
+        return {"ok": True, "reason": "Patch applied", "changes": changes, "skipped": skipped}
+
+    def _apply_entry(
+        self, project_root: Path, entry: dict, editable_roots: list[str], confirm_overwrite=None
+    ) -> tuple[dict | None, str]:
+        rel = str(entry.get("path", "")).replace("\\", "/").strip("/")
+        content = entry.get("content", "")
+        if not rel:
+            return None, "Empty path in patch plan."
+        if ".." in rel.split("/") or not any(rel == root or rel.startswith(root + "/") for root in editable_roots):
+            return None, f"Out-of-scope path: {rel}"
+        if not isinstance(content, str):
+            return None, f"Content for {rel} is not text."
+
+        target = project_root / rel
+        created = not target.exists()
+        old = "" if created else target.read_text(encoding="utf-8")
+        if not created and old != content and confirm_overwrite and not confirm_overwrite(rel, content[:OVERWRITE_PREVIEW_CHARS]):
+            return None, DECLINED
+        write_atomic(target, content)
+        return {"path": rel, "old": old, "new": content, "created": created}, ""
+
+    @staticmethod
+    def _undo(project_root: Path, changes: list[dict]):
+        """Put back the files a partly applied stream wrote."""
+        for change in reversed(changes):
+            target = project_root / change["path"]
+            if change.get("created"):
+                target.unlink(missing_ok=True)
+            else:
+                write_atomic(target, change["old"])
+
+    def stream_patch(
+        self,
+        model: str,
+        brief: str,
+        plan: str,
+        project_root: Path,
+        editable_roots: list[str],
+        max_files: int,
+        temperature: float,
+        num_ctx: int,
+        on_file=None,
+        stop_flag=None,
+    ) -> dict:
+        """Generate and apply a patch in one pass.
+
+        Tokens are fed to a streaming JSON parser; each entry of ``files`` is
+        validated and written atomically as soon as its object closes, and
+        ``on_file(change)`` lets callers start work on it while the model is
+        still generating the next one. If the stream stops parsing as JSON,
+        the files written so far are restored, the rest of the reply is read
+        and the whole text goes through ``propose_patch``'s repair path. When
+        the build is stopped or rejected part-way, written files are restored too.
+        Returns the ``apply_patch_plan`` result shape plus ``summary``.
+        """
+        parser = PatchStreamParser()
+        raw = []
+        changes = []
+        reason = "Patch applied"
+        ok = True
+        broken = None
+        stream = self.llm.stream_generate(
+            model=model,
+            prompt=self._patch_prompt(brief, plan, editable_roots),
+            temperature=temperature,
+            num_ctx=num_ctx,
+            format=PATCH_SCHEMA,
+            cancel=stop_flag,
+        )
+        try:
+            with closing(stream):
+                for chunk in stream:
+                    if stop_flag and stop_flag():
+                        ok, reason = False, "Stopped."
+                        break
+                    text = chunk.get("response", "")
+                    raw.append(text)
+                    if broken is not None:
+                        continue
+                    try:
+                        entries = parser.feed(text)
+                    except ValueError as exc:
+                        broken = exc
+                        self._undo(project_root, changes)
+                        changes = []
+                        continue
+                    for entry in entries:
+                        if len(changes) >= max_files:
+                            ok, reason = False, f"File cap exceeded (>{max_files})."
+                            break
+                        change, why = self._apply_entry(project_root, entry, editable_roots)
+                        if change is None:
+                            ok, reason = False, why
+                            break
+                        changes.append(change)
+                        if on_file:
+                            on_file(change)
+                    if not ok:
+                        break
+        except Exception:
+            # Stop closes the connection under the read; anything else is a real failure.
+            if not (stop_flag and stop_flag()):
+                self._undo(project_root, changes)
+                raise
+            ok, reason = False, "Stopped."
+        if not ok:
+            # Stopped, over the file cap or a rejected entry: leave no half-applied patch behind.
+            self._undo(project_root, changes)
+            changes = []
+        if ok and broken is None and not parser.complete:
+            # Ran out of text mid-document: the JSON is malformed in a way the scanner could not see.
+            broken = ValueError("Patch JSON ended before the top-level object closed.")
+            self._undo(project_root, changes)
+            changes = []
+        if broken is not None and ok:
+            patch = self._parse_or_repair(model, brief, {"response": "".join(raw)}, editable_roots, num_ctx, cancel=stop_flag)
+            result = self.apply_patch_plan(project_root, patch, editable_roots, max_files)
+            if on_file:
+                for change in result["changes"]:
+                    on_file(change)
+            return {**result, "summary": patch.get("summary", "")}
+        if ok and not changes:
+            ok, reason = False, "Model produced no files."
+        if ok:
+            self._count("first_try")
+        return {"ok": ok, "reason": reason, "changes": changes, "summary": parser.summary or ""}
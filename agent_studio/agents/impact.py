@@ -0,0 +1,126 @@
+import ast
+import json
+import os
+from pathlib import Path
+
+SOURCE_ROOTS = ("src", "tests")
+# Changes to these make every test potentially affected.
+GLOBAL_FILES = {"conftest.py", "pytest.ini", "setup.cfg", "setup.py", "pyproject.toml", "tox.ini", "requirements.txt"}
+
+
+def _is_test_file(rel: str) -> bool:
+    name = rel.rsplit("/", 1)[-1]
+    return rel.startswith("tests/") and name.endswith(".py") and (name.startswith("test_") or name.endswith("_test.py"))
+
+
+def _module_names(rel: str) -> list[str]:
+    """Importable names for a project file: ``src/pkg/a.py`` -> ``pkg.a`` and ``src.pkg.a``."""
+    parts = rel[:-3].split("/")
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+    names = [".".join(parts)] if parts else []
+    if parts and parts[0] in SOURCE_ROOTS and len(parts) > 1:
+        names.append(".".join(parts[1:]))
+    return names
+
+
+def _imports(source: str, rel: str) -> list[str]:
+    try:
+        tree = ast.parse(source, filename=rel)
+    except (SyntaxError, ValueError):
+        return []
+    package = rel[:-3].split("/")[:-1]
+    found = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            found.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                base = package[: len(package) - (node.level - 1)] if node.level > 1 else package
+                module = ".".join(base + ([node.module] if node.module else []))
+            else:
+                module = node.module or ""
+            if module:
+                found.add(module)
+            # "from pkg import mod" may name a submodule
+            found.update(f"{module}.{alias.name}" if module else alias.name for alias in node.names)
+    return sorted(found)
+
+
+class ImpactAnalyzer:
+    """Maps changed project paths to the test files that import them.
+
+    Python files under ``src/``, ``tests/`` and the project root are parsed for
+    imports. The graph is cached in ``.agentstudio/import_graph.json`` and only
+    files whose size or mtime changed are parsed again.
+    """
+
+    def __init__(self, project_dir: Path):
+        self.root = Path(project_dir)
+        self.cache_path = self.root / ".agentstudio" / "import_graph.json"
+
+    def _files(self):
+        for entry in os.scandir(self.root):
+            if entry.is_file() and entry.name.endswith(".py"):
+                yield entry.name, entry
+        for top in SOURCE_ROOTS:
+            base = self.root / top
+            if not base.is_dir():
+                continue
+            for dirpath, dirnames, filenames in os.walk(base):
+                dirnames[:] = [d for d in dirnames if d != "__pycache__" and not d.startswith(".")]
+                for name in filenames:
+                    if name.endswith(".py"):
+                        path = Path(dirpath) / name
+                        yield path.relative_to(self.root).as_posix(), path
+
+    def graph(self) -> dict[str, list[str]]:
+        try:
+            cached = json.loads(self.cache_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            cached = {}
+        files = {}
+        for rel, entry in self._files():
+            stat = os.stat(entry)
+            old = cached.get(rel)
+            if old and old["size"] == stat.st_size and old["mtime_ns"] == stat.st_mtime_ns:
+                files[rel] = old
+                continue
+            source = Path(self.root, rel).read_text(encoding="utf-8", errors="ignore")
+            files[rel] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "imports": _imports(source, rel)}
+        if files != cached:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            self.cache_path.write_text(json.dumps(files), encoding="utf-8")
+        return {rel: info["imports"] for rel, info in files.items()}
+
+    def affected_tests(self, changed_paths) -> list[str] | None:
+        """Test files to run for ``changed_paths``; None means run the full suite."""
+        changed = {str(p).replace("\\", "/").strip("/") for p in changed_paths}
+        for rel in changed:
+            name = rel.rsplit("/", 1)[-1]
+            if name in GLOBAL_FILES:
+                return None
+            if rel.split("/", 1)[0] in SOURCE_ROOTS and not rel.endswith(".py"):
+                return None  # data files are read at runtime and invisible to the import graph
+
+        graph = self.graph()
+        owners = {}
+        for rel in graph:
+            for name in _module_names(rel):
+                owners.setdefault(name, rel)
+        importers: dict[str, set[str]] = {}
+        for rel, imports in graph.items():
+            for name in imports:
+                target = owners.get(name)
+                if target and target != rel:
+                    importers.setdefault(target, set()).add(rel)
+
+        seen = set()
+        stack = [rel for rel in changed if rel.endswith(".py")]
+        while stack:
+            rel = stack.pop()
+            if rel in seen:
+                continue
+            seen.add(rel)
+            stack.extend(importers.get(rel, ()))
+        return sorted(rel for rel in seen if _is_test_file(rel) and (self.root / rel).exists())
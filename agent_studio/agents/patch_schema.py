@@ -0,0 +1,47 @@
+PATCH_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "summary": {"type": "string"},
+        "files": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "path": {"type": "string"},
+                    "content": {"type": "string"},
+                },
+                "required": ["path", "content"],
+            },
+        },
+    },
+    "required": ["summary", "files"],
+}
+
+
+def validate_patch(plan, editable_paths: list[str] | None = None, max_files: int | None = None) -> list[str]:
+    """Return the reasons ``plan`` is not a usable patch plan; an empty list means valid."""
+    if not isinstance(plan, dict):
+        return ["Top level must be a JSON object with keys summary and files."]
+    errors = []
+    if not isinstance(plan.get("summary"), str):
+        errors.append("'summary' must be a string.")
+    files = plan.get("files")
+    if not isinstance(files, list):
+        return errors + ["'files' must be an array of {path, content} objects."]
+    if max_files is not None and len(files) > max_files:
+        errors.append(f"'files' has {len(files)} entries; at most {max_files} are allowed.")
+    roots = [r.replace("\\", "/").strip("/") for r in editable_paths or []]
+    for i, entry in enumerate(files):
+        if not isinstance(entry, dict):
+            errors.append(f"files[{i}] must be an object.")
+            continue
+        path, content = entry.get("path"), entry.get("content")
+        if not isinstance(path, str) or not path.strip():
+            errors.append(f"files[{i}].path must be a non-empty string.")
+        elif roots:
+            rel = path.replace("\\", "/").strip("/")
+            if ".." in rel.split("/") or not any(rel == r or rel.startswith(r + "/") for r in roots):
+                errors.append(f"files[{i}].path '{path}' is outside the allowed roots: {', '.join(roots)}.")
+        if not isinstance(content, str):
+            errors.append(f"files[{i}].content must be a string.")
+    return errors
@@ -1,3 +1,23 @@
+import json
+
+MAX_REVIEW_CHARS = 6000
+REVIEW_FOCUS = {
+    "code": "correctness, error handling and readability",
+    "security": "injection, unsafe file or shell access, secrets and unsafe deserialization",
+    "ux": "user-facing text, layout and accessibility regressions",
+}
+REVIEW_PROMPT = (
+    "You are the {role} reviewer. Review only for {focus}.\n"
+    "Return JSON: {{\"pass\": true|false, \"issues\": [short strings]}}. Fail only for real problems.\n\n"
+    "Changed files:\n{diff}\n"
+)
+REVIEW_SCHEMA = {
+    "type": "object",
+    "properties": {"pass": {"type": "boolean"}, "issues": {"type": "array", "items": {"type": "string"}}},
+    "required": ["pass", "issues"],
+}
+
+
 class ReviewerAgent:
     def review_plan(self, plan: str, locks: dict[str, bool]) -> tuple[bool, str]:
         violations = []
@@ -23,3 +43,34 @@ class ReviewerAgent:
             if ux_files:
                 return False, f"UX lock violation: {', '.join(ux_files)}"
         return True, "Patch review passed."
+
+    async def review_patch_llm(self, changes: list[dict], client, model: str, cancel=None, timeout: float = 180) -> tuple[bool, str]:
+        """Code, security and UX reviews of the patch, run concurrently on an AsyncOllamaClient."""
+        diff = "\n\n".join(f"### {c['path']}\n{c.get('new', '')[:MAX_REVIEW_CHARS]}" for c in changes)
+        prompts = [
+            REVIEW_PROMPT.format(role=role, focus=focus, diff=diff)
+            for role, focus in REVIEW_FOCUS.items()
+        ]
+        results = await client.fan_out(
+            [client.generate(model, prompt, temperature=0.0, format=REVIEW_SCHEMA) for prompt in prompts],
+            cancel=cancel,
+            timeout=timeout,
+        )
+        ok = True
+        lines = []
+        for role, result in zip(REVIEW_FOCUS, results):
+            if isinstance(result, BaseException):
+                ok = False
+                lines.append(f"{role}: review did not finish ({type(result).__name__}).")
+                continue
+            try:
+                verdict = json.loads(result.get("response", ""))
+            except ValueError:
+                ok = False
+                lines.append(f"{role}: unreadable review output.")
+                continue
+            passed = bool(verdict.get("pass"))
+            ok = ok and passed
+            issues = "; ".join(str(i) for i in verdict.get("issues", [])[:5])
+            lines.append(f"{role}: {'pass' if passed else 'fail'}{' - ' + issues if issues else ''}")
+        return ok, "\n".join(lines)
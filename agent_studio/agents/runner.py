@@ -1,33 +1,288 @@
 import json
+import os
+import re
+import signal
 import subprocess
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+DEFAULT_ALLOWLIST_PATH = Path(__file__).resolve().parent.parent / "config" / "allowed_commands.json"
+DEFAULT_TIMEOUT = 600
+MAX_OUTPUT_BYTES = 200_000
+MAX_WORKERS = 3
+# Commands that change the environment run first, one at a time; everything else is independent.
+SETUP_PREFIXES = ("python -m pip install", "pip install", "npm install", "npm ci")
+TEST_MARKERS = ("pytest", "unittest")
+FULL_TEST_COMMAND = "python -m pytest"
+# Targeted pytest runs take plain path arguments only, so they need no approval prompt.
+TARGETED_PYTEST = re.compile(r"python -m pytest( -q)?( [\w./-]+\.py)+")
+
+
+def kill_tree(proc: subprocess.Popen):
+    if proc.poll() is not None:
+        return
+    if os.name == "nt":
+        subprocess.run(["taskkill", "/T", "/F", "/PID", str(proc.pid)], capture_output=True)
+    else:
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            proc.kill()
+    proc.wait()
+
+
+def _wait(proc: subprocess.Popen, timeout: float) -> float | None:
+    """Wait up to ``timeout`` for ``proc`` to exit.
+
+    On POSIX the process is reaped with ``os.wait4`` so its CPU time, which
+    includes the descendants it waited for, is returned; elsewhere None.
+    """
+    if not hasattr(os, "wait4"):
+        try:
+            proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            pass
+        return None
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            pid, status, usage = os.wait4(proc.pid, os.WNOHANG)
+        except ChildProcessError:
+            proc.poll()  # already reaped elsewhere; its CPU time is lost
+            return None
+        if pid:
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            return usage.ru_utime + usage.ru_stime
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(0.02)
+
+
+class _OutputBuffer:
+    """Keeps the head and tail of a command's output within ``limit`` bytes."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.head = []
+        self.head_size = 0
+        self.tail = deque()
+        self.tail_size = 0
+        self.dropped = 0
+
+    def add(self, line: str) -> bool:
+        if self.head_size + len(line) <= self.limit // 2:
+            self.head.append(line)
+            self.head_size += len(line)
+            return True
+        self.tail.append(line)
+        self.tail_size += len(line)
+        while self.tail_size > self.limit // 2:
+            self.tail_size -= len(self.tail.popleft())
+            self.dropped += 1
+        return False
+
+    def text(self) -> str:
+        middle = [f"... [{self.dropped} lines truncated] ...\n"] if self.dropped else []
+        return "".join(self.head + middle + list(self.tail)).strip()
+
 
 class RunnerAgent:
-    def __init__(self, allowlist_path: str):
-        config = json.loads(Path(allowlist_path).read_text(encoding="utf-8"))
+    def __init__(
+        self,
+        allowlist_path: str | Path | None = None,
+        llm=None,
+        max_workers: int = MAX_WORKERS,
+        timeout: float = DEFAULT_TIMEOUT,
+        max_output_bytes: int = MAX_OUTPUT_BYTES,
+    ):
+        config = json.loads(Path(allowlist_path or DEFAULT_ALLOWLIST_PATH).read_text(encoding="utf-8"))
         self.allowed = config.get("allowed_commands", [])
         self.blocked_tokens = [t.lower() for t in config.get("blocked_tokens", [])]
+        self.llm = llm
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_output_bytes = max_output_bytes
+
+    def _rules(self, allowlist: dict | None) -> tuple[list[str], list[str]]:
+        """Allowed commands and blocked tokens, from a per-run ``allowlist`` or the instance defaults."""
+        if not allowlist:
+            return self.allowed, self.blocked_tokens
+        allowed = allowlist.get("allowed_commands", self.allowed)
+        blocked = [t.lower() for t in allowlist.get("blocked_tokens", self.blocked_tokens)]
+        return allowed, blocked
 
-    def _is_blocked(self, cmd: str) -> bool:
+    def _is_blocked(self, cmd: str, blocked_tokens: list[str] | None = None) -> bool:
         lcmd = f" {cmd.lower()} "
-        return any(token in lcmd for token in self.blocked_tokens)
+        return any(token in lcmd for token in (self.blocked_tokens if blocked_tokens is None else blocked_tokens))
 
-    def _is_allowed(self, cmd: str) -> bool:
-        if cmd.strip() == "python -m pytest" and Path("tests").exists():
+    def _is_allowed(self, cmd: str, cwd: Path | None = None, allowed: list[str] | None = None) -> bool:
+        if cmd.strip() == FULL_TEST_COMMAND and Path(cwd or ".", "tests").exists():
+            return True
+        if TARGETED_PYTEST.fullmatch(cmd.strip()):
             return True
         if cmd.strip().startswith("python ") and cmd.strip().endswith(".py"):
             return True
-        return cmd in self.allowed
+        return cmd in (self.allowed if allowed is None else allowed)
+
+    def _check(self, cmd: str, confirm_callback, cwd: Path | None = None, allowlist: dict | None = None) -> str | None:
+        # The allowlist is a per-call argument: jobs for different projects share this runner.
+        allowed, blocked = self._rules(allowlist)
+        if self._is_blocked(cmd, blocked):
+            return "Blocked command detected. Refusing to execute."
+        if not self._is_allowed(cmd, cwd, allowed) and not confirm_callback(cmd):
+            return f"User declined non-allowlisted command: {cmd}"
+        return None
+
+    def execute(self, cmd: str, cwd: Path | None = None, log=None, stop_flag=None, timeout: float | None = None) -> dict:
+        """Run one command in its own process group, streaming lines to ``log``.
+
+        The whole process tree is killed when ``timeout`` passes or ``stop_flag()`` turns true.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        kwargs = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP} if os.name == "nt" else {"start_new_session": True}
+        proc = subprocess.Popen(
+            cmd,
+            shell=True,
+            cwd=cwd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            bufsize=1,
+            **kwargs,
+        )
+        output = _OutputBuffer(self.max_output_bytes)
+
+        def pump():
+            for line in proc.stdout:
+                if output.add(line) and log:
+                    log(f"[{cmd}] {line.rstrip()}")
+            proc.stdout.close()
+
+        reader = threading.Thread(target=pump, daemon=True)
+        reader.start()
+
+        reason = None
+        cpu_seconds = None
+        while proc.returncode is None:
+            if stop_flag and stop_flag():
+                reason = "stopped"
+            elif time.monotonic() - started > timeout:
+                reason = f"timed out after {timeout:g}s"
+            if reason:
+                kill_tree(proc)
+                break
+            cpu_seconds = _wait(proc, 0.2)
+        reader.join(timeout=5)
+
+        text = output.text()
+        if reason:
+            text = f"{text}\n[{reason}]".strip()
+        return {
+            "cmd": cmd,
+            "ok": reason is None and proc.returncode == 0,
+            "returncode": proc.returncode,
+            "output": text,
+            "seconds": round(time.monotonic() - started, 3),
+            "started": started,
+            "cpu_seconds": round(cpu_seconds, 3) if cpu_seconds is not None else None,
+            "killed": reason,
+        }
+
+    def run(
+        self, cmd: str, confirm_callback, cwd: Path | None = None, log=None, stop_flag=None, allowlist: dict | None = None
+    ) -> tuple[bool, str]:
+        refusal = self._check(cmd, confirm_callback, cwd, allowlist)
+        if refusal:
+            return False, refusal
+        result = self.execute(cmd, cwd=cwd, log=log, stop_flag=stop_flag)
+        return result["ok"], result["output"]
+
+    def run_many(
+        self,
+        commands: list[str],
+        confirm_callback,
+        cwd: Path | None = None,
+        log=None,
+        stop_flag=None,
+        allowlist: dict | None = None,
+    ) -> list[dict]:
+        """Run setup commands in order, then the rest concurrently on a bounded pool.
+
+        Approval prompts are asked up front, on the calling thread, before anything starts.
+        Results are returned in ``commands`` order, one per entry, repeated commands included.
+        """
+        results: dict[int, dict] = {}
+        approved = []
+        for i, cmd in enumerate(commands):
+            refusal = self._check(cmd, confirm_callback, cwd, allowlist)
+            if refusal:
+                results[i] = {"cmd": cmd, "ok": False, "returncode": None, "output": refusal, "seconds": 0.0, "killed": None}
+            else:
+                approved.append(i)
+
+        setup = [i for i in approved if commands[i].strip().lower().startswith(SETUP_PREFIXES)]
+        rest = [i for i in approved if i not in setup]
+        for i in setup:
+            if stop_flag and stop_flag():
+                break
+            results[i] = self.execute(commands[i], cwd=cwd, log=log, stop_flag=stop_flag)
+            if not results[i]["ok"]:
+                break
+        if all(results.get(i, {}).get("ok") for i in setup) and rest and not (stop_flag and stop_flag()):
+            with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(rest))), thread_name_prefix="runner") as pool:
+                futures = {i: pool.submit(self.execute, commands[i], cwd, log, stop_flag) for i in rest}
+                for i, future in futures.items():
+                    results[i] = future.result()
+
+        skipped = {"ok": False, "returncode": None, "output": "Skipped.", "seconds": 0.0, "killed": None}
+        return [results.get(i, {"cmd": cmd, **skipped}) for i, cmd in enumerate(commands)]
 
-    def run(self, cmd: str, confirm_callback) -> tuple[bool, str]:
-        if self._is_blocked(cmd):
-            return False, "Blocked command detected. Refusing to execute."
+    def run_project(
+        self,
+        project_dir: Path,
+        plan: dict,
+        allowlist=None,
+        confirm_command=None,
+        log=None,
+        stop_flag=None,
+        test_targets: list[str] | None = None,
+    ) -> dict:
+        """Run the plan's commands (or the test suite) in ``project_dir``.
 
-        if not self._is_allowed(cmd):
-            if not confirm_callback(cmd):
-                return False, f"User declined non-allowlisted command: {cmd}"
+        With ``test_targets`` the full ``python -m pytest`` run is replaced by one
+        limited to those test files; an empty list drops it.
+        """
+        commands = list((plan or {}).get("commands") or [])
+        if not commands and (Path(project_dir) / "tests").exists():
+            commands = [FULL_TEST_COMMAND]
+        if test_targets is not None:
+            targeted = [f"{FULL_TEST_COMMAND} -q {' '.join(test_targets)}"] if test_targets else []
+            commands = [c for c in commands if c.strip() != FULL_TEST_COMMAND]
+            commands += targeted
 
-        proc = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-        output = (proc.stdout or "") + (proc.stderr or "")
-        return proc.returncode == 0, output.strip()
+        results = self.run_many(
+            commands, confirm_command or (lambda _cmd: False), cwd=project_dir, log=log, stop_flag=stop_flag, allowlist=allowlist
+        )
+        tests = [r for r in results if any(marker in r["cmd"] for marker in TEST_MARKERS)]
+        lines = []
+        for r in results:
+            status = "ok" if r["ok"] else (r["killed"] or f"exit {r['returncode']}")
+            lines.append(f"$ {r['cmd']}  [{status}, {r['seconds']}s]\n{r['output']}\n")
+        if not tests and log:
+            log("No test commands ran.")
+        # A project with a tests/ dir passes only if some test command actually ran and passed.
+        has_tests = (Path(project_dir) / "tests").exists()
+        return {
+            "ok": all(r["ok"] for r in results),
+            "test_ok": all(r["ok"] for r in tests) if tests else not has_tests,
+            "tests_ran": len(tests),
+            "log": "\n".join(lines),
+            "results": results,
+        }
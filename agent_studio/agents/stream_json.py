@@ -0,0 +1,90 @@
+import json
+
+
+class PatchStreamParser:
+    """Incremental parser for ``{"summary": ..., "files": [{...}, ...]}`` text.
+
+    ``feed()`` takes generated text as it arrives and returns the entries of
+    the top-level ``files`` array that closed in it. Only the file object
+    currently being generated is buffered; the rest of the document is
+    tracked by a small state machine. Top-level string values are kept, so
+    ``summary`` is available once it has been generated. Raw control
+    characters inside strings are accepted; text that still is not valid JSON
+    raises ``json.JSONDecodeError`` (a ``ValueError``).
+    """
+
+    def __init__(self):
+        self.stack = []
+        self.in_string = False
+        self.escape = False
+        self.expect_key = False
+        self.key = None
+        self.top = {}
+        self._text = None  # raw characters of a top-level string
+        self._capture = None  # raw characters of the file object being generated
+        self.files_seen = 0
+        self._closed = False
+
+    @property
+    def complete(self) -> bool:
+        """True once the top-level object has closed."""
+        return self._closed
+
+    @property
+    def summary(self) -> str | None:
+        return self.top.get("summary")
+
+    def feed(self, text: str) -> list[dict]:
+        done = []
+        for ch in text:
+            if self._capture is not None:
+                self._capture.append(ch)
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                    if self._text is not None:
+                        self._end_top_string(json.loads('"' + "".join(self._text) + '"', strict=False))
+                        self._text = None
+                    continue
+                if self._text is not None:
+                    self._text.append(ch)
+                continue
+
+            if ch == '"':
+                self.in_string = True
+                if len(self.stack) == 1:
+                    self._text = []
+            elif ch in "{[":
+                if ch == "{" and self.stack[-1:] == ["files"] and self._capture is None:
+                    self._capture = ["{"]
+                if ch == "[" and len(self.stack) == 1 and self.key == "files" and not self.expect_key:
+                    self.stack.append("files")
+                else:
+                    self.stack.append(ch)
+                self.expect_key = ch == "{" and len(self.stack) == 1
+            elif ch in "}]":
+                if self.stack:
+                    self.stack.pop()
+                    self._closed = not self.stack
+                if ch == "}" and self._capture is not None and self.stack[-1:] == ["files"]:
+                    entry = json.loads("".join(self._capture), strict=False)
+                    self._capture = None
+                    self.files_seen += 1
+                    done.append(entry)
+            elif len(self.stack) == 1:
+                if ch == ",":
+                    self.expect_key = True
+                elif ch == ":":
+                    self.expect_key = False
+        return done
+
+    def _end_top_string(self, value: str):
+        if self.expect_key:
+            self.key = value
+        elif self.key is not None:
+            self.top[self.key] = value
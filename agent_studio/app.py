@@ -1,13 +1,23 @@
 import json
 import threading
+import time
 from pathlib import Path
 import tkinter as tk
 from tkinter import filedialog, messagebox, simpledialog, ttk
 
-from agent_studio.llm.ollama_client import OllamaClient
+from agent_studio.config.defaults import load_studio_config
+from agent_studio.file_tree import ProjectFileTree
+from agent_studio.llm.async_client import AsyncOllamaClient
+from agent_studio.llm.ollama_client import DEFAULT_BASE_URL, OllamaClient
+from agent_studio.llm.router import ModelRouter
+from agent_studio.log_pipeline import LogPipeline
+from agent_studio.metrics import format_summary
 from agent_studio.orchestrator import StudioOrchestrator
+from agent_studio.scheduler import QUEUED, RUNNING, PipelineScheduler
 from agent_studio.storage.project_store import ProjectStore
 
+JOBS_POLL_MS = 500
+
 
 class AgentStudioApp(tk.Tk):
     def __init__(self):
@@ -15,18 +25,37 @@ class AgentStudioApp(tk.Tk):
         self.title("AI Agent Studio (Local)")
         self.geometry("1100x750")
 
+        self.studio_config = load_studio_config()
         self.store = ProjectStore()
-        self.llm = OllamaClient()
+        self.llm = OllamaClient.from_config(self.studio_config, data_dir=self.store.root)
+        self.router = ModelRouter(self.llm, self.studio_config)
         self.orchestrator = StudioOrchestrator(
-            llm=self.llm,
+            llm=self.router,
             store=self.store,
+            async_llm=AsyncOllamaClient(
+                self.studio_config.get("ollama_url", DEFAULT_BASE_URL),
+                timeout=self.studio_config.get("ollama_pool", {}).get("timeout", 120),
+                limiter=self.llm.limiter,
+            ),
+            chrome_trace=self.studio_config.get("metrics", {}).get("chrome_trace", False),
+            stream_patch=self.studio_config.get("builder", {}).get("stream_patch", False),
+            llm_review=self.studio_config.get("review", {}).get("llm", False),
+        )
+        self.scheduler = PipelineScheduler(
+            self.orchestrator,
+            workers=self.studio_config.get("scheduler", {}).get("workers", 2),
         )
 
         self.current_project = tk.StringVar(value="")
         self.status_var = tk.StringVar(value="Idle")
 
+        self._job_status = {}
+
         self._build_ui()
         self._refresh_projects()
+        self._poll_jobs()
+        threading.Thread(target=self.router.warm_pinned, name="model-warmup", daemon=True).start()
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
 
     def _build_ui(self):
         top = ttk.Frame(self)
@@ -70,6 +99,8 @@ class AgentStudioApp(tk.Tk):
         runbar.pack(fill="x")
         ttk.Button(runbar, text="Run Pipeline", command=self.run_pipeline).pack(side="left")
         ttk.Button(runbar, text="Stop", command=self.stop_run).pack(side="left", padx=6)
+        self.full_suite_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(runbar, text="Full test suite", variable=self.full_suite_var).pack(side="left", padx=6)
 
         # Right: log + files
         tabs = ttk.Notebook(right)
@@ -77,9 +108,13 @@ class AgentStudioApp(tk.Tk):
 
         log_tab = ttk.Frame(tabs)
         files_tab = ttk.Frame(tabs)
+        jobs_tab = ttk.Frame(tabs)
+        history_tab = ttk.Frame(tabs)
 
         tabs.add(log_tab, text="Live Log")
         tabs.add(files_tab, text="Project Files")
+        tabs.add(jobs_tab, text="Jobs")
+        tabs.add(history_tab, text="History")
 
         self.log_text = tk.Text(log_tab, state="disabled")
         self.log_text.pack(fill="both", expand=True, padx=6, pady=6)
@@ -89,14 +124,67 @@ class AgentStudioApp(tk.Tk):
         ttk.Button(files_top, text="Refresh Files", command=self._refresh_project_files).pack(side="left")
         ttk.Button(files_top, text="Open File", command=self.open_selected_file).pack(side="left", padx=6)
 
-        self.files_list = tk.Listbox(files_tab)
-        self.files_list.pack(fill="both", expand=True, padx=6, pady=(0, 6))
-
-    def _append_log(self, line: str):
-        self.log_text.configure(state="normal")
-        self.log_text.insert("end", line.rstrip() + "\n")
-        self.log_text.see("end")
-        self.log_text.configure(state="disabled")
+        self.file_tree = ProjectFileTree(files_tab)
+        ttk.Checkbutton(
+            files_top, text="Show runs and tool files", variable=self.file_tree.show_hidden, command=self.file_tree.redraw
+        ).pack(side="left", padx=6)
+        self.file_tree.tree.pack(fill="both", expand=True, padx=6, pady=(0, 6))
+        self.file_tree.tree.bind("<Double-1>", lambda e: self.open_selected_file())
+
+        jobs_top = ttk.Frame(jobs_tab)
+        jobs_top.pack(fill="x", padx=6, pady=6)
+        ttk.Button(jobs_top, text="Cancel Job", command=self.cancel_selected_job).pack(side="left")
+        ttk.Button(jobs_top, text="Cancel All", command=self.scheduler.cancel_all).pack(side="left", padx=6)
+        self.llm_stats_var = tk.StringVar(value="")
+        ttk.Label(jobs_top, textvariable=self.llm_stats_var).pack(side="right")
+
+        columns = ("project", "status", "queued", "started", "duration", "message")
+        self.jobs_tree = ttk.Treeview(jobs_tab, columns=columns, show="headings", selectmode="browse")
+        for col, width in zip(columns, (140, 80, 80, 80, 80, 360)):
+            self.jobs_tree.heading(col, text=col.title())
+            self.jobs_tree.column(col, width=width, anchor="w", stretch=col == "message")
+        self.jobs_tree.pack(fill="both", expand=True, padx=6, pady=(0, 6))
+
+        history_top = ttk.Frame(history_tab)
+        history_top.pack(fill="x", padx=6, pady=6)
+        self.history_project_only = tk.BooleanVar(value=True)
+        self.history_status = tk.StringVar(value="")
+        self.history_gate = tk.StringVar(value="")
+        self.history_text = tk.StringVar(value="")
+        ttk.Checkbutton(history_top, text="This project", variable=self.history_project_only).pack(side="left")
+        ttk.Label(history_top, text="Status").pack(side="left", padx=(10, 4))
+        ttk.Combobox(
+            history_top, textvariable=self.history_status, width=10, state="readonly",
+            values=("", "ok", "failed", "cancelled", "error", "running"),
+        ).pack(side="left")
+        ttk.Label(history_top, text="Failed gate").pack(side="left", padx=(10, 4))
+        ttk.Combobox(
+            history_top, textvariable=self.history_gate, width=5, state="readonly", values=("", "G1", "G2", "G3", "G4")
+        ).pack(side="left")
+        ttk.Label(history_top, text="Log search").pack(side="left", padx=(10, 4))
+        search = ttk.Entry(history_top, textvariable=self.history_text, width=24)
+        search.pack(side="left")
+        search.bind("<Return>", lambda e: self.refresh_history())
+        ttk.Button(history_top, text="Search", command=self.refresh_history).pack(side="left", padx=6)
+
+        columns = ("project", "status", "started", "duration", "model", "tokens", "failed", "message")
+        self.history_tree = ttk.Treeview(history_tab, columns=columns, show="headings", selectmode="browse")
+        for col, width in zip(columns, (120, 70, 120, 70, 110, 70, 70, 300)):
+            self.history_tree.heading(col, text=col.title())
+            self.history_tree.column(col, width=width, anchor="w", stretch=col == "message")
+        self.history_tree.pack(fill="both", expand=True, padx=6, pady=(0, 6))
+        self.history_tree.bind("<Double-1>", lambda e: self.open_selected_run())
+        self.history_tree.bind("<<TreeviewSelect>>", lambda e: self._show_run_details())
+
+        ttk.Label(history_tab, text="Gates and metrics").pack(anchor="w", padx=6)
+        self.run_details = tk.Text(history_tab, height=12, state="disabled")
+        self.run_details.pack(fill="x", padx=6, pady=(0, 6))
+
+        self.log_sink = LogPipeline(self, self.log_text, log_path=self.store.root / "studio.log")
+
+    def _append_log(self, line: str, path: Path | None = None):
+        # Safe from any thread: the pipeline batches lines onto the widget from the Tk loop.
+        self.log_sink.write(line, path)
 
     def _refresh_projects(self):
         projects = self.store.list_projects()
@@ -121,7 +209,9 @@ class AgentStudioApp(tk.Tk):
         self.plan_text.insert("1.0", plan)
 
         self._append_log(f"Loaded project: {project}")
-        self._refresh_project_files()
+        root = self.store.project_path(project)
+        self.file_tree.set_root(root if root.exists() else None)
+        self.refresh_history()
 
     def new_project(self):
         name = simpledialog.askstring("New Project", "Project name:")
@@ -149,38 +239,72 @@ class AgentStudioApp(tk.Tk):
             messagebox.showerror("Open folder failed", str(e))
 
     def _refresh_project_files(self):
-        self.files_list.delete(0, "end")
-        project = self.current_project.get().strip()
-        if not project:
-            return
-        root = self.store.project_path(project)
-        if not root.exists():
-            return
-
-        files = []
-        for p in root.rglob("*"):
-            if p.is_file():
-                rel = p.relative_to(root)
-                files.append(str(rel))
-        files.sort()
-        for f in files:
-            self.files_list.insert("end", f)
+        # The index watches expanded folders itself; this forces a re-list of all of them.
+        self.file_tree.refresh()
 
     def open_selected_file(self):
-        project = self.current_project.get().strip()
-        if not project:
-            return
-        sel = self.files_list.curselection()
-        if not sel:
+        path = self.file_tree.selected_path()
+        if path is None or path.is_dir():
             return
-        rel = self.files_list.get(sel[0])
-        path = self.store.project_path(project) / rel
         try:
             import os
             os.startfile(str(path))
         except Exception as e:
             messagebox.showerror("Open file failed", str(e))
 
+    def refresh_history(self):
+        project = self.current_project.get().strip()
+        runs = self.store.ledger.query(
+            project=project if self.history_project_only.get() else None,
+            status=self.history_status.get() or None,
+            failed_gate=self.history_gate.get() or None,
+            text=self.history_text.get().strip() or None,
+        )
+        self.history_tree.delete(*self.history_tree.get_children())
+        for run in runs:
+            failed = ",".join(gate for gate, g in sorted(run["gates"].items()) if not g["pass"])
+            values = (
+                run["project"],
+                run["status"],
+                time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(run["started"])),
+                f"{run['duration']:.1f}s" if run["duration"] is not None else "",
+                run["model"] or "",
+                run["eval_tokens"] or "",
+                failed,
+                run["message"],
+            )
+            self.history_tree.insert("", "end", iid=run["run_id"], values=values)
+
+    def _show_run_details(self):
+        sel = self.history_tree.selection()
+        run = self.store.ledger.get(sel[0]) if sel else None
+        lines = []
+        if run is not None:
+            for gate, g in sorted(run["gates"].items()):
+                lines.append(f"{gate} {'PASS' if g['pass'] else 'FAIL'}: {g['reason']}")
+            metrics_path = Path(run["run_dir"]) / "metrics.json"
+            try:
+                summary = json.loads(metrics_path.read_text(encoding="utf-8"))["summary"]
+                lines.append("")
+                lines.append(format_summary(summary))
+            except (OSError, ValueError, KeyError):
+                lines.append("No metrics recorded for this run.")
+        self.run_details.configure(state="normal")
+        self.run_details.delete("1.0", "end")
+        self.run_details.insert("1.0", "\n".join(lines))
+        self.run_details.configure(state="disabled")
+
+    def open_selected_run(self):
+        sel = self.history_tree.selection()
+        run = self.store.ledger.get(sel[0]) if sel else None
+        if run is None:
+            return
+        try:
+            import os
+            os.startfile(run["run_dir"])
+        except Exception as e:
+            messagebox.showerror("Open run failed", str(e))
+
     def save_brief(self):
         project = self.current_project.get().strip()
         if not project:
@@ -215,10 +339,63 @@ class AgentStudioApp(tk.Tk):
             messagebox.showerror("Plan generation failed", str(exc))
 
     def stop_run(self):
-        self.orchestrator.stop()
-        self.status_var.set("Stopped")
+        project = self.current_project.get().strip()
+        if project:
+            self.scheduler.cancel_project(project)
+        else:
+            self.scheduler.cancel_all()
         self._append_log("Stop requested.")
 
+    def cancel_selected_job(self):
+        sel = self.jobs_tree.selection()
+        if sel and self.scheduler.cancel(int(sel[0])):
+            self._append_log(f"Cancel requested for job #{sel[0]}.")
+
+    def _poll_jobs(self):
+        def clock(ts):
+            return time.strftime("%H:%M:%S", time.localtime(ts)) if ts else ""
+
+        jobs = self.scheduler.jobs()
+        seen = set()
+        for job in jobs:
+            iid = str(job.id)
+            seen.add(iid)
+            if self._job_status.get(job.id) != job.status:
+                self._job_status[job.id] = job.status
+                if job.status not in (QUEUED, RUNNING):
+                    self._append_log(f"Job #{job.id} ({job.project}) {job.status}. {job.message}".strip())
+                    if job.project == self.current_project.get().strip():
+                        self._refresh_project_files()
+                    self.refresh_history()
+            duration = f"{job.duration:.1f}s" if job.duration is not None else ""
+            values = (job.project, job.status, clock(job.submitted), clock(job.started), duration, job.message)
+            if self.jobs_tree.exists(iid):
+                self.jobs_tree.item(iid, values=values)
+            else:
+                self.jobs_tree.insert("", 0, iid=iid, values=values)
+        for iid in set(self.jobs_tree.get_children()) - seen:
+            self.jobs_tree.delete(iid)
+            self._job_status.pop(int(iid), None)
+
+        running = sum(1 for job in jobs if job.status == RUNNING)
+        queued = sum(1 for job in jobs if job.status == QUEUED)
+        self.status_var.set(f"Running: {running}, queued: {queued}" if running or queued else "Idle")
+        llm = self.llm.limiter.stats()
+        speeds = ", ".join(
+            f"{model} {info['tokens_per_second']} tok/s" for model, info in self.router.stats().items() if info["tokens_per_second"]
+        )
+        self.llm_stats_var.set(
+            f"LLM calls in flight: {llm['in_flight']}/{llm['max_concurrent'] or '∞'}, waiting: {llm['waiting']}"
+            + (f" | {speeds}" if speeds else "")
+        )
+        self.after(JOBS_POLL_MS, self._poll_jobs)
+
+    def _on_close(self):
+        self.scheduler.shutdown()
+        self.file_tree.close()
+        self.log_sink.close()
+        self.destroy()
+
     # --- Thread-safe UI confirmation helper (fixes Tkinter thread issues) ---
     def _ui_ask(self, fn):
         done = threading.Event()
@@ -268,37 +445,16 @@ class AgentStudioApp(tk.Tk):
             messagebox.showwarning("Missing plan", "Generate a plan first.")
             return
 
-        self.status_var.set("Running")
-        self._append_log("Running pipeline...")
-
-        def worker():
-            try:
-                result = self.orchestrator.run(
-                    project=project,
-                    plan=plan,
-                    confirm_overwrite=self._confirm_overwrite,
-                    confirm_command=self._confirm_command,
-                    log=self._append_log,
-                )
-                ok = result.get("ok", False)
-                msg = result.get("message", "")
-                if ok:
-                    self._append_log("Pipeline completed successfully.")
-                    if msg:
-                        self._append_log(msg)
-                    self.status_var.set("Idle")
-                else:
-                    self._append_log("Pipeline failed.")
-                    if msg:
-                        self._append_log(msg)
-                    self.status_var.set("Error")
-                self._refresh_project_files()
-            except Exception as exc:
-                self.status_var.set("Error")
-                self._append_log(f"Pipeline error: {exc}")
-
-        t = threading.Thread(target=worker, daemon=True)
-        t.start()
+        project_log = self.store.project_path(project) / ".agentstudio" / "logs" / "live.log"
+        job = self.scheduler.submit(
+            project,
+            plan,
+            confirm_overwrite=self._confirm_overwrite,
+            confirm_command=self._confirm_command,
+            log=lambda line, project=project, path=project_log: self._append_log(f"[{project}] {line}", path),
+            full_suite=self.full_suite_var.get(),
+        )
+        self._append_log(f"Queued pipeline job #{job.id} for {project}.")
 
 
 def main():
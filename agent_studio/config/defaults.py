@@ -0,0 +1,14 @@
+import json
+from pathlib import Path
+
+CONFIG_DIR = Path(__file__).resolve().parent
+
+DEFAULT_ALLOWLIST = json.loads((CONFIG_DIR / "allowed_commands.json").read_text(encoding="utf-8"))
+
+
+def load_studio_config() -> dict:
+    path = CONFIG_DIR / "studio_config.json"
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
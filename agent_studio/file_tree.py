@@ -0,0 +1,159 @@
+import queue
+from pathlib import Path
+import tkinter as tk
+from tkinter import ttk
+
+from agent_studio.storage.dir_index import DirectoryIndex
+
+POLL_MS = 100
+MAX_CHILDREN = 2000
+_STUB = "::stub::"
+_MORE = "::more::"
+
+
+def _format_size(size: int | None) -> str:
+    if size is None:
+        return ""
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+class ProjectFileTree:
+    """Lazily expanded ``ttk.Treeview`` of a project, fed by a :class:`DirectoryIndex`.
+
+    A directory is listed the first time it is expanded, off the Tk thread,
+    and re-listed when the index's watcher sees it change. Listings reach the
+    widget through a queue drained every ``poll_ms``. Run artifacts and tool
+    directories (``runs/``, ``attachments/``, ``.agentstudio/``, ...) are hidden
+    unless ``show_hidden`` is ticked. Indexes are kept per project, so
+    switching back to a project reuses its cached listings.
+    """
+
+    def __init__(self, parent, poll_ms: int = POLL_MS, max_children: int = MAX_CHILDREN):
+        self.poll_ms = poll_ms
+        self.max_children = max_children
+        self.show_hidden = tk.BooleanVar(value=False)
+        self.tree = ttk.Treeview(parent, columns=("size",), selectmode="browse")
+        self.tree.heading("#0", text="Name", anchor="w")
+        self.tree.heading("size", text="Size", anchor="w")
+        self.tree.column("size", width=90, stretch=False, anchor="e")
+        self.tree.bind("<<TreeviewOpen>>", self._on_open)
+        self.tree.bind("<<TreeviewClose>>", self._on_close)
+        self.index = None
+        self._indexes = {}
+        self._open = set()
+        self._updates = queue.SimpleQueue()
+        self.tree.after(self.poll_ms, self._drain)
+
+    def set_root(self, root: Path | None):
+        """Show ``root``; the previous project's watcher is paused but its cache kept."""
+        if self.index is not None:
+            self.index.stop()
+        self.tree.delete(*self.tree.get_children())
+        self._open = set()
+        if root is None:
+            self.index = None
+            return
+        root = Path(root)
+        self.index = self._indexes.get(root)
+        if self.index is None:
+            self.index = self._indexes[root] = DirectoryIndex(root)
+        index = self.index
+        index.start(lambda rel, entries: self._updates.put((index, rel, entries)))
+        self._show(index, "", index.cached(""))
+        index.request("")
+
+    def refresh(self):
+        if self.index is not None:
+            self.index.refresh()
+
+    def redraw(self):
+        """Re-apply the hidden-files filter to what is already listed."""
+        if self.index is not None:
+            self._show(self.index, "", self.index.cached(""))
+
+    def selected_path(self) -> Path | None:
+        sel = self.tree.selection()
+        if not sel or self.index is None or sel[0].startswith((_STUB, _MORE)):
+            return None
+        return self.index.root / sel[0]
+
+    def close(self):
+        for index in self._indexes.values():
+            index.stop()
+
+    def _on_open(self, _event=None):
+        rel = self.tree.focus()
+        if not rel or self.index is None:
+            return
+        self._open.add(rel)
+        cached = self.index.cached(rel)
+        if cached is not None:
+            self._show(self.index, rel, cached)
+        self.index.request(rel)
+
+    def _on_close(self, _event=None):
+        rel = self.tree.focus()
+        if rel and self.index is not None:
+            self._open.discard(rel)
+            self.index.forget(rel)
+            self._open = {r for r in self._open if not r.startswith(rel + "/")}
+
+    def _drain(self):
+        while True:
+            try:
+                index, rel, entries = self._updates.get_nowait()
+            except queue.Empty:
+                break
+            if index is self.index:
+                self._show(index, rel, entries)
+        self.tree.after(self.poll_ms, self._drain)
+
+    def _show(self, index: DirectoryIndex, rel: str, entries: list[dict] | None):
+        tree = self.tree
+        if rel and not tree.exists(rel):
+            return
+        if entries is None:
+            if rel:
+                tree.delete(rel)
+                self._open.discard(rel)
+            return
+        if rel and rel not in self._open:
+            return  # collapsed meanwhile; the stub stays until it is expanded again
+
+        if not self.show_hidden.get():
+            entries = [e for e in entries if not index.is_hidden(e)]
+        shown = entries[: self.max_children]
+        wanted = [e["path"] for e in shown]
+        current = list(tree.get_children(rel))
+        keep = set(wanted)
+        stale = [iid for iid in current if iid not in keep]
+        if stale:
+            tree.delete(*stale)
+        for pos, entry in enumerate(shown):
+            iid = entry["path"]
+            if tree.exists(iid):
+                tree.item(iid, values=(_format_size(entry["size"]),))
+                tree.move(iid, rel, pos)
+                continue
+            tree.insert(
+                rel,
+                pos,
+                iid=iid,
+                text=entry["name"] + ("/" if entry["is_dir"] else ""),
+                values=(_format_size(entry["size"]),),
+                open=False,
+            )
+            if entry["is_dir"]:
+                tree.insert(iid, "end", iid=_STUB + iid, text="…")
+        if len(entries) > len(shown):
+            tree.insert(rel, "end", iid=_MORE + rel, text=f"… {len(entries) - len(shown)} more not shown")
+
+        for entry in shown:
+            if entry["is_dir"] and entry["path"] in self._open:
+                tree.item(entry["path"], open=True)
+                cached = index.cached(entry["path"])
+                if cached is not None:
+                    self._show(index, entry["path"], cached)
@@ -0,0 +1,240 @@
+import asyncio
+import contextlib
+import json
+import time
+from urllib.parse import urlsplit
+
+from agent_studio.llm.cache import current_run
+from agent_studio.llm.limiter import LLMLimiter
+from agent_studio.llm.ollama_client import DEFAULT_BASE_URL
+from agent_studio.metrics import current_metrics, llm_args
+
+CANCEL_POLL_SECONDS = 0.05
+
+
+class OllamaError(Exception):
+    pass
+
+
+class AsyncOllamaClient:
+    """asyncio client for Ollama built on ``asyncio.open_connection``.
+
+    Each call owns its connection, so cancelling the task (Stop, a deadline,
+    a sibling failing in :meth:`fan_out`) closes the socket and Ollama stops
+    generating right away. ``timeout`` is a per-call deadline for the whole
+    request; ``max_concurrent`` bounds calls in flight on this client.
+    Generations also take a slot from ``limiter`` when one is given, so they
+    count against the same budget as the synchronous client that owns it.
+    """
+
+    def __init__(
+        self,
+        base_url: str = DEFAULT_BASE_URL,
+        timeout: float = 120,
+        max_concurrent: int | None = None,
+        limiter: LLMLimiter | None = None,
+    ):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 80
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_concurrent = max_concurrent
+        self.limiter = limiter
+        self._slots = None
+
+    def _semaphore(self):
+        # Created lazily: asyncio primitives belong to the loop that first uses them.
+        if self.max_concurrent and self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+        return self._slots
+
+    async def _open(self, method: str, path: str, payload: dict | None):
+        body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        head = (
+            f"{method} {path} HTTP/1.1\r\n"
+            f"Host: {self.host}:{self.port}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n"
+        )
+        try:
+            writer.write(head.encode("ascii") + body)
+            await writer.drain()
+
+            status_line = await reader.readline()
+            parts = status_line.decode("latin-1").split(" ", 2)
+            if len(parts) < 2 or not parts[1].isdigit():
+                raise OllamaError(f"Bad response from Ollama: {status_line!r}")
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+        except BaseException:
+            writer.close()
+            raise
+        return reader, writer, int(parts[1]), headers
+
+    async def _body(self, reader, headers):
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                size = int((await reader.readline()).split(b";")[0].strip() or b"0", 16)
+                if size == 0:
+                    await reader.readline()
+                    return
+                yield await reader.readexactly(size)
+                await reader.readexactly(2)
+        elif "content-length" in headers:
+            yield await reader.readexactly(int(headers["content-length"]))
+        else:
+            while chunk := await reader.read(65536):
+                yield chunk
+
+    async def _lines(self, method: str, path: str, payload: dict | None):
+        reader, writer, status, headers = await self._open(method, path, payload)
+        try:
+            if status >= 400:
+                detail = b"".join([chunk async for chunk in self._body(reader, headers)])
+                raise OllamaError(f"Ollama returned {status}: {detail[:200].decode('utf-8', 'replace')}")
+            pending = b""
+            async for chunk in self._body(reader, headers):
+                pending += chunk
+                *lines, pending = pending.split(b"\n")
+                for line in lines:
+                    if line.strip():
+                        yield json.loads(line)
+            if pending.strip():
+                yield json.loads(pending)
+        finally:
+            writer.close()
+
+    async def _call(self, method: str, path: str, payload: dict | None, timeout: float | None) -> dict:
+        async def run():
+            lines = self._lines(method, path, payload)
+            try:
+                async for item in lines:
+                    return item
+                raise OllamaError("Empty response from Ollama.")
+            finally:
+                await lines.aclose()
+
+        slots = self._semaphore()
+        if slots is None:
+            return await asyncio.wait_for(run(), self.timeout if timeout is None else timeout)
+        async with slots:
+            return await asyncio.wait_for(run(), self.timeout if timeout is None else timeout)
+
+    async def generate(
+        self,
+        model: str,
+        prompt: str,
+        temperature: float = 0.2,
+        num_ctx: int = 4096,
+        format: str | dict | None = None,
+        keep_alive: str | None = None,
+        timeout: float | None = None,
+    ) -> dict:
+        payload = {"model": model, "prompt": prompt, "stream": False, "options": {"temperature": temperature, "num_ctx": num_ctx}}
+        if format is not None:
+            payload["format"] = format
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        async with contextlib.AsyncExitStack() as stack:
+            if self.limiter is not None:
+                await stack.enter_async_context(self.limiter.async_slot())
+            started = time.monotonic()
+            result = await self._call("POST", "/api/generate", payload, timeout)
+        result["latency"] = time.monotonic() - started
+        run = current_run()
+        if run is not None:
+            run.count_tokens(result)
+        metrics = current_metrics()
+        if metrics is not None:
+            metrics.add("async_generate", "llm", started, result["latency"], model=model, **llm_args(result))
+        return result
+
+    async def stream_generate(
+        self,
+        model: str,
+        prompt: str,
+        temperature: float = 0.2,
+        num_ctx: int = 4096,
+        format: str | dict | None = None,
+        keep_alive: str | None = None,
+        timeout: float | None = None,
+    ):
+        """Yield NDJSON chunks; ``timeout`` bounds the whole stream, not each chunk."""
+        payload = {"model": model, "prompt": prompt, "stream": True, "options": {"temperature": temperature, "num_ctx": num_ctx}}
+        if format is not None:
+            payload["format"] = format
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        async with contextlib.AsyncExitStack() as stack:
+            if self.limiter is not None:
+                await stack.enter_async_context(self.limiter.async_slot())
+            deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+            lines = self._lines("POST", "/api/generate", payload)
+            stack.push_async_callback(lines.aclose)
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                try:
+                    chunk = await asyncio.wait_for(lines.__anext__(), remaining)
+                except StopAsyncIteration:
+                    return
+                yield chunk
+                if chunk.get("done"):
+                    return
+
+    async def embeddings(self, model: str, prompt: str, timeout: float | None = None) -> list[float]:
+        result = await self._call("POST", "/api/embeddings", {"model": model, "prompt": prompt}, timeout)
+        return result.get("embedding", [])
+
+    async def check_connection(self, timeout: float = 5) -> tuple[bool, str]:
+        try:
+            await self._call("GET", "/api/tags", None, timeout)
+            return True, "Ollama is reachable."
+        except Exception as exc:
+            return False, f"Cannot reach Ollama at {self.base_url}: {exc!r}"
+
+    async def fan_out(self, calls, cancel=None, timeout: float | None = None) -> list:
+        """Run coroutines concurrently, gather-style; exceptions are returned in place.
+
+        When ``cancel()`` turns true (a CancelToken) or ``timeout`` passes, the
+        unfinished calls are cancelled and their connections closed.
+        """
+        tasks = [asyncio.ensure_future(call) for call in calls]
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            while not all(task.done() for task in tasks):
+                if cancel is not None and cancel():
+                    break
+                if deadline is not None and time.monotonic() >= deadline:
+                    break
+                await asyncio.wait(tasks, timeout=CANCEL_POLL_SECONDS, return_when=asyncio.ALL_COMPLETED)
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        return list(results)
+
+
+def run_sync(coro, cancel=None):
+    """Run ``coro`` to completion from a worker thread, cancelling it when ``cancel()`` turns true."""
+
+    async def main():
+        task = asyncio.ensure_future(coro)
+        while not task.done():
+            if cancel is not None and cancel():
+                task.cancel()
+                break
+            await asyncio.wait([task], timeout=CANCEL_POLL_SECONDS)
+        return await task
+
+    return asyncio.run(main())
@@ -0,0 +1,201 @@
+import contextvars
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# Relative cache paths are resolved against the studio data directory (ProjectStore.root).
+DEFAULT_PATH = Path("llm_cache.sqlite3")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Response fields that describe one particular call rather than the answer.
+VOLATILE_FIELDS = ("latency", "created_at", "stage", "cached")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    result TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS llm_responses_last_used ON llm_responses(last_used);
+"""
+
+
+class CacheRun:
+    """Counters for one pipeline run bound with :func:`use_cache`: cache hits/misses and tokens generated."""
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.eval_tokens = 0
+        self.prompt_tokens = 0
+        self._lock = threading.Lock()
+
+    def count_tokens(self, result: dict):
+        if result.get("cached"):
+            return
+        with self._lock:
+            self.eval_tokens += result.get("eval_count", 0)
+            self.prompt_tokens += result.get("prompt_eval_count", 0)
+
+    def summary(self) -> str:
+        return f"LLM cache: {self.hits} hits, {self.misses} misses, {self.bypassed} bypassed."
+
+
+_current_run = contextvars.ContextVar("llm_cache_run", default=None)
+
+
+@contextmanager
+def use_cache(cache):
+    """Route the calls made in this context (one pipeline run) through ``cache`` and count them."""
+    run = CacheRun(cache)
+    token = _current_run.set(run)
+    try:
+        yield run
+    finally:
+        _current_run.reset(token)
+
+
+def current_run() -> CacheRun | None:
+    return _current_run.get()
+
+
+class LLMCache:
+    """Content-addressed, size-bounded LRU cache of non-streaming generate responses.
+
+    The key is a SHA-256 of the canonical request payload (model, prompt,
+    options, format, ...). Sampling with ``temperature > 0`` is not
+    reproducible, so those calls bypass the cache unless
+    ``allow_nondeterministic`` is set; the pipeline's plan and patch stages
+    run at temperature 0 so their calls can hit. Continuations (``context``)
+    and streams are never cached. Least recently used rows go once the stored results pass
+    ``max_bytes``.
+    """
+
+    def __init__(
+        self,
+        path: Path = DEFAULT_PATH,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        allow_nondeterministic: bool = False,
+        scope: str = "global",
+    ):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.allow_nondeterministic = allow_nondeterministic
+        self.scope = scope
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._db = None
+        self._children: dict[Path, "LLMCache"] = {}
+
+    @classmethod
+    def from_config(cls, config: dict, data_dir: Path | None = None) -> "LLMCache | None":
+        """Cache from ``config["llm_cache"]``; a relative ``path`` is taken relative to ``data_dir``."""
+        settings = config.get("llm_cache", {})
+        if not settings.get("enabled", True):
+            return None
+        path = Path(settings.get("path", DEFAULT_PATH))
+        if data_dir is not None and not path.is_absolute():
+            path = Path(data_dir) / path
+        return cls(
+            path=path.resolve(),
+            max_bytes=int(settings.get("max_mb", DEFAULT_MAX_BYTES // (1024 * 1024)) * 1024 * 1024),
+            allow_nondeterministic=settings.get("allow_nondeterministic", False),
+            scope=settings.get("scope", "global"),
+        )
+
+    def for_directory(self, directory: Path) -> "LLMCache":
+        """Same settings, stored in ``directory`` (used for per-project caches).
+
+        One instance, and so one SQLite connection, is kept per directory and
+        reused by every run of that project.
+        """
+        path = (Path(directory) / "llm_cache.sqlite3").resolve()
+        with self._lock:
+            child = self._children.get(path)
+            if child is None:
+                child = self._children[path] = LLMCache(path, self.max_bytes, self.allow_nondeterministic, self.scope)
+            return child
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.path), check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+            self._db = db
+        return self._db
+
+    def key(self, payload: dict) -> str | None:
+        """Cache key for a request payload, or None when the call must bypass the cache."""
+        temperature = payload.get("options", {}).get("temperature", 0)
+        if payload.get("stream") or payload.get("context") or (temperature and not self.allow_nondeterministic):
+            return None
+        canonical = {k: v for k, v in payload.items() if k != "keep_alive"}
+        raw = json.dumps(canonical, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            db = self._conn()
+            row = db.execute("SELECT result FROM llm_responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE llm_responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            db.commit()
+        return json.loads(row[0])
+
+    def put(self, key: str, model: str, result: dict):
+        stored = {k: v for k, v in result.items() if k not in VOLATILE_FIELDS and k != "context"}
+        blob = json.dumps(stored, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            db = self._conn()
+            db.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, model, result, size, created, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, blob, len(blob), now, now),
+            )
+            self._evict(db)
+            db.commit()
+
+    def _evict(self, db: sqlite3.Connection):
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        removed = []
+        for key, size in db.execute("SELECT key, size FROM llm_responses ORDER BY last_used ASC"):
+            if total <= self.max_bytes:
+                break
+            removed.append((key,))
+            total -= size
+        db.executemany("DELETE FROM llm_responses WHERE key = ?", removed)
+        self.evictions += len(removed)
+
+    def record(self, outcome: str, run: CacheRun | None = None):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+        if run is not None:
+            setattr(run, outcome, getattr(run, outcome) + 1)
+
+    def stats(self) -> dict:
+        with self._lock:
+            db = self._conn()
+            entries, size = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses").fetchone()
+            return {
+                "entries": entries,
+                "bytes": size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "evictions": self.evictions,
+            }
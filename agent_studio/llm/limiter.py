@@ -0,0 +1,75 @@
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager
+
+ASYNC_POLL_SECONDS = 0.01
+
+
+class LLMLimiter:
+    """Caps concurrent generation requests to the single local Ollama instance.
+
+    Used as a context manager around each model call, or through
+    :meth:`async_slot` from coroutines, so threads and event loops share one
+    budget. ``max_concurrent=None`` leaves calls unlimited but still counts them.
+    """
+
+    def __init__(self, max_concurrent: int | None = 1):
+        self.max_concurrent = max_concurrent
+        self._slots = threading.BoundedSemaphore(max_concurrent) if max_concurrent else None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.waiting = 0
+        self.calls = 0
+        self.wait_seconds = 0.0
+
+    def __enter__(self):
+        started = time.monotonic()
+        with self._lock:
+            self.waiting += 1
+        if self._slots is not None:
+            self._slots.acquire()
+        self._admitted(started)
+        return self
+
+    def _admitted(self, started: float):
+        with self._lock:
+            self.waiting -= 1
+            self.in_flight += 1
+            self.calls += 1
+            self.wait_seconds += time.monotonic() - started
+
+    def __exit__(self, *exc):
+        with self._lock:
+            self.in_flight -= 1
+        if self._slots is not None:
+            self._slots.release()
+
+    @asynccontextmanager
+    async def async_slot(self):
+        """The same slot as ``with limiter:``, awaited without blocking the event loop."""
+        started = time.monotonic()
+        with self._lock:
+            self.waiting += 1
+        try:
+            while self._slots is not None and not self._slots.acquire(blocking=False):
+                await asyncio.sleep(ASYNC_POLL_SECONDS)
+        except BaseException:
+            with self._lock:
+                self.waiting -= 1
+            raise
+        self._admitted(started)
+        try:
+            yield self
+        finally:
+            self.__exit__(None, None, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                "calls": self.calls,
+                "wait_seconds": round(self.wait_seconds, 3),
+            }
@@ -1,26 +1,49 @@
 import json
-from urllib import error, request
+import time
+from pathlib import Path
+from urllib import error
+
+from agent_studio.llm.cache import LLMCache, current_run
+from agent_studio.llm.limiter import LLMLimiter
+from agent_studio.llm.transport import HTTPConnectionPool
+from agent_studio.metrics import current_metrics, llm_args, span
+
+DEFAULT_BASE_URL = "http://127.0.0.1:11434"
 
 
 class OllamaClient:
-    def __init__(self, base_url: str):
+    def __init__(
+        self,
+        base_url: str = DEFAULT_BASE_URL,
+        pool_size: int = 4,
+        timeout: float = 120,
+        retries: int = 2,
+        backoff: float = 0.5,
+        limiter: LLMLimiter | None = None,
+        cache: LLMCache | None = None,
+    ):
         self.base_url = base_url.rstrip("/")
+        self.pool = HTTPConnectionPool(self.base_url, pool_size=pool_size, timeout=timeout, retries=retries, backoff=backoff)
+        self.limiter = limiter or LLMLimiter(None)
+        self.cache = cache
+
+    @classmethod
+    def from_config(cls, config: dict, data_dir: Path | None = None) -> "OllamaClient":
+        pool = config.get("ollama_pool", {})
+        limit = config.get("scheduler", {}).get("max_concurrent_llm", 1)
+        return cls(
+            config.get("ollama_url", DEFAULT_BASE_URL),
+            limiter=LLMLimiter(limit),
+            cache=LLMCache.from_config(config, data_dir),
+            **pool,
+        )
 
     def _post_json(self, path: str, payload: dict) -> dict:
         data = json.dumps(payload).encode("utf-8")
-        req = request.Request(
-            f"{self.base_url}{path}",
-            data=data,
-            headers={"Content-Type": "application/json"},
-            method="POST",
-        )
-        with request.urlopen(req, timeout=120) as resp:
-            return json.loads(resp.read().decode("utf-8"))
+        return json.loads(self.pool.request("POST", path, body=data).decode("utf-8"))
 
     def _get_json(self, path: str) -> dict:
-        req = request.Request(f"{self.base_url}{path}", method="GET")
-        with request.urlopen(req, timeout=15) as resp:
-            return json.loads(resp.read().decode("utf-8"))
+        return json.loads(self.pool.request("GET", path, timeout=15).decode("utf-8"))
 
     def check_connection(self) -> tuple[bool, str]:
         try:
@@ -39,7 +62,23 @@ class OllamaClient:
         except error.URLError as exc:
             return False, f"Ollama unavailable: {exc}"
 
-    def generate(self, model: str, prompt: str, temperature: float = 0.2, num_ctx: int = 4096) -> str:
+    def generate_full(
+        self,
+        model: str,
+        prompt: str,
+        temperature: float = 0.2,
+        num_ctx: int = 4096,
+        keep_alive: str | None = None,
+        format: str | dict | None = None,
+        context: list[int] | None = None,
+        cancel=None,
+    ) -> dict:
+        """Non-streaming /api/generate; returns Ollama's full response, timings and token counts included.
+
+        ``format`` is ``"json"`` or a JSON schema for structured output. ``context`` continues a
+        previous generation without re-sending its prompt. ``cancel`` (a CancelToken) closes the
+        connection when it fires, so Stop ends the generation at once.
+        """
         payload = {
             "model": model,
             "prompt": prompt,
@@ -49,5 +88,106 @@ class OllamaClient:
                 "num_ctx": num_ctx,
             },
         }
-        result = self._post_json("/api/generate", payload)
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        if format is not None:
+            payload["format"] = format
+        if context:
+            payload["context"] = context
+
+        with span("generate", "llm", model=model) as args:
+            run = current_run()
+            cache = run.cache if run is not None else self.cache
+            key = cache.key(payload) if cache is not None else None
+            if cache is not None:
+                cached = cache.get(key) if key else None
+                cache.record("bypassed" if key is None else "hits" if cached else "misses", run)
+                if cached is not None:
+                    args["cached"] = True
+                    return {**cached, "latency": 0.0, "cached": True}
+
+            body = json.dumps(payload).encode("utf-8")
+            queued = time.monotonic()
+            with self.limiter:
+                started = time.monotonic()
+                raw = self.pool.request("POST", "/api/generate", body=body, cancel=cancel)
+            result = json.loads(raw.decode("utf-8"))
+            result["latency"] = time.monotonic() - started
+            args.update(
+                llm_args(result),
+                queued_seconds=round(started - queued, 6),
+                bytes_sent=len(body),
+                bytes_received=len(raw),
+            )
+            if key:
+                cache.put(key, model, result)
+            if run is not None:
+                run.count_tokens(result)
+            return result
+
+    def generate(
+        self,
+        model: str,
+        prompt: str,
+        temperature: float = 0.2,
+        num_ctx: int = 4096,
+        keep_alive: str | None = None,
+        format: str | dict | None = None,
+        cancel=None,
+    ) -> str:
+        result = self.generate_full(
+            model, prompt, temperature=temperature, num_ctx=num_ctx, keep_alive=keep_alive, format=format, cancel=cancel
+        )
         return result.get("response", "").strip()
+
+    def stream_generate(
+        self,
+        model: str,
+        prompt: str,
+        temperature: float = 0.2,
+        num_ctx: int = 4096,
+        keep_alive: str | None = None,
+        format: str | dict | None = None,
+        cancel=None,
+    ):
+        """Streaming /api/generate: yields each NDJSON chunk; the last one has ``done`` and the timings."""
+        payload = {
+            "model": model,
+            "prompt": prompt,
+            "stream": True,
+            "options": {
+                "temperature": temperature,
+                "num_ctx": num_ctx,
+            },
+        }
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        if format is not None:
+            payload["format"] = format
+        body = json.dumps(payload).encode("utf-8")
+        received = 0
+        with self.limiter:
+            started = time.monotonic()
+            for line in self.pool.stream("POST", "/api/generate", body=body, cancel=cancel):
+                received += len(line)
+                chunk = json.loads(line.decode("utf-8"))
+                if chunk.get("done"):
+                    chunk["latency"] = time.monotonic() - started
+                    run = current_run()
+                    if run is not None:
+                        run.count_tokens(chunk)
+                    metrics = current_metrics()
+                    if metrics is not None:
+                        metrics.add(
+                            "stream_generate", "llm", started, chunk["latency"],
+                            model=model, bytes_sent=len(body), bytes_received=received, **llm_args(chunk),
+                        )
+                yield chunk
+
+    def load(self, model: str, keep_alive: str) -> None:
+        """Load ``model`` and keep it resident for ``keep_alive`` (a prompt-less generate)."""
+        self._post_json("/api/generate", {"model": model, "keep_alive": keep_alive})
+
+    def list_models(self) -> list[str]:
+        tags = self._get_json("/api/tags")
+        return [m.get("name", "") for m in tags.get("models", [])]
@@ -0,0 +1,180 @@
+import threading
+import time
+
+DEFAULT_KEEP_ALIVE = "5m"
+TAGS_TTL = 60.0
+
+
+class ModelStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.latency = 0.0
+        self.eval_tokens = 0
+        self.eval_seconds = 0.0
+        self.prompt_tokens = 0
+
+    @property
+    def tokens_per_second(self) -> float | None:
+        return self.eval_tokens / self.eval_seconds if self.eval_seconds else None
+
+    def as_dict(self) -> dict:
+        tps = self.tokens_per_second
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_latency": round(self.latency / self.calls, 3) if self.calls else None,
+            "tokens_per_second": round(tps, 2) if tps else None,
+            "eval_tokens": self.eval_tokens,
+            "prompt_tokens": self.prompt_tokens,
+        }
+
+
+class ModelRouter:
+    """Routes pipeline stages to models configured in ``studio_config.json``.
+
+    ``routing.stages`` maps a stage (plan, patch, review, summary) to a model
+    name or to a list of candidates. For a list, the fastest candidate by
+    measured tokens/sec is used; unmeasured candidates are tried first.
+    Models in ``routing.pinned`` get their own ``keep_alive`` so they stay
+    loaded between runs; everything else uses ``routing.keep_alive``. Routed
+    models that are not installed fall back to the model the caller asked for.
+    """
+
+    def __init__(self, client, config: dict):
+        routing = config.get("routing", {})
+        self.client = client
+        self.default_model = config.get("default_model")
+        self.stages = routing.get("stages", {})
+        self.keep_alive = routing.get("keep_alive", DEFAULT_KEEP_ALIVE)
+        self.pinned = routing.get("pinned", {})
+        self._lock = threading.Lock()
+        self._stats: dict[str, ModelStats] = {}
+        self._installed: set[str] | None = None
+        self._installed_at = 0.0
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def _installed_models(self) -> set[str] | None:
+        now = time.monotonic()
+        if self._installed is None or now - self._installed_at > TAGS_TTL:
+            try:
+                self._installed = set(self.client.list_models())
+            except Exception:
+                self._installed = None
+            self._installed_at = now
+        return self._installed
+
+    def model_for(self, stage: str, requested: str | None = None) -> str:
+        return self.configured_model(stage) or requested or self.default_model
+
+    def configured_model(self, stage: str) -> str | None:
+        """The installed model routed to ``stage``, or None when routing names none (no fallback)."""
+        route = self.stages.get(stage)
+        candidates = [route] if isinstance(route, str) else list(route or [])
+        installed = self._installed_models()
+        if installed is not None:
+            candidates = [m for m in candidates if m in installed]
+        if len(candidates) > 1:
+            with self._lock:
+                unmeasured = [m for m in candidates if m not in self._stats or not self._stats[m].tokens_per_second]
+                if unmeasured:
+                    candidates = unmeasured
+                else:
+                    candidates = [max(candidates, key=lambda m: self._stats[m].tokens_per_second)]
+        return candidates[0] if candidates else None
+
+    def keep_alive_for(self, model: str) -> str:
+        return self.pinned.get(model, self.keep_alive)
+
+    def _record(self, model: str, result: dict | None):
+        with self._lock:
+            stats = self._stats.setdefault(model, ModelStats())
+            stats.calls += 1
+            if result is None:
+                stats.errors += 1
+                return
+            if result.get("cached"):
+                return
+            stats.latency += result.get("latency", 0.0)
+            stats.eval_tokens += result.get("eval_count", 0)
+            stats.eval_seconds += result.get("eval_duration", 0) / 1e9
+            stats.prompt_tokens += result.get("prompt_eval_count", 0)
+
+    def generate_full(
+        self,
+        stage: str,
+        prompt: str,
+        model: str | None = None,
+        temperature: float = 0.2,
+        num_ctx: int = 4096,
+        **request,
+    ) -> dict:
+        routed = self.model_for(stage, model)
+        try:
+            result = self.client.generate_full(
+                routed, prompt, temperature=temperature, num_ctx=num_ctx, keep_alive=self.keep_alive_for(routed), **request
+            )
+        except Exception:
+            self._record(routed, None)
+            raise
+        self._record(routed, result)
+        result["stage"] = stage
+        return result
+
+    def generate(
+        self, stage: str, prompt: str, model: str | None = None, temperature: float = 0.2, num_ctx: int = 4096, **request
+    ) -> str:
+        result = self.generate_full(stage, prompt, model=model, temperature=temperature, num_ctx=num_ctx, **request)
+        return result.get("response", "").strip()
+
+    def stream_generate(
+        self, stage: str, prompt: str, model: str | None = None, temperature: float = 0.2, num_ctx: int = 4096, **request
+    ):
+        routed = self.model_for(stage, model)
+        try:
+            for chunk in self.client.stream_generate(
+                routed, prompt, temperature=temperature, num_ctx=num_ctx, keep_alive=self.keep_alive_for(routed), **request
+            ):
+                if chunk.get("done"):
+                    self._record(routed, chunk)
+                yield chunk
+        except Exception:
+            self._record(routed, None)
+            raise
+
+    def warm_pinned(self):
+        for model, keep_alive in self.pinned.items():
+            try:
+                self.client.load(model, keep_alive)
+            except Exception:
+                pass  # best effort; the first routed call loads it instead
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {model: stats.as_dict() for model, stats in self._stats.items()}
+
+    def for_stage(self, stage: str) -> "StageClient":
+        return StageClient(self, stage)
+
+
+class StageClient:
+    """OllamaClient-shaped view of a router stage, so agents keep calling ``generate(model=..., prompt=...)``."""
+
+    def __init__(self, router: ModelRouter, stage: str):
+        self.router = router
+        self.stage = stage
+
+    def __getattr__(self, name):
+        return getattr(self.router.client, name)
+
+    def generate_full(self, model: str, prompt: str, temperature: float = 0.2, num_ctx: int = 4096, keep_alive=None, **request) -> dict:
+        # keep_alive is the router's call; format/context pass through
+        return self.router.generate_full(self.stage, prompt, model=model, temperature=temperature, num_ctx=num_ctx, **request)
+
+    def generate(self, model: str, prompt: str, temperature: float = 0.2, num_ctx: int = 4096, keep_alive=None, **request) -> str:
+        return self.router.generate(self.stage, prompt, model=model, temperature=temperature, num_ctx=num_ctx, **request)
+
+    def stream_generate(self, model: str, prompt: str, temperature: float = 0.2, num_ctx: int = 4096, keep_alive=None, **request):
+        return self.router.stream_generate(self.stage, prompt, model=model, temperature=temperature, num_ctx=num_ctx, **request)
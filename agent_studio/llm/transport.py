@@ -0,0 +1,186 @@
+import http.client
+import queue
+import socket
+import threading
+import time
+from urllib import error
+from urllib.parse import urlsplit
+
+
+class RequestCancelled(error.URLError):
+    """The caller's cancel token fired while the request was in flight."""
+
+
+def _watch(conn, cancel):
+    """Shut the connection's socket down when ``cancel`` fires, waking a blocked read."""
+    register = getattr(cancel, "add_callback", None)
+    if register is None:
+        return lambda: None
+
+    def abort():
+        sock = conn.sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    return register(abort)
+
+
+class HTTPConnectionPool:
+    """Bounded pool of keep-alive connections to a single host.
+
+    At most ``pool_size`` requests are in flight at once; extra callers wait
+    for a free connection. Connection-level failures (refused, reset, stale
+    keep-alive) are retried with exponential backoff. Errors are raised as
+    ``urllib.error`` types so callers written against ``urlopen`` keep working.
+    A ``cancel`` token (see ``CancelToken``) aborts the request in flight with
+    :class:`RequestCancelled`.
+    """
+
+    def __init__(self, base_url: str, pool_size: int = 4, timeout: float = 120, retries: int = 2, backoff: float = 0.5):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme or "http"
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or (443 if self.scheme == "https" else 80)
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.headers = {"Content-Type": "application/json", "Connection": "keep-alive"}
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+
+    def _new_connection(self, timeout: float):
+        cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        return cls(self.host, self.port, timeout=timeout)
+
+    def _checkout(self, timeout: float):
+        self._slots.acquire()
+        try:
+            conn = self._idle.get_nowait()
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            return conn
+        except queue.Empty:
+            return self._new_connection(timeout)
+
+    def _checkin(self, conn, reusable: bool):
+        if reusable:
+            self._idle.put(conn)
+        else:
+            conn.close()
+        self._slots.release()
+
+    def request(
+        self, method: str, path: str, body: bytes | None = None, timeout: float | None = None, cancel=None
+    ) -> bytes:
+        timeout = self.timeout if timeout is None else timeout
+        url = f"{self.scheme}://{self.host}:{self.port}{path}"
+        attempt = 0
+        while True:
+            if cancel is not None and cancel():
+                raise RequestCancelled("Request cancelled.")
+            conn = self._checkout(timeout)
+            unwatch = _watch(conn, cancel)
+            try:
+                conn.request(method, path, body=body, headers=self.headers)
+                if cancel is not None and cancel():
+                    raise RequestCancelled("Request cancelled.")
+                resp = conn.getresponse()
+                data = resp.read()
+                if cancel is not None and cancel():
+                    raise RequestCancelled("Request cancelled.")
+            except RequestCancelled:
+                self._checkin(conn, reusable=False)
+                raise
+            except (ConnectionError, http.client.RemoteDisconnected, http.client.BadStatusLine) as exc:
+                self._checkin(conn, reusable=False)
+                if cancel is not None and cancel():
+                    raise RequestCancelled("Request cancelled.") from exc
+                if attempt >= self.retries:
+                    raise error.URLError(exc) from exc
+                time.sleep(self.backoff * (2**attempt))
+                attempt += 1
+                continue
+            except (socket.timeout, OSError, http.client.HTTPException) as exc:
+                self._checkin(conn, reusable=False)
+                if cancel is not None and cancel():
+                    raise RequestCancelled("Request cancelled.") from exc
+                raise error.URLError(exc) from exc
+            finally:
+                unwatch()
+
+            self._checkin(conn, reusable=not resp.will_close)
+            if resp.status >= 400:
+                raise error.HTTPError(url, resp.status, resp.reason, resp.headers, None)
+            return data
+
+    def stream(self, method: str, path: str, body: bytes | None = None, timeout: float | None = None, cancel=None):
+        """Yield the response body line by line (NDJSON) while it arrives.
+
+        Retries only cover failures before the response starts. Closing the
+        generator early drops the connection instead of returning it to the pool.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        url = f"{self.scheme}://{self.host}:{self.port}{path}"
+        attempt = 0
+        while True:
+            if cancel is not None and cancel():
+                raise RequestCancelled("Request cancelled.")
+            conn = self._checkout(timeout)
+            unwatch = _watch(conn, cancel)
+            try:
+                conn.request(method, path, body=body, headers=self.headers)
+                if cancel is not None and cancel():
+                    raise RequestCancelled("Request cancelled.")
+                resp = conn.getresponse()
+                break
+            except RequestCancelled:
+                unwatch()
+                self._checkin(conn, reusable=False)
+                raise
+            except (ConnectionError, http.client.RemoteDisconnected, http.client.BadStatusLine) as exc:
+                unwatch()
+                self._checkin(conn, reusable=False)
+                if cancel is not None and cancel():
+                    raise RequestCancelled("Request cancelled.") from exc
+                if attempt >= self.retries:
+                    raise error.URLError(exc) from exc
+                time.sleep(self.backoff * (2**attempt))
+                attempt += 1
+            except (socket.timeout, OSError, http.client.HTTPException) as exc:
+                unwatch()
+                self._checkin(conn, reusable=False)
+                if cancel is not None and cancel():
+                    raise RequestCancelled("Request cancelled.") from exc
+                raise error.URLError(exc) from exc
+
+        finished = False
+        try:
+            if resp.status >= 400:
+                resp.read()
+                raise error.HTTPError(url, resp.status, resp.reason, resp.headers, None)
+            try:
+                for line in resp:
+                    if line.strip():
+                        yield line
+            except (socket.timeout, OSError, http.client.HTTPException) as exc:
+                if cancel is not None and cancel():
+                    raise RequestCancelled("Request cancelled.") from exc
+                raise error.URLError(exc) from exc
+            # A shut-down socket can also read as a clean end of stream.
+            if cancel is not None and cancel():
+                raise RequestCancelled("Request cancelled.")
+            finished = True
+        finally:
+            unwatch()
+            self._checkin(conn, reusable=finished and not resp.will_close)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
@@ -0,0 +1,125 @@
+import queue
+import threading
+import time
+from pathlib import Path
+
+FRAME_MS = 50
+MAX_WIDGET_LINES = 5000
+_CLOSE = object()
+
+
+class LogFileWriter:
+    """Background thread appending log lines to files, flushed once per batch."""
+
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+        self._files = {}
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, path: Path, text: str):
+        self._queue.put((Path(path), text))
+
+    def close(self, timeout: float = 2.0):
+        self._queue.put(_CLOSE)
+        self._thread.join(timeout)
+
+    def _handle(self, path: Path):
+        fh = self._files.get(path)
+        if fh is None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fh = self._files[path] = path.open("a", encoding="utf-8")
+        return fh
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            closing = False
+            touched = set()
+            for item in batch:
+                if item is _CLOSE:
+                    closing = True
+                    continue
+                path, text = item
+                try:
+                    self._handle(path).write(text)
+                    touched.add(path)
+                except OSError:
+                    pass  # the on-screen log still has the line
+            for path in touched:
+                self._files[path].flush()
+            if closing:
+                for fh in self._files.values():
+                    fh.close()
+                return
+
+
+class LogPipeline:
+    """Thread-safe sink feeding a Tk ``Text`` widget and log files.
+
+    ``write()`` may be called from any thread; it only enqueues. The Tk main
+    loop drains the queue every ``frame_ms`` and inserts the whole batch with
+    one insert. The widget keeps at most ``max_lines`` lines, and when a burst
+    is larger than that only its tail is shown. Every line also goes to
+    ``log_path`` (and to an optional per-call ``path``) on a writer thread, so
+    the full log is on disk whatever the widget shows.
+    """
+
+    def __init__(self, root, widget, log_path: Path | None = None, frame_ms: int = FRAME_MS, max_lines: int = MAX_WIDGET_LINES):
+        self.root = root
+        self.widget = widget
+        self.log_path = Path(log_path) if log_path else None
+        self.frame_ms = frame_ms
+        self.max_lines = max_lines
+        self.skipped = 0
+        self._queue = queue.SimpleQueue()
+        self._files = LogFileWriter()
+        self._closed = False
+        self.root.after(self.frame_ms, self._drain)
+
+    def write(self, line: str, path: Path | None = None):
+        line = line.rstrip()
+        self._queue.put(line)
+        stamped = f"{time.strftime('%H:%M:%S')} {line}\n"
+        if self.log_path is not None:
+            self._files.write(self.log_path, stamped)
+        if path is not None:
+            self._files.write(path, stamped)
+
+    def _drain(self):
+        if self._closed:
+            return
+        lines = []
+        while True:
+            try:
+                lines.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if lines:
+            if len(lines) > self.max_lines:
+                dropped = len(lines) - self.max_lines
+                self.skipped += dropped
+                lines = [f"... {dropped} lines not shown (full log on disk) ..."] + lines[-self.max_lines :]
+            self._insert(lines)
+        self.root.after(self.frame_ms, self._drain)
+
+    def _insert(self, lines: list[str]):
+        widget = self.widget
+        follow = widget.yview()[1] >= 0.999
+        widget.configure(state="normal")
+        widget.insert("end", "\n".join(lines) + "\n")
+        excess = int(widget.index("end-1c").split(".")[0]) - 1 - self.max_lines
+        if excess > 0:
+            widget.delete("1.0", f"{excess + 1}.0")
+        widget.configure(state="disabled")
+        if follow:
+            widget.see("end")
+
+    def close(self):
+        self._closed = True
+        self._files.close()
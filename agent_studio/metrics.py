@@ -0,0 +1,202 @@
+import contextvars
+import json
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+PROC_IO = Path("/proc/self/io")
+
+
+def _process_io() -> tuple[int, int] | None:
+    """Bytes this process has read and written so far (Linux only; files, pipes and sockets)."""
+    try:
+        fields = dict(line.split(": ") for line in PROC_IO.read_text().splitlines())
+        return int(fields["rchar"]), int(fields["wchar"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def llm_args(result: dict) -> dict:
+    """Span arguments from an Ollama response: token counts and tokens/sec from ``eval_count``/``eval_duration``."""
+    eval_tokens = result.get("eval_count", 0)
+    eval_seconds = result.get("eval_duration", 0) / 1e9
+    return {
+        "prompt_tokens": result.get("prompt_eval_count", 0),
+        "eval_tokens": eval_tokens,
+        "eval_seconds": round(eval_seconds, 6),
+        "load_seconds": round(result.get("load_duration", 0) / 1e9, 6),
+        "tokens_per_second": round(eval_tokens / eval_seconds, 2) if eval_seconds else None,
+        "cached": bool(result.get("cached")),
+    }
+
+
+class RunMetrics:
+    """Timed spans for one pipeline run.
+
+    ``cat`` groups spans: ``stage`` for the top-level pipeline stages, ``step``
+    for work nested inside a stage, ``llm`` for Ollama calls and ``command``
+    for subprocesses. Stage spans also record the bytes the process read and
+    wrote meanwhile, where the platform reports it. The result is saved as
+    ``metrics.json`` and, optionally, as a Chrome trace (``chrome://tracing``,
+    Perfetto).
+    """
+
+    def __init__(self):
+        self.origin = time.monotonic()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, cat: str = "stage", **args):
+        """Time the block; the yielded dict can be updated with more arguments."""
+        io_before = _process_io() if cat in ("stage", "step") else None
+        started = time.monotonic()
+        try:
+            yield args
+        finally:
+            seconds = time.monotonic() - started
+            io_after = _process_io() if io_before else None
+            if io_before and io_after:
+                args["bytes_read"] = io_after[0] - io_before[0]
+                args["bytes_written"] = io_after[1] - io_before[1]
+            self.add(name, cat, started, seconds, **args)
+
+    def add(self, name: str, cat: str, started: float, seconds: float, **args):
+        """Record a span that was timed elsewhere; ``started`` is a ``time.monotonic()`` value."""
+        span = {
+            "name": name,
+            "cat": cat,
+            "start": round(started - self.origin, 6),
+            "seconds": round(seconds, 6),
+            "thread": threading.current_thread().name,
+            "args": args,
+        }
+        with self._lock:
+            self.spans.append(span)
+
+    def _of(self, cat: str) -> list[dict]:
+        with self._lock:
+            return [s for s in self.spans if s["cat"] == cat]
+
+    def stage_seconds(self) -> dict[str, float]:
+        out = {}
+        for s in self._of("stage"):
+            out[s["name"]] = round(out.get(s["name"], 0.0) + s["seconds"], 3)
+        return out
+
+    def summary(self) -> dict:
+        stages = {}
+        for s in sorted(self._of("stage") + self._of("step"), key=lambda s: s["start"]):
+            entry = stages.setdefault(
+                s["name"], {"seconds": 0.0, "bytes_read": 0, "bytes_written": 0, "step": s["cat"] == "step"}
+            )
+            entry["seconds"] = round(entry["seconds"] + s["seconds"], 3)
+            entry["bytes_read"] += s["args"].get("bytes_read", 0)
+            entry["bytes_written"] += s["args"].get("bytes_written", 0)
+
+        models = {}
+        for s in self._of("llm"):
+            args = s["args"]
+            m = models.setdefault(args.get("model", "?"), {
+                "calls": 0, "cached": 0, "seconds": 0.0, "prompt_tokens": 0, "eval_tokens": 0,
+                "eval_seconds": 0.0, "bytes_sent": 0, "bytes_received": 0,
+            })
+            m["calls"] += 1
+            m["cached"] += int(args.get("cached", False))
+            m["seconds"] = round(m["seconds"] + s["seconds"], 3)
+            for key in ("prompt_tokens", "eval_tokens", "bytes_sent", "bytes_received"):
+                m[key] += args.get(key, 0)
+            m["eval_seconds"] = round(m["eval_seconds"] + args.get("eval_seconds", 0.0), 3)
+        for m in models.values():
+            m["tokens_per_second"] = round(m["eval_tokens"] / m["eval_seconds"], 2) if m["eval_seconds"] else None
+
+        commands = [
+            {
+                "cmd": s["name"],
+                "seconds": round(s["seconds"], 3),
+                "cpu_seconds": s["args"].get("cpu_seconds"),
+                "returncode": s["args"].get("returncode"),
+            }
+            for s in self._of("command")
+        ]
+        with self._lock:
+            total = max((s["start"] + s["seconds"] for s in self.spans), default=0.0)
+        return {"total_seconds": round(total, 3), "stages": stages, "llm": models, "commands": commands}
+
+    def write(self, path: Path) -> dict:
+        summary = self.summary()
+        with self._lock:
+            spans = list(self.spans)
+        Path(path).write_text(json.dumps({"summary": summary, "spans": spans}, indent=2), encoding="utf-8")
+        return summary
+
+    def write_chrome_trace(self, path: Path):
+        """Complete ("X") events in the Trace Event Format, one track per thread."""
+        with self._lock:
+            spans = list(self.spans)
+        tids = {}
+        events = []
+        for s in spans:
+            tid = tids.setdefault(s["thread"], len(tids) + 1)
+            events.append({
+                "name": s["name"],
+                "cat": s["cat"],
+                "ph": "X",
+                "ts": int(s["start"] * 1e6),
+                "dur": max(1, int(s["seconds"] * 1e6)),
+                "pid": 1,
+                "tid": tid,
+                "args": s["args"],
+            })
+        for thread, tid in tids.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": thread}})
+        Path(path).write_text(json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}), encoding="utf-8")
+
+
+def format_summary(summary: dict) -> str:
+    """Plain-text report of a ``metrics.json`` summary for the GUI."""
+    lines = [f"Total {summary.get('total_seconds', 0):.2f}s"]
+    for name, s in summary.get("stages", {}).items():
+        io = ""
+        if s.get("bytes_read") or s.get("bytes_written"):
+            io = f"  read {s['bytes_read'] / 1024:.0f} KB, wrote {s['bytes_written'] / 1024:.0f} KB"
+        label = f"    {name}" if s.get("step") else f"  {name}"
+        lines.append(f"{label:<16} {s['seconds']:>8.2f}s{io}")
+    for model, m in summary.get("llm", {}).items():
+        tps = f"{m['tokens_per_second']} tok/s" if m["tokens_per_second"] else "-"
+        lines.append(
+            f"LLM {model}: {m['calls']} calls ({m['cached']} cached), {m['seconds']:.2f}s, "
+            f"{m['prompt_tokens']} prompt + {m['eval_tokens']} generated tokens, {tps}"
+        )
+    for c in summary.get("commands", []):
+        cpu = f", cpu {c['cpu_seconds']:.2f}s" if c.get("cpu_seconds") is not None else ""
+        lines.append(f"$ {c['cmd']}  {c['seconds']:.2f}s{cpu}, exit {c['returncode']}")
+    return "\n".join(lines)
+
+
+_current_metrics = contextvars.ContextVar("run_metrics", default=None)
+
+
+@contextmanager
+def use_metrics(metrics: RunMetrics):
+    token = _current_metrics.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current_metrics.reset(token)
+
+
+def current_metrics() -> RunMetrics | None:
+    return _current_metrics.get()
+
+
+@contextmanager
+def span(name: str, cat: str = "stage", **args):
+    """``RunMetrics.span`` on the run bound with :func:`use_metrics`; a no-op outside a run."""
+    metrics = current_metrics()
+    if metrics is None:
+        yield args
+        return
+    with metrics.span(name, cat, **args) as out:
+        yield out
@@ -1,31 +1,84 @@
-import difflib
+import asyncio
 import json
-from datetime import datetime
+import threading
 from pathlib import Path
 
-from agent_studio.agents.builder import BuilderAgent
+from agent_studio.agents.builder import MAX_PATCH_FILES, BuilderAgent
+from agent_studio.agents.impact import ImpactAnalyzer
 from agent_studio.agents.planner import PlannerAgent
-from agent_studio.agents.runner import RunnerAgent
+from agent_studio.agents.reviewer import ReviewerAgent
+from agent_studio.agents.runner import FULL_TEST_COMMAND, RunnerAgent
 from agent_studio.config.defaults import DEFAULT_ALLOWLIST
+from agent_studio.llm.async_client import run_sync
+from agent_studio.llm.cache import current_run, use_cache
+from agent_studio.llm.transport import RequestCancelled
+from agent_studio.metrics import RunMetrics, current_metrics, span, use_metrics
+from agent_studio.scheduler import CancelToken
 from agent_studio.storage.project_store import ProjectStore
+from agent_studio.storage.patch import read_preview, write_patch
+from agent_studio.storage.run_ledger import CANCELLED, ERROR, FAILED, OK, new_run_dir
+from agent_studio.storage.snapshot import SnapshotEngine
+
+EDITABLE_ROOTS = ["src", "tests", "docs"]
+DEFAULT_MODEL = "qwen2.5:7b"
+# Plan and patch calls are deterministic so a re-run of an unchanged brief or plan hits the LLM cache.
+PLAN_TEMPERATURE = 0.0
+PLAN_NUM_CTX = 4096
+PATCH_TEMPERATURE = 0.0
+PATCH_NUM_CTX = 4096
 
 
 class StudioOrchestrator:
-    def __init__(self, llm, store: ProjectStore | None = None):
+    def __init__(
+        self,
+        llm,
+        store: ProjectStore | None = None,
+        async_llm=None,
+        chrome_trace: bool = False,
+        stream_patch: bool = False,
+        llm_review: bool = False,
+    ):
         self.llm = llm
         self.store = store or ProjectStore()
-        self._stop = False
+        # Also write runs/<id>/trace.json for chrome://tracing or Perfetto.
+        self.chrome_trace = chrome_trace
+        # Generate the patch as a stream and write each file as soon as it is complete.
+        self.stream_patch = stream_patch
+        self._tokens: set[CancelToken] = set()
+        self._tokens_lock = threading.Lock()
+
+        self.planner = PlannerAgent(self._stage_llm("plan"))
+        self.builder = BuilderAgent(self._stage_llm("patch"))
+        self.runner = RunnerAgent(llm=self._stage_llm("summary"))
+        self.reviewer = ReviewerAgent()
+        # Optional AsyncOllamaClient: parallel LLM reviews that Stop can interrupt mid-generation.
+        self.async_llm = async_llm
+        # Gate G4 (three LLM reviews) is opt-in and needs a model routed to the "review" stage.
+        self.llm_review = llm_review
 
-        self.planner = PlannerAgent(llm=self.llm)
-        self.builder = BuilderAgent(llm=self.llm)
-        self.runner = RunnerAgent(llm=self.llm)
+    def _stage_llm(self, stage: str):
+        # A ModelRouter hands each agent a view bound to its stage's model.
+        for_stage = getattr(self.llm, "for_stage", None)
+        return for_stage(stage) if for_stage else self.llm
 
     def stop(self):
-        self._stop = True
+        """Cancel every run in progress; the scheduler cancels single jobs through their tokens."""
+        with self._tokens_lock:
+            tokens = list(self._tokens)
+        for token in tokens:
+            token.cancel()
 
-    def generate_plan(self, project: str, brief: str) -> str:
-        self._stop = False
-        plan = self.planner.generate_plan(project=project, brief=brief)
+    def generate_plan(self, project: str, brief: str, cancel: CancelToken | None = None) -> str:
+        token = cancel or CancelToken()
+        with self._tokens_lock:
+            self._tokens.add(token)
+        try:
+            plan = self.planner.build_plan(
+                self._model_for("plan"), brief, temperature=PLAN_TEMPERATURE, num_ctx=PLAN_NUM_CTX, cancel=token
+            )
+        finally:
+            with self._tokens_lock:
+                self._tokens.discard(token)
         self.store.save_plan(project, plan)
         return plan
 
@@ -38,16 +91,86 @@ class StudioOrchestrator:
         confirm_command,
         log,
         allowlist=None,
+        full_suite=False,
+        cancel: CancelToken | None = None,
     ):
-        self._stop = False
+        token = cancel or CancelToken()
+        with self._tokens_lock:
+            self._tokens.add(token)
+        cache = getattr(self.llm, "cache", None)
+        if cache is not None and cache.scope == "project":
+            cache = cache.for_directory(self.store.project_path(project) / ".agentstudio")
+
+        # Every run is recorded in the ledger, including ones that are cancelled or crash.
+        run_id, run_dir = new_run_dir(self.store.project_path(project) / "runs")
+        model_for = getattr(self.llm, "model_for", None)
+        ledger = self.store.ledger
+        ledger.start_run(run_id, project, run_dir, model=model_for("patch") if model_for else None)
+        lines = []
+        metrics = RunMetrics()
+
+        def keep_log(msg: str):
+            lines.append(msg)
+            log(msg)
+
+        def log_text() -> str:
+            run_log = run_dir / "run_log.txt"
+            extra = run_log.read_text(encoding="utf-8", errors="ignore") if run_log.exists() else ""
+            return "\n".join(lines) + "\n" + extra
+
+        def save_metrics():
+            metrics.write(run_dir / "metrics.json")
+            if self.chrome_trace:
+                metrics.write_chrome_trace(run_dir / "trace.json")
+
+        try:
+            with use_cache(cache) as counters, use_metrics(metrics):
+                try:
+                    result = self._run(
+                        project,
+                        plan,
+                        token,
+                        run_dir,
+                        confirm_overwrite=confirm_overwrite,
+                        confirm_command=confirm_command,
+                        log=keep_log,
+                        allowlist=allowlist,
+                        full_suite=full_suite,
+                    )
+                except BaseException as exc:
+                    save_metrics()
+                    ledger.finish_run(
+                        run_id,
+                        CANCELLED if token.cancelled else ERROR,
+                        message=str(exc) or type(exc).__name__,
+                        stages=metrics.stage_seconds(),
+                        eval_tokens=counters.eval_tokens,
+                        prompt_tokens=counters.prompt_tokens,
+                        log_text=log_text(),
+                    )
+                    raise
+            save_metrics()
+            status = OK if result["ok"] else CANCELLED if token.cancelled else FAILED
+            ledger.finish_run(
+                run_id,
+                status,
+                message=result["message"],
+                gates=result["gates"],
+                stages=metrics.stage_seconds(),
+                eval_tokens=counters.eval_tokens,
+                prompt_tokens=counters.prompt_tokens,
+                log_text=log_text(),
+            )
+            result["run_id"] = run_id
+            return result
+        finally:
+            with self._tokens_lock:
+                self._tokens.discard(token)
+
+    def _run(self, project, plan, token, run_dir, *, confirm_overwrite, confirm_command, log, allowlist, full_suite):
         allowlist = allowlist or DEFAULT_ALLOWLIST
 
         project_dir = self.store.project_path(project)
-        project_dir.mkdir(parents=True, exist_ok=True)
-
-        run_id = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-        run_dir = project_dir / "runs" / run_id
-        run_dir.mkdir(parents=True, exist_ok=True)
 
         def _log(msg: str):
             try:
@@ -55,64 +178,85 @@ class StudioOrchestrator:
             except Exception:
                 pass
 
-        def _read_text(p: Path) -> str:
-            if not p.exists():
-                return ""
-            return p.read_text(encoding="utf-8", errors="ignore")
-
         def _write_text(p: Path, s: str):
             p.parent.mkdir(parents=True, exist_ok=True)
             p.write_text(s, encoding="utf-8")
 
-        def _snapshot_tree(root: Path) -> dict[str, str]:
-            snapshot = {}
-            for f in root.rglob("*"):
-                if f.is_file():
-                    # skip run artifacts to avoid diff noise
-                    if "runs" in f.parts:
-                        continue
-                    rel = f.relative_to(root).as_posix()
-                    snapshot[rel] = _read_text(f)
-            return snapshot
-
-        def _diff_snap(before: dict[str, str], after: dict[str, str]) -> str:
-            paths = sorted(set(before.keys()) | set(after.keys()))
-            out = []
-            for rel in paths:
-                a = before.get(rel, "").splitlines(keepends=True)
-                b = after.get(rel, "").splitlines(keepends=True)
-                if a == b:
-                    continue
-                out.append(f"--- a/{rel}\n+++ b/{rel}\n")
-                out.extend(difflib.unified_diff(a, b, fromfile=f"a/{rel}", tofile=f"b/{rel}"))
-                if out and not out[-1].endswith("\n"):
-                    out[-1] += "\n"
-            return "".join(out)
-
-        # --- Run plan parsing ---
-        _log("Parsing plan...")
-        patch_plan = self.builder.parse_plan(plan)
+        # --- Patch generation (the streamed build generates as it writes) ---
+        if not self.stream_patch:
+            _log("Generating patch...")
+            with span("parse"):
+                try:
+                    patch_plan = self.builder.propose_patch(
+                        model=self._model_for("patch"),
+                        brief=self.store.load_brief(project),
+                        plan=plan,
+                        editable_paths=EDITABLE_ROOTS,
+                        temperature=PATCH_TEMPERATURE,
+                        num_ctx=PATCH_NUM_CTX,
+                        cancel=token,
+                    )
+                except RequestCancelled:
+                    patch_plan = {"summary": "", "files": []}  # Stop aborted the generation; the build records it
 
         # --- Build (write/modify files) ---
         _log("Applying build steps...")
-        before = _snapshot_tree(project_dir)
-        writes = self.builder.apply_plan(
-            project_dir=project_dir,
-            plan=patch_plan,
-            confirm_overwrite=confirm_overwrite,
-            log=_log,
-            stop_flag=lambda: self._stop,
+        with span("build"):
+            snapshots = SnapshotEngine(project_dir)
+            with span("snapshot", "step"):
+                before = snapshots.scan()
+            hashed = snapshots.hashed
+            with span("apply", "step"):
+                if self.stream_patch:
+                    writes = self._stream_build(project, project_dir, plan, token, _log)
+                    patch_plan = {"summary": writes["summary"], "files": [
+                        {"path": c["path"], "content": c["new"]} for c in writes["changes"]
+                    ]}
+                elif token.cancelled:
+                    writes = {"ok": False, "reason": "Stopped.", "changes": []}
+                else:
+                    writes = self.builder.apply_patch_plan(
+                        project_dir, patch_plan, EDITABLE_ROOTS, MAX_PATCH_FILES, confirm_overwrite=confirm_overwrite
+                    )
+                    for path in writes["skipped"]:
+                        _log(f"Kept {path}: overwrite declined.")
+                    if not writes["ok"]:
+                        _log(f"Build stopped: {writes['reason']}")
+
+            rate = self.builder.parse_success_rate
+            if rate is not None:
+                stats = self.builder.parse_stats
+                _log(f"Builder JSON: {rate:.0%} parsed ({stats['repaired']} after repair, {stats['fallback']} fell back).")
+
+            # Prefer the builder's own change records; re-scan the tree only when it has none.
+            changes = writes["changes"]
+            patch_path = run_dir / "changes.patch"
+            with span("diff", "step"):
+                if changes and all(isinstance(c, dict) and {"path", "old", "new"} <= c.keys() for c in changes):
+                    patch_stats = write_patch(patch_path, changes)
+                    changed_paths = [c["path"] for c in changes]
+                    review_changes = changes
+                    snapshots.prune_objects(before)
+                else:
+                    after = snapshots.scan()
+                    changed_paths = snapshots.changed(before, after)
+                    review_changes = []
+                    patch_stats = write_patch(patch_path, snapshots.change_records(before, after))
+                    snapshots.prune_objects(after)
+        combined_diff = read_preview(patch_path)
+        _log(
+            f"Patch: {patch_stats['files']} files, +{patch_stats['added']}/-{patch_stats['removed']} lines "
+            f"({hashed} of {len(before)} files hashed)."
         )
-        after = _snapshot_tree(project_dir)
-        combined_diff = _diff_snap(before, after)
 
         # --- Gates / approvals ---
         gates = {}
 
-        # Gate: diff must exist if writes happened
-        build_ok = True
-        if not writes:
-            build_ok = False
+        # Gate: the build must have applied a patch that changed something
+        build_ok = writes["ok"] and bool(changed_paths)
+        if not writes["ok"]:
+            gates["G1"] = {"pass": False, "reason": f"Build failed: {writes['reason']}"}
+        elif not build_ok:
             gates["G1"] = {"pass": False, "reason": "No files were written/changed."}
         else:
             gates["G1"] = {"pass": True, "reason": "Files were written/changed."}
@@ -120,40 +264,101 @@ class StudioOrchestrator:
         # Gate: command allowlist approval
         approval_pass = True
 
-        # Run commands (including tests)
-        _log("Running commands...")
-        runner_out = self.runner.run_project(
-            project_dir=project_dir,
-            plan=patch_plan,
-            allowlist=allowlist,
-            confirm_command=confirm_command,
-            log=_log,
-            stop_flag=lambda: self._stop,
-        )
+        # A failed or empty build is not reviewed or tested.
+        if not build_ok:
+            _log(f"{gates['G1']['reason']} Skipping review and tests.")
+            runner_out = {"log": ""}
+            test_ok = False
+        else:
+            # Gate: LLM reviews (code/security/UX) run concurrently; Stop cancels them at once
+            configured_model = getattr(self.llm, "configured_model", None)
+            review_model = configured_model("review") if self.llm_review and configured_model else None
+            if self.async_llm is not None and review_changes and review_model and not token.cancelled:
+                with span("review"):
+                    _log(f"Reviewing patch with {review_model}...")
+                    try:
+                        review_ok, review_text = run_sync(
+                            self.reviewer.review_patch_llm(review_changes, self.async_llm, review_model, cancel=token),
+                            cancel=token,
+                        )
+                    except asyncio.CancelledError:
+                        review_ok, review_text = False, "Review cancelled."
+                for line in review_text.splitlines():
+                    _log(f"Review {line}")
+                gates["G4"] = {"pass": review_ok, "reason": review_text}
 
-        # runner_out should include test_ok; if not, default conservatively to False
-        test_ok = bool(runner_out.get("test_ok", False))
-        cmd_ok = bool(runner_out.get("ok", False))
+            # Test impact: run only the tests that import the changed modules
+            with span("impact"):
+                test_targets = ImpactAnalyzer(project_dir).affected_tests(changed_paths)
+            if test_targets is None:
+                _log("Test impact: shared config or data changed, running the full suite.")
+            else:
+                _log(f"Test impact: {len(test_targets)} affected test file(s).")
 
-        if not cmd_ok:
-            approval_pass = False
-            gates["G2"] = {"pass": False, "reason": "One or more commands failed or were blocked."}
-        else:
-            gates["G2"] = {"pass": True, "reason": "Commands executed successfully."}
+            # Run commands (including tests)
+            _log("Running commands...")
+            with span("commands"):
+                runner_out = self.runner.run_project(
+                    project_dir=project_dir,
+                    plan=patch_plan,
+                    allowlist=allowlist,
+                    confirm_command=confirm_command,
+                    log=_log,
+                    stop_flag=token,
+                    test_targets=test_targets,
+                )
+            self._record_commands(runner_out.get("results") or [])
 
-        if not test_ok:
-            gates["G3"] = {"pass": False, "reason": "Tests failed."}
-        else:
-            gates["G3"] = {"pass": True, "reason": "Tests passed."}
+            # runner_out should include test_ok; if not, default conservatively to False
+            test_ok = bool(runner_out.get("test_ok", False))
+            cmd_ok = bool(runner_out.get("ok", False))
+
+            if not cmd_ok:
+                approval_pass = False
+                gates["G2"] = {"pass": False, "reason": "One or more commands failed or were blocked."}
+            else:
+                gates["G2"] = {"pass": True, "reason": "Commands executed successfully."}
+
+            # Approval stage (full_suite): the full suite runs once, after the affected tests pass.
+            # Iterations run only the affected tests, unless none were selected and nothing else would test the patch.
+            suite_label = "Tests"
+            full_ran = False
+            if test_targets is not None:
+                suite_label = f"Affected tests ({len(test_targets)} files)"
+                wanted = (full_suite and test_ok) or not test_targets
+                if wanted and cmd_ok and (project_dir / "tests").exists() and not token.cancelled:
+                    _log("Running full test suite for approval..." if full_suite else "No affected tests; running the full suite...")
+                    with span("full_suite"):
+                        full = self.runner.execute(FULL_TEST_COMMAND, cwd=project_dir, log=_log, stop_flag=token)
+                    self._record_commands([full])
+                    runner_out["log"] = f"{runner_out.get('log', '')}\n$ {FULL_TEST_COMMAND}\n{full['output']}\n"
+                    test_ok = full["ok"]
+                    suite_label = "Full test suite"
+                    full_ran = True
+
+            if not test_ok and not full_ran and not runner_out.get("tests_ran"):
+                gates["G3"] = {"pass": False, "reason": "No tests ran."}
+            elif not test_ok:
+                gates["G3"] = {"pass": False, "reason": f"{suite_label} failed."}
+            else:
+                gates["G3"] = {"pass": True, "reason": f"{suite_label} passed."}
 
         # Optional: additional gates from runner
         extra_gates = runner_out.get("gates") or {}
         for k, v in extra_gates.items():
             gates[k] = v
 
+        cache_run = current_run()
+        run_log = runner_out.get("log", "")
+        if cache_run is not None and cache_run.cache is not None:
+            _log(cache_run.summary())
+            run_log = f"{run_log}\n{cache_run.summary()}\n"
+        metrics = current_metrics()
+        if metrics is not None:
+            _log("Stage times: " + ", ".join(f"{name} {sec:.2f}s" for name, sec in metrics.stage_seconds().items()))
+
         # Write run artifacts
-        _write_text(run_dir / "run_log.txt", runner_out.get("log", ""))
-        _write_text(run_dir / "changes.patch", combined_diff)
+        _write_text(run_dir / "run_log.txt", run_log)
         _write_text(run_dir / "changes_summary.md", patch_plan.get("summary", ""))
         _write_text(run_dir / "plan.md", plan)
 
@@ -181,6 +386,36 @@ class StudioOrchestrator:
             "gates": gates,
         }
 
+    def _model_for(self, stage: str) -> str:
+        model_for = getattr(self.llm, "model_for", None)
+        return (model_for(stage) if model_for else None) or DEFAULT_MODEL
+
+    def _stream_build(self, project, project_dir, plan, token, log) -> dict:
+        result = self.builder.stream_patch(
+            model=self._model_for("patch"),
+            brief=self.store.load_brief(project),
+            plan=plan,
+            project_root=project_dir,
+            editable_roots=EDITABLE_ROOTS,
+            max_files=MAX_PATCH_FILES,
+            temperature=PATCH_TEMPERATURE,
+            num_ctx=PATCH_NUM_CTX,
+            on_file=lambda change: log(f"Wrote {change['path']}"),
+            stop_flag=token,
+        )
+        if not result["ok"]:
+            log(f"Build stopped: {result['reason']}")
+        return result
+
+    @staticmethod
+    def _record_commands(results: list[dict]):
+        metrics = current_metrics()
+        if metrics is None:
+            return
+        for r in results:
+            if r.get("started") is not None:
+                metrics.add(r["cmd"], "command", r["started"], r["seconds"], cpu_seconds=r["cpu_seconds"], returncode=r["returncode"])
+
 
 def load_allowlist(path: str | Path) -> dict:
     p = Path(path)
@@ -0,0 +1,191 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class CancelToken:
+    """Per-job stop signal; calling the token returns True once cancelled."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+
+    def cancel(self):
+        self._event.set()
+        with self._lock:
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            callback()
+
+    def add_callback(self, callback):
+        """Call ``callback()`` on cancel (e.g. to close a blocked socket); returns a function that removes it."""
+        with self._lock:
+            self._callbacks.append(callback)
+
+        def remove():
+            with self._lock:
+                if callback in self._callbacks:
+                    self._callbacks.remove(callback)
+
+        return remove
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def __call__(self) -> bool:
+        return self._event.is_set()
+
+
+@dataclass
+class PipelineJob:
+    id: int
+    project: str
+    plan: str
+    options: dict = field(default_factory=dict, repr=False)
+    status: str = QUEUED
+    message: str = ""
+    submitted: float = field(default_factory=time.time)
+    started: float | None = None
+    finished: float | None = None
+    result: dict | None = field(default=None, repr=False)
+    token: CancelToken = field(default_factory=CancelToken, repr=False)
+
+    @property
+    def duration(self) -> float | None:
+        if self.started is None:
+            return None
+        return (self.finished or time.time()) - self.started
+
+    def row(self) -> dict:
+        return {
+            "id": self.id,
+            "project": self.project,
+            "status": self.status,
+            "message": self.message,
+            "submitted": self.submitted,
+            "started": self.started,
+            "finished": self.finished,
+            "duration": self.duration,
+        }
+
+
+class PipelineScheduler:
+    """Runs queued pipeline jobs on a fixed pool of worker threads.
+
+    Each project has its own FIFO queue and at most one running job, since
+    runs write into the project folder. Workers take projects round-robin, so
+    a long batch for one project does not starve the others.
+    """
+
+    def __init__(self, orchestrator, workers: int = 2, on_update=None, history: int = 200):
+        self.orchestrator = orchestrator
+        self.on_update = on_update
+        self.history = history
+        self._cond = threading.Condition()
+        self._queues: OrderedDict[str, deque] = OrderedDict()
+        self._active: set[str] = set()
+        self._jobs: OrderedDict[int, PipelineJob] = OrderedDict()
+        self._ids = itertools.count(1)
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._work, name=f"pipeline-{i + 1}", daemon=True) for i in range(max(1, workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, project: str, plan: str, **options) -> PipelineJob:
+        with self._cond:
+            job = PipelineJob(id=next(self._ids), project=project, plan=plan, options=options)
+            self._jobs[job.id] = job
+            self._queues.setdefault(project, deque()).append(job)
+            self._trim()
+            self._cond.notify()
+        self._notify(job)
+        return job
+
+    def cancel(self, job_id: int) -> bool:
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.status not in (QUEUED, RUNNING):
+                return False
+            job.token.cancel()
+            if job.status == QUEUED:
+                self._queues[job.project].remove(job)
+                job.status, job.message, job.finished = CANCELLED, "Cancelled before start.", time.time()
+        self._notify(job)
+        return True
+
+    def cancel_project(self, project: str):
+        for job in self.jobs():
+            if job.project == project:
+                self.cancel(job.id)
+
+    def cancel_all(self):
+        for job in self.jobs():
+            self.cancel(job.id)
+
+    def jobs(self) -> list[PipelineJob]:
+        with self._cond:
+            return list(self._jobs.values())
+
+    def shutdown(self, cancel: bool = True):
+        if cancel:
+            self.cancel_all()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _trim(self):
+        finished = [j.id for j in self._jobs.values() if j.status in (DONE, FAILED, CANCELLED)]
+        for job_id in finished[: max(0, len(self._jobs) - self.history)]:
+            del self._jobs[job_id]
+
+    def _next_job(self) -> PipelineJob | None:
+        for project, queue in self._queues.items():
+            if queue and project not in self._active:
+                self._queues.move_to_end(project)
+                return queue.popleft()
+        return None
+
+    def _work(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None and not self._closed:
+                    self._cond.wait()
+                    job = self._next_job()
+                if job is None:
+                    return
+                self._active.add(job.project)
+                job.status, job.started = RUNNING, time.time()
+            self._notify(job)
+            try:
+                result = self.orchestrator.run(project=job.project, plan=job.plan, cancel=job.token, **job.options)
+                status = DONE if result.get("ok") else FAILED
+                message = result.get("message", "")
+            except Exception as exc:
+                result, status, message = None, FAILED, f"Pipeline error: {exc}"
+            with self._cond:
+                if job.token.cancelled:
+                    status, message = CANCELLED, message or "Stopped."
+                job.status, job.message, job.result, job.finished = status, message, result, time.time()
+                self._active.discard(job.project)
+                self._cond.notify_all()
+            self._notify(job)
+
+    def _notify(self, job: PipelineJob):
+        if self.on_update:
+            try:
+                self.on_update(job)
+            except Exception:
+                pass
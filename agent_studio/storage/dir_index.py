@@ -0,0 +1,152 @@
+import fnmatch
+import os
+import queue
+import threading
+from pathlib import Path
+
+from agent_studio.storage.snapshot import DEFAULT_IGNORE
+
+POLL_SECONDS = 1.0
+_STOP = object()
+
+
+class DirectoryIndex:
+    """Cached, lazily filled listing of a project tree.
+
+    Only directories that were asked for (the root and whatever the user
+    expanded) are listed, one ``os.scandir`` each. All filesystem work runs on
+    one background thread: ``request()`` queues a listing, and between
+    requests the thread polls the mtime of every cached directory every
+    ``poll_seconds`` and re-lists the ones that changed. Results go to the
+    ``on_change(rel, entries)`` callback given to ``start()``; ``entries`` is
+    None when the directory is gone. ``rel`` is the POSIX path relative to
+    the root, ``""`` for the root itself.
+    """
+
+    def __init__(self, root: Path, hidden: list[str] | None = None, poll_seconds: float = POLL_SECONDS):
+        self.root = Path(root)
+        self.hidden = list(DEFAULT_IGNORE if hidden is None else hidden)
+        self.dir_patterns = [p.rstrip("/") for p in self.hidden if p.endswith("/")]
+        self.file_patterns = [p for p in self.hidden if not p.endswith("/")]
+        self.poll_seconds = poll_seconds
+        self._dirs = {}  # rel -> (mtime_ns, entries)
+        self._lock = threading.Lock()
+        self._requests = queue.SimpleQueue()
+        self._thread = None
+        self._on_change = None
+
+    def is_hidden(self, entry: dict) -> bool:
+        """True for run artifacts and tool directories the file tree hides by default."""
+        if entry["is_dir"]:
+            return any(fnmatch.fnmatch(entry["name"], p) for p in self.dir_patterns)
+        return any(fnmatch.fnmatch(entry["path"], p) or fnmatch.fnmatch(entry["name"], p) for p in self.file_patterns)
+
+    def cached(self, rel: str) -> list[dict] | None:
+        with self._lock:
+            item = self._dirs.get(rel)
+        return item[1] if item else None
+
+    def forget(self, rel: str):
+        """Stop watching ``rel`` and everything below it (the node was collapsed)."""
+        prefix = rel + "/"
+        with self._lock:
+            for key in [k for k in self._dirs if k == rel or k.startswith(prefix)]:
+                del self._dirs[key]
+
+    def request(self, rel: str = "", force: bool = False):
+        """Queue a listing of ``rel``; a cached, unchanged listing is reused unless ``force``."""
+        self._requests.put((rel, force))
+
+    def refresh(self):
+        """Re-list every cached directory, including ones whose mtime did not move."""
+        with self._lock:
+            known = list(self._dirs)
+        for rel in known:
+            self.request(rel, force=True)
+
+    def start(self, on_change):
+        self._on_change = on_change
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, args=(self._requests,), name=f"dir-index:{self.root.name}", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        # The old thread drains its own queue; a later start() gets a fresh one.
+        self._requests.put(_STOP)
+        self._requests = queue.SimpleQueue()
+        self._thread = None
+
+    def _path(self, rel: str) -> Path:
+        return self.root / rel if rel else self.root
+
+    def _list(self, rel: str) -> list[dict] | None:
+        path = self._path(rel)
+        try:
+            mtime_ns = path.stat().st_mtime_ns
+            with os.scandir(path) as it:
+                raw = list(it)
+        except OSError:
+            with self._lock:
+                self._dirs.pop(rel, None)
+            return None
+        entries = []
+        for entry in raw:
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                size = None if is_dir else entry.stat(follow_symlinks=False).st_size
+            except OSError:
+                continue
+            entries.append({
+                "name": entry.name,
+                "path": f"{rel}/{entry.name}" if rel else entry.name,
+                "is_dir": is_dir,
+                "size": size,
+            })
+        entries.sort(key=lambda e: (not e["is_dir"], e["name"].lower()))
+        with self._lock:
+            self._dirs[rel] = (mtime_ns, entries)
+        return entries
+
+    def _fresh(self, rel: str) -> list[dict] | None:
+        with self._lock:
+            item = self._dirs.get(rel)
+        try:
+            if item and self._path(rel).stat().st_mtime_ns == item[0]:
+                return item[1]
+        except OSError:
+            pass
+        return None
+
+    def _stale(self) -> list[str]:
+        with self._lock:
+            known = list(self._dirs.items())
+        stale = []
+        for rel, (mtime_ns, _) in known:
+            try:
+                if self._path(rel).stat().st_mtime_ns != mtime_ns:
+                    stale.append(rel)
+            except OSError:
+                stale.append(rel)
+        return stale
+
+    def _publish(self, rel: str, entries: list[dict] | None):
+        if self._on_change is not None:
+            self._on_change(rel, entries)
+
+    def _run(self, requests):
+        while True:
+            try:
+                item = requests.get(timeout=self.poll_seconds)
+            except queue.Empty:
+                for rel in self._stale():
+                    self._publish(rel, self._list(rel))
+                continue
+            if item is _STOP:
+                return
+            rel, force = item
+            entries = None if force else self._fresh(rel)
+            if entries is None:
+                entries = self._list(rel)
+            self._publish(rel, entries)
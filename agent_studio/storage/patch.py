@@ -0,0 +1,228 @@
+import hashlib
+from pathlib import Path
+
+MAX_DIFF_BYTES = 1_000_000
+MAX_EDIT_DISTANCE = 2000
+CONTEXT_LINES = 3
+
+
+def _trim(a: list[str], b: list[str]) -> tuple[int, int]:
+    prefix = 0
+    limit = min(len(a), len(b))
+    while prefix < limit and a[prefix] == b[prefix]:
+        prefix += 1
+    suffix = 0
+    limit -= prefix
+    while suffix < limit and a[-1 - suffix] == b[-1 - suffix]:
+        suffix += 1
+    return prefix, suffix
+
+
+def _intern(a: list[str], b: list[str]) -> tuple[list[int], list[int]]:
+    ids: dict[str, int] = {}
+    return [ids.setdefault(line, len(ids)) for line in a], [ids.setdefault(line, len(ids)) for line in b]
+
+
+def _myers_matches(a: list[int], b: list[int], max_d: int):
+    """Matched (i, j) runs of the shortest edit script, or None past ``max_d`` edits."""
+    n, m = len(a), len(b)
+    offset = n + m + 1
+    v = [0] * (2 * offset + 1)
+    trace = []
+    for d in range(min(n + m, max_d) + 1):
+        trace.append(v[offset - d : offset + d + 1])
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+                x = v[offset + k + 1]
+            else:
+                x = v[offset + k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[x] == b[y]:
+                x += 1
+                y += 1
+            v[offset + k] = x
+            if x >= n and y >= m:
+                return _backtrack(trace, n, m)
+    return None
+
+
+def _backtrack(trace, x: int, y: int) -> list[tuple[int, int, int]]:
+    runs = []
+    for d in range(len(trace) - 1, -1, -1):
+        v = trace[d]  # values for k in [-d, d] before step d, shifted by d
+
+        def at(k):
+            return v[k + d]
+
+        k = x - y
+        if d == 0:
+            prev_x = prev_y = 0
+        else:
+            prev_k = k + 1 if k == -d or (k != d and at(k - 1) < at(k + 1)) else k - 1
+            prev_x = at(prev_k)
+            prev_y = prev_x - prev_k
+        start_x, start_y = (prev_x, prev_y) if d == 0 else (prev_x + (prev_k == k - 1), prev_y + (prev_k == k + 1))
+        if x > start_x:
+            runs.append((start_x, start_y, x - start_x))
+        x, y = prev_x, prev_y
+    runs.reverse()
+    return runs
+
+
+def opcodes(a: list[str], b: list[str], max_d: int = MAX_EDIT_DISTANCE) -> list[tuple]:
+    """difflib-style opcodes from Myers' O(ND) diff.
+
+    The common prefix and suffix are trimmed first and the remaining lines are
+    interned to ints, so most edits compare a handful of ints. Past ``max_d``
+    edits the trimmed middle is reported as one replace block.
+    """
+    prefix, suffix = _trim(a, b)
+    mid_a, mid_b = _intern(a[prefix : len(a) - suffix], b[prefix : len(b) - suffix])
+    runs = _myers_matches(mid_a, mid_b, max_d) if mid_a and mid_b else []
+    if runs is None:
+        runs = []
+    runs = [(prefix + i, prefix + j, size) for i, j, size in runs]
+    if prefix:
+        runs.insert(0, (0, 0, prefix))
+    if suffix:
+        runs.append((len(a) - suffix, len(b) - suffix, suffix))
+    runs.append((len(a), len(b), 0))
+
+    codes = []
+    i = j = 0
+    for ai, bj, size in runs:
+        tag = "replace" if i < ai and j < bj else "delete" if i < ai else "insert" if j < bj else None
+        if tag:
+            codes.append((tag, i, ai, j, bj))
+        if size:
+            codes.append(("equal", ai, ai + size, bj, bj + size))
+        i, j = ai + size, bj + size
+    return codes or [("equal", 0, 0, 0, 0)]
+
+
+def _grouped(codes: list[tuple], n: int):
+    if codes[0][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = (tag, max(i1, i2 - n), i2, max(j1, j2 - n), j2)
+    if codes[-1][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = (tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n))
+    group = []
+    for tag, i1, i2, j1, j2 in codes:
+        if tag == "equal" and i2 - i1 > 2 * n:
+            group.append((tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)))
+            yield group
+            group = []
+            i1, j1 = max(i1, i2 - n), max(j1, j2 - n)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == "equal"):
+        yield group
+
+
+def _range(start: int, stop: int) -> str:
+    length = stop - start
+    if length == 1:
+        return str(start + 1)
+    return f"{start + 1 if length else start},{length}"
+
+
+def unified_hunks(a: list[str], b: list[str], n: int = CONTEXT_LINES):
+    for group in _grouped(opcodes(a, b), n):
+        first, last = group[0], group[-1]
+        yield f"@@ -{_range(first[1], last[2])} +{_range(first[3], last[4])} @@\n"
+        for tag, i1, i2, j1, j2 in group:
+            if tag == "equal":
+                for line in a[i1:i2]:
+                    yield " " + line
+                continue
+            for line in a[i1:i2]:
+                yield "-" + line
+            for line in b[j1:j2]:
+                yield "+" + line
+
+
+def _digest(text: str | None, known: str | None) -> str:
+    if known:
+        return known
+    if text is None:
+        return "0" * 64
+    return hashlib.sha256(text.encode("utf-8", errors="surrogatepass")).hexdigest()
+
+
+def file_diff(change: dict, max_bytes: int = MAX_DIFF_BYTES):
+    """Yield patch lines for one change record ``{path, old, new}``.
+
+    ``old``/``new`` are text, or None for binary/unreadable content (pass
+    ``old_sha256``/``new_sha256`` then). Binary or oversized changes are
+    recorded by hash only.
+    """
+    rel = change["path"]
+    old, new = change.get("old"), change.get("new")
+    if old == new and old is not None:
+        return
+    too_big = old is not None and new is not None and len(old) + len(new) > max_bytes
+    if old is None or new is None or too_big or "\0" in old or "\0" in new:
+        a = _digest(old, change.get("old_sha256"))
+        b = _digest(new, change.get("new_sha256"))
+        if a != b:
+            yield f"--- a/{rel}\n+++ b/{rel}\nBinary or large file changed: {a[:12]} -> {b[:12]}\n"
+        return
+    header = False
+    for line in unified_hunks(old.splitlines(keepends=True), new.splitlines(keepends=True)):
+        if not header:
+            yield f"--- a/{rel}\n+++ b/{rel}\n"
+            header = True
+        yield line if line.endswith("\n") else line + "\n\\ No newline at end of file\n"
+
+
+class PatchWriter:
+    """Streams unified diffs for change records straight to a patch file."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.files = 0
+        self.added = 0
+        self.removed = 0
+        self.bytes = 0
+        self._fh = None
+
+    def __enter__(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = self.path.open("w", encoding="utf-8", newline="\n")
+        return self
+
+    def __exit__(self, *exc):
+        self._fh.close()
+        self._fh = None
+
+    def add(self, change: dict):
+        touched = False
+        for line in file_diff(change):
+            # The "---"/"+++" header is always file_diff's first item; after it a
+            # removed "-- comment" line shows up as "--- comment" and must count.
+            if touched and line.startswith("+"):
+                self.added += 1
+            elif touched and line.startswith("-"):
+                self.removed += 1
+            touched = True
+            self.bytes += len(line)
+            self._fh.write(line)
+        self.files += touched
+
+    def stats(self) -> dict:
+        return {"files": self.files, "added": self.added, "removed": self.removed, "bytes": self.bytes}
+
+
+def write_patch(path: Path, changes) -> dict:
+    with PatchWriter(path) as writer:
+        for change in changes:
+            writer.add(change)
+    return writer.stats()
+
+
+def read_preview(path: Path, limit: int = 200_000) -> str:
+    with Path(path).open("r", encoding="utf-8", errors="ignore") as fh:
+        text = fh.read(limit + 1)
+    if len(text) > limit:
+        return text[:limit] + f"\n... patch truncated, see {Path(path).name}\n"
+    return text
@@ -1,13 +1,15 @@
 import json
 import shutil
-from datetime import datetime
 from pathlib import Path
 
+from agent_studio.storage.run_ledger import RunLedger, new_run_dir
+
 
 class ProjectStore:
     def __init__(self, root: str = "studio_projects"):
         self.root = Path(root)
         self.root.mkdir(parents=True, exist_ok=True)
+        self.ledger = RunLedger(self.root / "run_ledger.sqlite3")
 
     def list_projects(self) -> list[str]:
         return sorted([p.name for p in self.root.iterdir() if p.is_dir()])
@@ -50,6 +52,10 @@ class ProjectStore:
         project = self.ensure_project(project_name)
         return (project / "project_brief.md").read_text(encoding="utf-8")
 
+    def save_plan(self, project_name: str, plan_text: str) -> None:
+        project = self.ensure_project(project_name)
+        (project / "plan.md").write_text(plan_text, encoding="utf-8")
+
     def append_prompt_history(self, project_name: str, payload: dict) -> None:
         project = self.ensure_project(project_name)
         line = json.dumps(payload, ensure_ascii=False)
@@ -58,9 +64,7 @@ class ProjectStore:
 
     def create_run_folder(self, project_name: str) -> Path:
         project = self.ensure_project(project_name)
-        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        run_dir = project / "agent_runs" / stamp
-        run_dir.mkdir(parents=True, exist_ok=True)
+        _, run_dir = new_run_dir(project / "agent_runs")
         return run_dir
 
     def copy_attachment(self, project_name: str, source_path: str) -> Path:
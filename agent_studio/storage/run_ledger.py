@@ -0,0 +1,219 @@
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+DEFAULT_LIMIT = 200
+RUNNING, OK, FAILED, CANCELLED, ERROR = "running", "ok", "failed", "cancelled", "error"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    project TEXT NOT NULL,
+    status TEXT NOT NULL,
+    message TEXT NOT NULL DEFAULT '',
+    model TEXT,
+    eval_tokens INTEGER NOT NULL DEFAULT 0,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    started REAL NOT NULL,
+    finished REAL,
+    run_dir TEXT NOT NULL,
+    stages TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS runs_project_started ON runs(project, started);
+CREATE INDEX IF NOT EXISTS runs_status ON runs(status);
+CREATE TABLE IF NOT EXISTS gates (
+    run_id TEXT NOT NULL,
+    gate TEXT NOT NULL,
+    passed INTEGER NOT NULL,
+    reason TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (run_id, gate)
+);
+CREATE INDEX IF NOT EXISTS gates_gate_passed ON gates(gate, passed);
+CREATE TABLE IF NOT EXISTS artifacts (
+    run_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (run_id, name)
+);
+"""
+FTS_SCHEMA = "CREATE VIRTUAL TABLE IF NOT EXISTS run_logs USING fts5(run_id UNINDEXED, body)"
+PLAIN_LOG_SCHEMA = "CREATE TABLE IF NOT EXISTS run_logs (run_id TEXT PRIMARY KEY, body TEXT NOT NULL)"
+
+
+def new_run_dir(parent: Path) -> tuple[str, Path]:
+    """Create ``parent/<run id>`` and return both; ids are UTC stamps to the microsecond.
+
+    The directory is created with ``exist_ok=False``, so two runs started at
+    the same instant (in this process or another) still get different ids.
+    """
+    parent = Path(parent)
+    parent.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S_%f")
+    run_id, n = stamp, 1
+    while True:
+        try:
+            (parent / run_id).mkdir()
+            return run_id, parent / run_id
+        except FileExistsError:
+            n += 1
+            run_id = f"{stamp}_{n}"
+
+
+def _fts_query(text: str) -> str:
+    # Quote every term so user input never reaches the FTS5 query syntax.
+    return " ".join('"' + term.replace('"', '""') + '"' for term in text.split())
+
+
+class RunLedger:
+    """SQLite index of pipeline runs across all projects.
+
+    One row per run (status, model, token counts, per-stage seconds) plus its
+    gate results and artifact files, so questions such as "failed runs where
+    G3 failed" are one indexed query instead of a walk over ``runs/``. Run logs
+    are searchable with FTS5, or with ``LIKE`` where SQLite was built without
+    it. The artifacts themselves stay in the run folders.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.fts = False
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.path), check_same_thread=False)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+            try:
+                db.execute(FTS_SCHEMA)
+                self.fts = True
+            except sqlite3.OperationalError:
+                db.execute(PLAIN_LOG_SCHEMA)
+            db.commit()
+            self._db = db
+        return self._db
+
+    def start_run(self, run_id: str, project: str, run_dir: Path, model: str | None = None):
+        with self._lock:
+            db = self._conn()
+            db.execute(
+                "INSERT INTO runs (run_id, project, status, model, started, run_dir) VALUES (?, ?, ?, ?, ?, ?)",
+                (run_id, project, RUNNING, model, time.time(), Path(run_dir).as_posix()),
+            )
+            db.commit()
+
+    def finish_run(
+        self,
+        run_id: str,
+        status: str,
+        message: str = "",
+        gates: dict | None = None,
+        stages: dict | None = None,
+        eval_tokens: int = 0,
+        prompt_tokens: int = 0,
+        log_text: str = "",
+    ):
+        """Record the outcome; artifacts are whatever files the run folder holds now."""
+        with self._lock:
+            db = self._conn()
+            row = db.execute("SELECT run_dir FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            if row is None:
+                return
+            db.execute(
+                "UPDATE runs SET status = ?, message = ?, eval_tokens = ?, prompt_tokens = ?, finished = ?, stages = ? "
+                "WHERE run_id = ?",
+                (status, message, eval_tokens, prompt_tokens, time.time(), json.dumps(stages or {}), run_id),
+            )
+            db.executemany(
+                "INSERT OR REPLACE INTO gates (run_id, gate, passed, reason) VALUES (?, ?, ?, ?)",
+                [(run_id, gate, int(bool(g.get("pass"))), str(g.get("reason", ""))) for gate, g in (gates or {}).items()],
+            )
+            run_dir = Path(row["run_dir"])
+            files = sorted(p for p in run_dir.rglob("*") if p.is_file()) if run_dir.is_dir() else []
+            db.executemany(
+                "INSERT OR REPLACE INTO artifacts (run_id, name, path, size) VALUES (?, ?, ?, ?)",
+                [(run_id, p.relative_to(run_dir).as_posix(), p.as_posix(), p.stat().st_size) for p in files],
+            )
+            db.execute("DELETE FROM run_logs WHERE run_id = ?", (run_id,))
+            db.execute("INSERT INTO run_logs (run_id, body) VALUES (?, ?)", (run_id, log_text))
+            db.commit()
+
+    def query(
+        self,
+        project: str | None = None,
+        status: str | None = None,
+        failed_gate: str | None = None,
+        text: str | None = None,
+        since: float | None = None,
+        limit: int = DEFAULT_LIMIT,
+    ) -> list[dict]:
+        """Newest runs first, e.g. ``query(status="failed", failed_gate="G3")``."""
+        where, params = [], []
+        if project:
+            where.append("r.project = ?")
+            params.append(project)
+        if status:
+            where.append("r.status = ?")
+            params.append(status)
+        if since is not None:
+            where.append("r.started >= ?")
+            params.append(since)
+        if failed_gate:
+            where.append("r.run_id IN (SELECT run_id FROM gates WHERE gate = ? AND passed = 0)")
+            params.append(failed_gate)
+        with self._lock:
+            db = self._conn()
+            if text and text.strip():
+                if self.fts:
+                    where.append("r.run_id IN (SELECT run_id FROM run_logs WHERE run_logs MATCH ?)")
+                    params.append(_fts_query(text))
+                else:
+                    where.append("r.run_id IN (SELECT run_id FROM run_logs WHERE body LIKE ?)")
+                    params.append(f"%{text.strip()}%")
+            sql = "SELECT r.* FROM runs r"
+            if where:
+                sql += " WHERE " + " AND ".join(where)
+            sql += " ORDER BY r.started DESC LIMIT ?"
+            rows = db.execute(sql, (*params, limit)).fetchall()
+            gates = self._gates(db, [row["run_id"] for row in rows])
+        return [self._run_dict(row, gates.get(row["run_id"], {})) for row in rows]
+
+    def get(self, run_id: str) -> dict | None:
+        """One run with its gates, artifacts and indexed log."""
+        with self._lock:
+            db = self._conn()
+            row = db.execute("SELECT * FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            if row is None:
+                return None
+            run = self._run_dict(row, self._gates(db, [run_id]).get(run_id, {}))
+            run["artifacts"] = [
+                dict(a) for a in db.execute("SELECT name, path, size FROM artifacts WHERE run_id = ? ORDER BY name", (run_id,))
+            ]
+            log = db.execute("SELECT body FROM run_logs WHERE run_id = ?", (run_id,)).fetchone()
+        run["log"] = log["body"] if log else ""
+        return run
+
+    @staticmethod
+    def _gates(db: sqlite3.Connection, run_ids: list[str]) -> dict[str, dict]:
+        out = {}
+        for start in range(0, len(run_ids), 500):
+            chunk = run_ids[start : start + 500]
+            marks = ",".join("?" * len(chunk))
+            for g in db.execute(f"SELECT run_id, gate, passed, reason FROM gates WHERE run_id IN ({marks})", chunk):
+                out.setdefault(g["run_id"], {})[g["gate"]] = {"pass": bool(g["passed"]), "reason": g["reason"]}
+        return out
+
+    @staticmethod
+    def _run_dict(row: sqlite3.Row, gates: dict) -> dict:
+        run = dict(row)
+        run["stages"] = json.loads(run["stages"] or "{}")
+        run["duration"] = run["finished"] - run["started"] if run["finished"] else None
+        run["gates"] = gates
+        return run
@@ -0,0 +1,185 @@
+import fnmatch
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+from agent_studio.storage.patch import file_diff
+
+# Directory patterns end with "/" and match a directory name at any depth;
+# other patterns match the relative path or the file name.
+DEFAULT_IGNORE = [
+    ".agentstudio/",
+    ".git/",
+    ".venv/",
+    "venv/",
+    "node_modules/",
+    "__pycache__/",
+    ".pytest_cache/",
+    "runs/",
+    "agent_runs/",
+    "attachments/",
+    "outputs/",
+    "*.pyc",
+]
+MAX_TEXT_BYTES = 1_000_000
+BINARY_SNIFF_BYTES = 8192
+HASH_CHUNK_BYTES = 1 << 20
+RACY_SECONDS = 2.0
+
+
+class SnapshotEngine:
+    """Incremental, hash-based snapshots of a project tree.
+
+    Each scan records ``(size, mtime_ns, sha256)`` per file. Hashes are kept
+    between runs in ``.agentstudio/snapshot_manifest.json``, so only files
+    whose size or mtime changed are read again. Text files up to
+    ``max_text_bytes`` are stored once by hash in ``.agentstudio/objects/``.
+    That lets ``diff()`` show old content without keeping whole trees in
+    memory. Binary and oversized files are tracked by hash only.
+    """
+
+    def __init__(self, root: Path, ignore: list[str] | None = None, max_text_bytes: int = MAX_TEXT_BYTES):
+        self.root = Path(root)
+        self.meta_dir = self.root / ".agentstudio"
+        self.manifest_path = self.meta_dir / "snapshot_manifest.json"
+        self.objects_dir = self.meta_dir / "objects"
+        self.max_text_bytes = max_text_bytes
+        self.ignore = list(DEFAULT_IGNORE if ignore is None else ignore) + self._project_ignores()
+        self.dir_patterns = [p.rstrip("/") for p in self.ignore if p.endswith("/")]
+        self.file_patterns = [p for p in self.ignore if not p.endswith("/")]
+        # Files the last scan had to read and hash.
+        self.hashed = 0
+
+    def _project_ignores(self) -> list[str]:
+        path = self.meta_dir / "ignore"
+        if not path.exists():
+            return []
+        lines = path.read_text(encoding="utf-8", errors="ignore").splitlines()
+        return [line.strip() for line in lines if line.strip() and not line.startswith("#")]
+
+    def _dir_ignored(self, name: str) -> bool:
+        return any(fnmatch.fnmatch(name, p) for p in self.dir_patterns)
+
+    def _file_ignored(self, rel: str, name: str) -> bool:
+        return any(fnmatch.fnmatch(rel, p) or fnmatch.fnmatch(name, p) for p in self.file_patterns)
+
+    def _load_manifest(self) -> dict:
+        try:
+            return json.loads(self.manifest_path.read_text(encoding="utf-8")).get("files", {})
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self, entries: dict):
+        self.meta_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"version": 1, "files": entries}), encoding="utf-8")
+        os.replace(tmp, self.manifest_path)
+
+    def _object_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / digest
+
+    def _walk(self):
+        stack = [self.root]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if not self._dir_ignored(entry.name):
+                        stack.append(Path(entry.path))
+                elif entry.is_file(follow_symlinks=False):
+                    rel = Path(entry.path).relative_to(self.root).as_posix()
+                    if not self._file_ignored(rel, entry.name):
+                        yield rel, entry
+
+    def _hash_file(self, path: Path, size: int) -> tuple[str, bool]:
+        """Hash ``path`` in ``HASH_CHUNK_BYTES`` reads; text is kept only when its object is new."""
+        digest = hashlib.sha256()
+        binary = None
+        keep = size <= self.max_text_bytes
+        kept = []
+        with open(path, "rb") as fh:
+            while chunk := fh.read(HASH_CHUNK_BYTES):
+                if binary is None:
+                    binary = b"\0" in chunk[:BINARY_SNIFF_BYTES]
+                    keep = keep and not binary
+                digest.update(chunk)
+                if keep:
+                    kept.append(chunk)
+        digest = digest.hexdigest()
+        if keep:
+            obj = self._object_path(digest)
+            if not obj.exists():
+                obj.parent.mkdir(parents=True, exist_ok=True)
+                obj.write_bytes(b"".join(kept))
+        return digest, bool(binary)
+
+    def scan(self) -> dict[str, dict]:
+        previous = self._load_manifest()
+        entries = {}
+        self.hashed = 0
+        now_ns = time.time_ns()
+        for rel, entry in self._walk():
+            stat = entry.stat(follow_symlinks=False)
+            old = previous.get(rel)
+            if old and old["size"] == stat.st_size and old["mtime_ns"] == stat.st_mtime_ns:
+                entries[rel] = old
+                continue
+            digest, binary = self._hash_file(Path(entry.path), stat.st_size)
+            self.hashed += 1
+            # A file written in the same instant as the scan could change again without
+            # its mtime moving; record it as unknown so the next scan re-hashes it.
+            racy = now_ns - stat.st_mtime_ns < RACY_SECONDS * 1e9
+            entries[rel] = {
+                "size": stat.st_size,
+                "mtime_ns": -1 if racy else stat.st_mtime_ns,
+                "sha256": digest,
+                "binary": binary,
+            }
+        self._save_manifest(entries)
+        return entries
+
+    @staticmethod
+    def changed(before: dict[str, dict], after: dict[str, dict]) -> list[str]:
+        paths = set(before) | set(after)
+        return sorted(
+            rel for rel in paths
+            if (before.get(rel) or {}).get("sha256") != (after.get(rel) or {}).get("sha256")
+        )
+
+    def read_object(self, entry: dict | None) -> str | None:
+        if not entry:
+            return ""
+        obj = self._object_path(entry["sha256"])
+        if entry.get("binary") or not obj.exists():
+            return None
+        return obj.read_text(encoding="utf-8", errors="ignore")
+
+    def change_records(self, before: dict[str, dict], after: dict[str, dict]):
+        """Yield ``{path, old, new}`` records for changed files; text is read only for those."""
+        for rel in self.changed(before, after):
+            old, new = before.get(rel), after.get(rel)
+            yield {
+                "path": rel,
+                "old": self.read_object(old),
+                "new": self.read_object(new),
+                "old_sha256": old["sha256"] if old else None,
+                "new_sha256": new["sha256"] if new else None,
+            }
+
+    def diff(self, before: dict[str, dict], after: dict[str, dict]) -> str:
+        return "".join(line for change in self.change_records(before, after) for line in file_diff(change))
+
+    def prune_objects(self, *keep: dict[str, dict]):
+        wanted = {entry["sha256"] for entries in keep for entry in entries.values()}
+        if not self.objects_dir.exists():
+            return
+        for obj in self.objects_dir.glob("*/*"):
+            if obj.name not in wanted:
+                obj.unlink(missing_ok=True)
@@ -0,0 +1,140 @@
+"""End-to-end StudioOrchestrator.run benchmark on synthetic projects, against the fake Ollama.
+
+Each size gets a generated project (``src/app`` modules importing each other
+plus ``tests/test_*.py``); the fake model answers every patch request with a
+one-file patch to a leaf module that has a test, so a run goes through plan
+parsing, the build snapshot, test impact and one targeted pytest call. The first
+run per size is reported separately as ``pipeline.run_cold[N]`` (empty snapshot
+and import-graph caches).
+
+The stock ``BuilderAgent`` generates and applies the patch
+(``propose_patch``/``apply_patch_plan``); ``--stream-patch`` runs the
+orchestrator's streamed build instead (``pipeline.stream_run[N]``). Run from
+the repo root:
+    python bench/bench_pipeline.py
+    python bench/bench_pipeline.py --sizes 100 1000 --runs 20 --save-baseline
+    python bench/bench_pipeline.py --stream-patch
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agent_studio.llm.ollama_client import OllamaClient  # noqa: E402
+from agent_studio.orchestrator import StudioOrchestrator  # noqa: E402
+from agent_studio.storage.project_store import ProjectStore  # noqa: E402
+from fake_ollama import FakeConfig, FakeOllama  # noqa: E402
+from harness import add_baseline_args, finish, run_concurrent, summarize  # noqa: E402
+
+PLAN = "1. Bump the VERSION constant in the newest tested module.\n2. Run its tests."
+TESTS_EVERY = 10
+
+
+def module_source(i: int, version: int = 0) -> str:
+    # Module i imports module i // 2, so the import graph is a binary tree rooted at mod_0000.
+    parent = f"from app import mod_{i // 2:04d}\n\n" if i else ""
+    return f'{parent}VERSION = {version}\n\n\ndef value():\n    return {i} + VERSION\n'
+
+
+def test_source(i: int) -> str:
+    return f"from app import mod_{i:04d}\n\n\ndef test_value():\n    assert mod_{i:04d}.value() >= {i}\n"
+
+
+def make_project(root: Path, n_files: int) -> int:
+    """Write about ``n_files`` files; returns the index of the module the fake patch edits."""
+    modules = max(TESTS_EVERY, n_files * TESTS_EVERY // (TESTS_EVERY + 1))
+    pkg = root / "src" / "app"
+    pkg.mkdir(parents=True, exist_ok=True)
+    (pkg / "__init__.py").write_text("", encoding="utf-8")
+    (root / "pytest.ini").write_text("[pytest]\npythonpath = src\n", encoding="utf-8")
+    for i in range(modules):
+        (pkg / f"mod_{i:04d}.py").write_text(module_source(i), encoding="utf-8")
+        if i % TESTS_EVERY == 0:
+            (root / "tests" / f"test_mod_{i:04d}.py").write_text(test_source(i), encoding="utf-8")
+    # The last tested module is in the second half, so nothing imports it and one test file is affected.
+    return (modules - 1) // TESTS_EVERY * TESTS_EVERY
+
+
+def patch_reply(target: int):
+    versions = itertools.count(1)
+
+    def reply(path: str, body: dict) -> str:
+        if body.get("format") is None:
+            return "Benchmark run finished."
+        return json.dumps({
+            "summary": f"Bump mod_{target:04d} VERSION.",
+            "files": [{"path": f"src/app/mod_{target:04d}.py", "content": module_source(target, next(versions))}],
+        })
+
+    return reply
+
+
+def bench_size(fake: FakeOllama, store: ProjectStore, n_files: int, runs: int, stream_patch: bool = False) -> tuple[dict, dict]:
+    project = f"synthetic_{n_files}"
+    root = store.ensure_project(project)
+    target = make_project(root, n_files)
+    fake.config.reply = patch_reply(target)
+
+    orchestrator = StudioOrchestrator(llm=OllamaClient(fake.base_url, timeout=60), store=store, stream_patch=stream_patch)
+    stages: list[dict] = []
+
+    def call(_w: int, _i: int) -> None:
+        result = orchestrator.run(
+            project,
+            PLAN,
+            confirm_overwrite=lambda *_: True,
+            confirm_command=lambda _cmd: True,
+            log=lambda _msg: None,
+        )
+        summary = json.loads((Path(result["run_dir"]) / "metrics.json").read_text(encoding="utf-8"))["summary"]
+        stages.append({name: s["seconds"] for name, s in summary["stages"].items()})
+        if not result["ok"]:
+            raise RuntimeError(result["message"])
+
+    cold = summarize(*run_concurrent(call, 1, 1))
+    warm = summarize(*run_concurrent(call, 1, runs))
+    # Mean seconds per stage over the warm runs.
+    warm_stages = stages[1:]
+    breakdown = {
+        name: round(sum(s.get(name, 0.0) for s in warm_stages) / len(warm_stages), 3)
+        for name in dict.fromkeys(k for s in warm_stages for k in s)
+    } if warm_stages else {}
+    name = "pipeline.stream_run" if stream_patch else "pipeline.run"
+    return {f"{name}_cold[{n_files}]": cold, f"{name}[{n_files}]": warm}, breakdown
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="StudioOrchestrator.run benchmark against a fake Ollama.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000], help="files per synthetic project")
+    parser.add_argument("--runs", type=int, default=20, help="warm runs per size")
+    parser.add_argument("--stream-patch", action="store_true", help="build with BuilderAgent.stream_patch instead of propose_patch/apply_patch_plan")
+    parser.add_argument("--tokens-per-second", type=float, default=500.0)
+    parser.add_argument("--first-token-latency", type=float, default=0.05)
+    parser.add_argument("--keep", type=Path, help="build the projects here and keep them, instead of a temp dir")
+    add_baseline_args(parser)
+    args = parser.parse_args()
+
+    config = FakeConfig(tokens_per_second=args.tokens_per_second, first_token_latency=args.first_token_latency)
+    results = {}
+    breakdowns = {}
+    with tempfile.TemporaryDirectory(prefix="bench_pipeline_") as tmp, FakeOllama(config=config) as fake:
+        store = ProjectStore(str(args.keep or tmp))
+        for n in args.sizes:
+            scenario, breakdowns[n] = bench_size(fake, store, n, args.runs, args.stream_patch)
+            results.update(scenario)
+
+    print("Mean stage seconds (warm runs):")
+    for n, stages in breakdowns.items():
+        print(f"  {n:>6} files: " + ", ".join(f"{name} {sec:.3f}" for name, sec in stages.items()))
+    print()
+    return finish(results, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""Micro-benchmark: per-term substring scans vs. the compiled SafetyMatcher.
+
+Also prints how both classify a table of boundary cases, so behaviour changes
+in the matcher show up next to the speed numbers. Run from the repo root:
+    python bench/bench_safety_filter.py
+"""
+from __future__ import annotations
+
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "server"))
+
+from core import ALLOWED_TOPICS, DISALLOWED_AREAS, HARMFUL_KEYWORDS, SAFETY_MATCHER, normalize_text  # noqa: E402
+
+FILLER = (
+    "my grandson says the new chatbot can write letters but i worry about privacy "
+    "and whether a voice message could be fake again and again "
+).split()
+
+
+def naive_filter(text: str) -> tuple[bool, bool, int]:
+    # The pre-matcher algorithm: three substring sweeps plus a topic count.
+    words = set(text.split())
+    harmful = any(term in text for term in HARMFUL_KEYWORDS)
+    disallowed = any(term in text for term in DISALLOWED_AREAS)
+    score = sum(1 for term in ALLOWED_TOPICS if term in words or term in text)
+    return harmful, disallowed, score
+
+
+# (question, verdict the matcher should give); the substring column shows the old behaviour.
+CASES = [
+    ("how do i make a cyberweapon", "harmful"),
+    ("install antimalware on my ai laptop", "harmful"),
+    ("how do i hack my neighbour's wifi", "harmful"),
+    ("what is phishing and how do i spot it", "allowed"),
+    ("teach me how to phish my friends", "harmful"),
+    ("should i see a doctor about my cough", "disallowed"),
+    ("is buying cryptocurrency a scam", "disallowed"),
+    ("be courteous to the ai chatbot", "allowed"),
+    ("the contractor used an ai model to write the quote", "allowed"),
+    ("my lawyers said an ai wrote the letter", "disallowed"),
+    ("can you explain it again and again", "off-topic"),
+    ("what is a deepfake voice message", "allowed"),
+]
+
+
+def verdict(harmful: bool, disallowed: bool, allowed: int) -> str:
+    return "harmful" if harmful else "disallowed" if disallowed else "allowed" if allowed else "off-topic"
+
+
+def print_cases() -> None:
+    print(f"{'question':<54} {'substring':>10} {'matcher':>10}")
+    for question, expected in CASES:
+        before = verdict(*naive_filter(question))
+        after = verdict(*compiled_filter(question))
+        flag = "" if after == expected else "  UNEXPECTED"
+        print(f"{question:<54} {before:>10} {after:>10}{flag}")
+    print()
+
+
+def compiled_filter(text: str) -> tuple[bool, bool, int]:
+    hits = SAFETY_MATCHER.scan(text)
+    return bool(hits["harmful"]), bool(hits["disallowed"]), len(hits["allowed"])
+
+
+def make_text(n_chars: int, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    words = []
+    size = 0
+    while size < n_chars:
+        word = rng.choice(FILLER)
+        words.append(word)
+        size += len(word) + 1
+    return normalize_text(" ".join(words))
+
+
+def measure(fn, text: str, min_seconds: float = 0.5) -> float:
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        fn(text)
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return calls / elapsed
+
+
+def main() -> None:
+    print_cases()
+    print(f"{'chars':>8} {'naive calls/s':>15} {'compiled calls/s':>17} {'compiled MB/s':>14} {'speedup':>8}")
+    for n_chars in (200, 2_000, 20_000, 200_000):
+        text = make_text(n_chars)
+        naive = measure(naive_filter, text)
+        compiled = measure(compiled_filter, text)
+        mb_per_s = compiled * len(text.encode("utf-8")) / 1_000_000
+        print(f"{n_chars:>8} {naive:>15.0f} {compiled:>17.0f} {mb_per_s:>14.1f} {compiled / naive:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Load benchmark for the Seniors server against the fake Ollama.
+
+Scenarios: N concurrent seniors asking through /api/ask, time to first token
+on /api/ask/stream, core.answer_question called directly, and lesson-list
+polling with ETags. Run from the repo root:
+    python bench/bench_seniors.py
+    python bench/bench_seniors.py --seniors 1 8 32 --save-baseline
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+import threading
+import time
+from pathlib import Path
+
+import requests
+from werkzeug.serving import make_server
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "server"))
+
+import app as seniors_app  # noqa: E402
+import core  # noqa: E402
+from fake_ollama import FakeConfig, FakeOllama  # noqa: E402
+from harness import add_baseline_args, finish, run_concurrent, summarize  # noqa: E402
+
+QUESTIONS = [
+    "How can I tell if a phone call is a scam?",
+    "Is it safe to share my photos with an AI chatbot?",
+    "What is a deepfake voice message?",
+    "How do I keep my data private when using AI?",
+    "Can an AI model make mistakes about the news?",
+    "What should I do if a video call from my grandson seems fake?",
+]
+
+
+def question(worker: int, i: int) -> str:
+    # Distinct text per request, so single-flight coalescing and the cache stay out of the numbers.
+    return f"{QUESTIONS[(worker + i) % len(QUESTIONS)]} (senior {worker}, question {i})"
+
+
+def point_at(fake: FakeOllama, cache: bool) -> None:
+    chat_url = fake.url("/api/chat")
+    core.OLLAMA_CHAT_URL = chat_url
+    core.OLLAMA_EMBED_URL = fake.url("/api/embeddings")
+    core.PROMPT_SESSIONS.chat_url = chat_url
+    core.CACHE_ENABLED = cache
+    seniors_app.OLLAMA_CHAT_URL = chat_url
+
+
+class Server:
+    """The Flask app on a threaded werkzeug server in the background."""
+
+    def __init__(self) -> None:
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        self._server = make_server("127.0.0.1", 0, seniors_app.app, threaded=True)
+        self.base_url = f"http://127.0.0.1:{self._server.server_port}"
+        threading.Thread(target=self._server.serve_forever, name="seniors-app", daemon=True).start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+
+
+def session_for(local: threading.local) -> requests.Session:
+    if not hasattr(local, "session"):
+        local.session = requests.Session()
+    return local.session
+
+
+def bench_ask(server: Server, seniors: int, per_senior: int) -> dict:
+    local = threading.local()
+
+    def call(w: int, i: int) -> None:
+        response = session_for(local).post(f"{server.base_url}/api/ask", json={"question": question(w, i)}, timeout=120)
+        response.raise_for_status()
+        if "unavailable" in response.json()["answer"]:
+            raise RuntimeError("model unavailable")
+
+    return summarize(*run_concurrent(call, seniors, per_senior))
+
+
+def bench_ask_stream(server: Server, seniors: int, per_senior: int) -> dict:
+    """Latency here is time to the first streamed token."""
+    local = threading.local()
+
+    def call(w: int, i: int) -> float:
+        started = time.perf_counter()
+        first = None
+        with session_for(local).post(
+            f"{server.base_url}/api/ask/stream", json={"question": question(w, i)}, stream=True, timeout=120
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line.startswith(b"event: error"):
+                    raise RuntimeError("model unavailable")
+                if first is None and line.startswith(b"data:"):
+                    first = time.perf_counter() - started
+        return first if first is not None else time.perf_counter() - started
+
+    return summarize(*run_concurrent(call, seniors, per_senior))
+
+
+def bench_core(seniors: int, per_senior: int) -> dict:
+    def call(w: int, i: int) -> None:
+        answer = core.answer_question(question(w, i))
+        if answer == core.MODEL_UNAVAILABLE:
+            raise RuntimeError("model unavailable")
+
+    return summarize(*run_concurrent(call, seniors, per_senior))
+
+
+def bench_lessons(server: Server, clients: int, polls: int) -> dict:
+    local = threading.local()
+
+    def call(w: int, i: int) -> None:
+        headers = {"If-None-Match": local.etag} if getattr(local, "etag", None) else {}
+        response = session_for(local).get(f"{server.base_url}/api/lessons", headers=headers, timeout=30)
+        if response.status_code not in (200, 304):
+            raise RuntimeError(response.status_code)
+        local.etag = response.headers.get("ETag", getattr(local, "etag", None))
+
+    return summarize(*run_concurrent(call, clients, polls))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Seniors server load benchmark against a fake Ollama.")
+    parser.add_argument("--seniors", type=int, nargs="+", default=[1, 8, 32], help="concurrency levels")
+    parser.add_argument("--questions", type=int, default=20, help="questions per senior")
+    parser.add_argument("--polls", type=int, default=200, help="lesson-list polls per client")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--first-token-latency", type=float, default=0.05)
+    parser.add_argument("--response-tokens", type=int, default=40)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--cache", action="store_true", help="keep the response cache on (off by default)")
+    add_baseline_args(parser)
+    args = parser.parse_args()
+
+    config = FakeConfig(
+        tokens_per_second=args.tokens_per_second,
+        first_token_latency=args.first_token_latency,
+        response_tokens=args.response_tokens,
+        error_rate=args.error_rate,
+    )
+    results = {}
+    with FakeOllama(config=config) as fake:
+        point_at(fake, args.cache)
+        server = Server()
+        try:
+            for n in args.seniors:
+                results[f"seniors.ask[{n}]"] = bench_ask(server, n, args.questions)
+                results[f"seniors.ask_stream_ttft[{n}]"] = bench_ask_stream(server, n, args.questions)
+                results[f"seniors.core_answer[{n}]"] = bench_core(n, args.questions)
+                results[f"seniors.lessons_poll[{n}]"] = bench_lessons(server, n, args.polls)
+        finally:
+            server.stop()
+    return finish(results, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,271 @@
+"""Local stand-in for the Ollama HTTP API, for benchmarks without a real model.
+
+Serves /api/chat, /api/generate (streamed as NDJSON or not), /api/tags and
+/api/embeddings with a configurable token rate, first-token latency and
+injected failures. Run from the repo root to point an app at it by hand:
+    python bench/fake_ollama.py --port 11434 --tokens-per-second 30
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+DEFAULT_MODELS = ("qwen2.5:7b", "qwen2.5:1.5b", "llama3.2:3b", "llama3.1:8b")
+WORDS = (
+    "a scam caller may pretend to be family so hang up and call them back on a number you trust "
+    "never share codes or passwords and ask someone you know before you send money"
+).split()
+EMBED_DIM = 64
+
+# reply(path, request_body) -> full response text; streamed word by word.
+Reply = Callable[[str, dict], str]
+
+
+@dataclass
+class FakeConfig:
+    tokens_per_second: float = 50.0
+    first_token_latency: float = 0.05
+    response_tokens: int = 40
+    error_rate: float = 0.0
+    error_status: int = 500
+    drop_rate: float = 0.0
+    models: tuple[str, ...] = DEFAULT_MODELS
+    seed: int = 0
+    reply: Optional[Reply] = None
+
+
+@dataclass
+class FakeStats:
+    requests: int = 0
+    errors: int = 0
+    drops: int = 0
+    tokens: int = 0
+    by_path: dict[str, int] = field(default_factory=dict)
+
+
+def schema_instance(schema: dict | str | None):
+    """Smallest value matching a JSON schema (required keys only), for ``format`` requests."""
+    if not isinstance(schema, dict):
+        return {}
+    kind = schema.get("type")
+    if kind == "object":
+        props = schema.get("properties", {})
+        return {key: schema_instance(props.get(key)) for key in schema.get("required", [])}
+    if kind == "array":
+        return []
+    if kind == "boolean":
+        return True
+    if kind in ("integer", "number"):
+        return 0
+    return "ok"
+
+
+def default_reply(path: str, body: dict, n_tokens: int) -> str:
+    if body.get("format") is not None:
+        return json.dumps(schema_instance(body["format"]))
+    return " ".join(WORDS[i % len(WORDS)] for i in range(n_tokens))
+
+
+def split_tokens(text: str) -> list[str]:
+    # Word-sized pieces that join back to the exact text (JSON replies included).
+    pieces = text.split(" ")
+    return [p + " " for p in pieces[:-1]] + [pieces[-1]] if text else []
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address) -> None:
+        # Clients dropping keep-alive or cancelled streams is expected under load.
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class FakeOllama:
+    """Threaded fake Ollama server; use as a context manager or call start()/stop()."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, config: Optional[FakeConfig] = None) -> None:
+        self.config = config or FakeConfig()
+        self.stats = FakeStats()
+        self._lock = threading.Lock()
+        self._rng = random.Random(self.config.seed)
+        self._server = _Server((host, port), self._handler())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, path: str) -> str:
+        return self.base_url + path
+
+    def start(self) -> "FakeOllama":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeOllama":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _roll(self, rate: float) -> bool:
+        if rate <= 0:
+            return False
+        with self._lock:
+            return self._rng.random() < rate
+
+    def _count(self, path: str, **extra: int) -> None:
+        with self._lock:
+            self.stats.requests += 1
+            self.stats.by_path[path] = self.stats.by_path.get(path, 0) + 1
+            for key, value in extra.items():
+                setattr(self.stats, key, getattr(self.stats, key) + value)
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def _json(self, status: int, payload: dict) -> None:
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _chunk(self, payload: dict) -> None:
+                data = (json.dumps(payload) + "\n").encode("utf-8")
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            def do_GET(self) -> None:
+                if self.path == "/api/tags":
+                    fake._count(self.path)
+                    self._json(200, {"models": [{"name": name} for name in fake.config.models]})
+                else:
+                    self._json(404, {"error": "not found"})
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                cfg = fake.config
+                if fake._roll(cfg.error_rate):
+                    fake._count(self.path, errors=1)
+                    self._json(cfg.error_status, {"error": "injected failure"})
+                    return
+                if self.path == "/api/embeddings":
+                    fake._count(self.path)
+                    digest = hashlib.sha256(str(body.get("prompt", "")).encode("utf-8")).digest()
+                    vector = [(digest[i % len(digest)] - 128) / 128 for i in range(EMBED_DIM)]
+                    self._json(200, {"embedding": vector})
+                    return
+                if self.path not in ("/api/chat", "/api/generate"):
+                    self._json(404, {"error": "not found"})
+                    return
+                if self.path == "/api/generate" and "prompt" not in body:
+                    fake._count(self.path)  # model load / keep_alive ping
+                    self._json(200, {"model": body.get("model"), "response": "", "done": True})
+                    return
+                self._generate(body)
+
+            def _generate(self, body: dict) -> None:
+                cfg = fake.config
+                chat = self.path == "/api/chat"
+                prompt = json.dumps(body.get("messages")) if chat else str(body.get("prompt", ""))
+                text = cfg.reply(self.path, body) if cfg.reply else default_reply(self.path, body, cfg.response_tokens)
+                pieces = split_tokens(text)
+                per_token = 1.0 / cfg.tokens_per_second if cfg.tokens_per_second > 0 else 0.0
+                drop = fake._roll(cfg.drop_rate)
+                fake._count(self.path, tokens=len(pieces), drops=int(drop))
+                final = {
+                    "model": body.get("model"),
+                    "done": True,
+                    "prompt_eval_count": max(1, len(prompt) // 4),
+                    "prompt_eval_duration": int(cfg.first_token_latency * 1e9),
+                    "eval_count": len(pieces),
+                    "eval_duration": int(len(pieces) * per_token * 1e9),
+                    "load_duration": 0,
+                }
+
+                time.sleep(cfg.first_token_latency)
+                if not body.get("stream", True):
+                    time.sleep(len(pieces) * per_token)
+                    if drop:
+                        self.close_connection = True
+                        return
+                    final["message" if chat else "response"] = {"role": "assistant", "content": text} if chat else text
+                    self._json(200, final)
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for i, piece in enumerate(pieces):
+                    if drop and i >= len(pieces) // 2:
+                        self.close_connection = True
+                        return
+                    chunk = {"model": body.get("model"), "done": False}
+                    if chat:
+                        chunk["message"] = {"role": "assistant", "content": piece}
+                    else:
+                        chunk["response"] = piece
+                    self._chunk(chunk)
+                    if per_token:
+                        time.sleep(per_token)
+                final["message" if chat else "response"] = {"role": "assistant", "content": ""} if chat else ""
+                self._chunk(final)
+                self.wfile.write(b"0\r\n\r\n")
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--first-token-latency", type=float, default=0.05)
+    parser.add_argument("--response-tokens", type=int, default=40)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    config = FakeConfig(
+        tokens_per_second=args.tokens_per_second,
+        first_token_latency=args.first_token_latency,
+        response_tokens=args.response_tokens,
+        error_rate=args.error_rate,
+        drop_rate=args.drop_rate,
+    )
+    fake = FakeOllama(args.host, args.port, config)
+    print(f"Fake Ollama on {fake.base_url} (Ctrl+C to stop)")
+    try:
+        fake._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        fake._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
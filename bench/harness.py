@@ -0,0 +1,161 @@
+"""Shared helpers for the benchmark scripts: load generation, percentiles and baselines."""
+from __future__ import annotations
+
+import json
+import platform
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+BENCH_DIR = Path(__file__).resolve().parent
+BASELINE_PATH = BENCH_DIR / "baseline.json"
+DEFAULT_TOLERANCE = 0.20
+# Below this many samples p95 is effectively the maximum, so the gate uses p50 instead.
+MIN_P95_SAMPLES = 20
+# Scenarios with fewer samples (e.g. the single cold pipeline run) are shown but never gated.
+MIN_GATED_SAMPLES = 5
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Linear-interpolated percentile of already sorted values (``q`` in 0..100)."""
+    if not sorted_values:
+        return 0.0
+    pos = (len(sorted_values) - 1) * q / 100
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+def summarize(latencies: list[float], errors: int, wall: float, **extra) -> dict:
+    values = sorted(latencies)
+    result = {
+        "requests": len(values) + errors,
+        "errors": errors,
+        "rps": round(len(values) / wall, 2) if wall else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p95_ms": round(percentile(values, 95) * 1000, 2),
+        "p99_ms": round(percentile(values, 99) * 1000, 2),
+        "max_ms": round(values[-1] * 1000, 2) if values else 0.0,
+    }
+    result.update(extra)
+    return result
+
+
+def run_concurrent(
+    call: Callable[[int, int], Optional[float]],
+    workers: int,
+    per_worker: int,
+) -> tuple[list[float], int, float]:
+    """Run ``call(worker, i)`` ``per_worker`` times on each of ``workers`` threads.
+
+    ``call`` may return its own latency (e.g. time to first token); otherwise
+    its wall time is used. Exceptions count as errors. Returns
+    ``(latencies, errors, wall_seconds)``.
+    """
+    latencies: list[float] = []
+    errors = 0
+    lock = threading.Lock()
+    start_line = threading.Barrier(workers + 1)
+
+    def worker(w: int) -> None:
+        nonlocal errors
+        start_line.wait()
+        for i in range(per_worker):
+            started = time.perf_counter()
+            try:
+                measured = call(w, i)
+            except Exception:
+                with lock:
+                    errors += 1
+                continue
+            elapsed = time.perf_counter() - started if measured is None else measured
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=worker, args=(w,), daemon=True) for w in range(workers)]
+    for t in threads:
+        t.start()
+    start_line.wait()
+    started = time.perf_counter()
+    for t in threads:
+        t.join()
+    return latencies, errors, time.perf_counter() - started
+
+
+def print_table(results: dict[str, dict]) -> None:
+    print(f"{'scenario':<34} {'reqs':>6} {'err':>4} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, r in results.items():
+        print(
+            f"{name:<34} {r['requests']:>6} {r['errors']:>4} {r['rps']:>9.2f} "
+            f"{r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f}"
+        )
+
+
+def load_baseline(path: Path = BASELINE_PATH) -> dict[str, dict]:
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8")).get("results", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def save_baseline(results: dict[str, dict], path: Path = BASELINE_PATH) -> None:
+    """Merge ``results`` into the baseline file; scenarios not run keep their old numbers."""
+    merged = load_baseline(path)
+    merged.update(results)
+    payload = {
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpu": platform.processor()},
+        "saved": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "results": dict(sorted(merged.items())),
+    }
+    Path(path).write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict], tolerance: float = DEFAULT_TOLERANCE) -> bool:
+    """Print latency and req/s against the baseline; returns True when something regressed past ``tolerance``.
+
+    Latency is compared at p95 when both sides have ``MIN_P95_SAMPLES``
+    samples and at p50 otherwise; scenarios under ``MIN_GATED_SAMPLES`` are
+    reported without failing the run.
+    """
+    regressed = False
+    print(f"\n{'scenario':<34} {'stat':>4} {'ms':>9} {'base':>9} {'change':>8} {'req/s':>9} {'base':>9} {'change':>8}")
+    for name, r in results.items():
+        base = baseline.get(name)
+        if not base:
+            print(f"{name:<34} {'p95':>4} {r['p95_ms']:>9.1f} {'-':>9} {'new':>8} {r['rps']:>9.2f} {'-':>9} {'new':>8}")
+            continue
+        samples = min(r["requests"], base["requests"])
+        stat = "p95" if samples >= MIN_P95_SAMPLES else "p50"
+        ms, base_ms = r[f"{stat}_ms"], base[f"{stat}_ms"]
+        ms_change = (ms - base_ms) / base_ms if base_ms else 0.0
+        rps_change = (r["rps"] - base["rps"]) / base["rps"] if base["rps"] else 0.0
+        gated = samples >= MIN_GATED_SAMPLES
+        bad = gated and (ms_change > tolerance or rps_change < -tolerance)
+        regressed = regressed or bad
+        note = "  REGRESSION" if bad else "" if gated else f"  (not gated: {samples} samples)"
+        print(
+            f"{name:<34} {stat:>4} {ms:>9.1f} {base_ms:>9.1f} {ms_change:>+8.0%} "
+            f"{r['rps']:>9.2f} {base['rps']:>9.2f} {rps_change:>+8.0%}{note}"
+        )
+    return regressed
+
+
+def finish(results: dict[str, dict], args) -> int:
+    """Common tail of the bench scripts: table, baseline comparison or update, exit code."""
+    print_table(results)
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        print(f"\nBaseline updated: {args.baseline}")
+        return 0
+    baseline = load_baseline(args.baseline)
+    if not baseline:
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to record one.")
+        return 0
+    return 1 if compare(results, baseline, args.tolerance) else 0
+
+
+def add_baseline_args(parser) -> None:
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="allowed latency/req/s change (0.2 = 20%%)")
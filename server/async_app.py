@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from email.utils import formatdate
+from pathlib import Path
+
+import aiohttp
+from aiohttp import web
+
+from core import (
+    LESSON_CATALOG,
+    OLLAMA_CHAT_URL,
+    PROMPT_SESSIONS,
+    WEB_DIR,
+    WEB_SYSTEM_PROMPT,
+    chat_text,
+    sse_event,
+    web_build_messages as build_messages,
+    web_flight_key as flight_key,
+    web_precheck as precheck,
+    web_unavailable_message as model_unavailable_message,
+)
+from http_pool import CONNECT_TIMEOUT, POOL_SIZE
+from singleflight import AsyncSingleFlight
+
+MAX_IN_FLIGHT = 2
+MAX_WAITING = 16
+RETRY_AFTER_SECONDS = 15
+GENERATION_TIMEOUT = 90
+# Streams have no overall deadline, only a limit on the silence between chunks.
+STREAM_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=CONNECT_TIMEOUT, sock_read=GENERATION_TIMEOUT)
+
+
+class ServerBusy(Exception):
+    pass
+
+
+class GenerationGate:
+    """Bounded in-flight generations plus a bounded wait queue.
+
+    Callers beyond ``max_in_flight + max_waiting`` are rejected at once
+    instead of piling up behind slow generations.
+    """
+
+    def __init__(self, max_in_flight: int = MAX_IN_FLIGHT, max_waiting: int = MAX_WAITING) -> None:
+        self.max_waiting = max_waiting
+        self.waiting = 0
+        self._slots = asyncio.Semaphore(max_in_flight)
+
+    async def __aenter__(self) -> "GenerationGate":
+        if self._slots.locked() and self.waiting >= self.max_waiting:
+            raise ServerBusy()
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._slots.release()
+
+
+def busy_response() -> web.Response:
+    return web.json_response(
+        {"answer": "Many people are asking right now. Please try again in a moment."},
+        status=503,
+        headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+    )
+
+
+async def ollama_generate(session: aiohttp.ClientSession, user_input: str) -> str:
+    payload = PROMPT_SESSIONS.payload(build_messages(user_input))
+    async with session.post(OLLAMA_CHAT_URL, json=payload) as response:
+        response.raise_for_status()
+        data = await response.json()
+    return chat_text(data).strip() or "I could not generate a response right now."
+
+
+async def ollama_stream(session: aiohttp.ClientSession, user_input: str):
+    payload = PROMPT_SESSIONS.payload(build_messages(user_input), stream=True)
+    async with session.post(OLLAMA_CHAT_URL, json=payload, timeout=STREAM_TIMEOUT) as response:
+        response.raise_for_status()
+        async for line in response.content:
+            if not line.strip():
+                continue
+            chunk = json.loads(line)
+            if chunk.get("error"):
+                raise aiohttp.ClientError(chunk["error"])
+            token = chat_text(chunk)
+            if token:
+                yield token
+            if chunk.get("done"):
+                break
+
+
+async def read_question(request: web.Request) -> str:
+    try:
+        payload = await request.json()
+    except (ValueError, aiohttp.ContentTypeError):
+        payload = {}
+    if not isinstance(payload, dict):
+        payload = {}
+    return str(payload.get("question", "")).strip()
+
+
+async def index(_request: web.Request) -> web.FileResponse:
+    return web.FileResponse(WEB_DIR / "index.html")
+
+
+def conditional(request: web.Request, response: web.Response, etag: str, last_modified: float) -> web.Response:
+    headers = {"ETag": f'"{etag}"', "Cache-Control": "no-cache"}
+    if last_modified:
+        headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+    wanted = {tag.strip().removeprefix("W/").strip('"') for tag in request.headers.get("If-None-Match", "").split(",")}
+    if etag in wanted:
+        return web.Response(status=304, headers=headers)
+    response.headers.update(headers)
+    return response
+
+
+async def list_lessons(request: web.Request) -> web.Response:
+    catalog = await asyncio.to_thread(LESSON_CATALOG.snapshot)
+    lessons = catalog.lessons
+    response = web.json_response({"lessons": [lesson.name for lesson in lessons], "details": [lesson.meta() for lesson in lessons]})
+    return conditional(request, response, catalog.listing_etag, catalog.last_modified)
+
+
+async def get_lesson(request: web.Request) -> web.Response:
+    lesson = await asyncio.to_thread(LESSON_CATALOG.get, Path(request.match_info["lesson_name"]).name)
+    if lesson is None:
+        raise web.HTTPNotFound()
+    body, encoding, etag = lesson.encoded(request.headers.get("Accept-Encoding", ""))
+    response = web.Response(body=body, content_type="text/markdown", charset="utf-8", headers={"Vary": "Accept-Encoding"})
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    return conditional(request, response, etag, lesson.mtime)
+
+
+async def ask(request: web.Request) -> web.Response:
+    user_input = await read_question(request)
+    blocked = precheck(user_input)
+    if blocked:
+        return web.json_response({"answer": blocked})
+
+    async def generate() -> str:
+        async with request.app["gate"]:
+            return await ollama_generate(request.app["ollama"], user_input)
+
+    try:
+        answer = await request.app["flight"].do(flight_key(user_input), generate)
+    except ServerBusy:
+        return busy_response()
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        answer = model_unavailable_message()
+    return web.json_response({"answer": answer})
+
+
+async def ask_stream(request: web.Request) -> web.StreamResponse:
+    user_input = await read_question(request)
+    blocked = precheck(user_input)
+    gate: GenerationGate = request.app["gate"]
+
+    async def open_stream() -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+        return response
+
+    if blocked:
+        response = await open_stream()
+        await response.write(sse_event({"token": blocked}).encode("utf-8"))
+        await response.write(sse_event({"ok": False}, event="done").encode("utf-8"))
+        return response
+
+    try:
+        async with gate:
+            response = await open_stream()
+            ok = True
+            try:
+                async for token in ollama_stream(request.app["ollama"], user_input):
+                    await response.write(sse_event({"token": token}).encode("utf-8"))
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+                ok = False
+                await response.write(sse_event({"error": model_unavailable_message()}, event="error").encode("utf-8"))
+            await response.write(sse_event({"ok": ok}, event="done").encode("utf-8"))
+            return response
+    except ServerBusy:
+        return busy_response()
+
+
+async def open_ollama_session(app: web.Application):
+    timeout = aiohttp.ClientTimeout(total=GENERATION_TIMEOUT, connect=CONNECT_TIMEOUT)
+    connector = aiohttp.TCPConnector(limit=POOL_SIZE)
+    app["ollama"] = aiohttp.ClientSession(timeout=timeout, connector=connector)
+    yield
+    await app["ollama"].close()
+
+
+def create_app(max_in_flight: int = MAX_IN_FLIGHT, max_waiting: int = MAX_WAITING) -> web.Application:
+    app = web.Application()
+    app["gate"] = GenerationGate(max_in_flight, max_waiting)
+    app["flight"] = AsyncSingleFlight()
+    app.cleanup_ctx.append(open_ollama_session)
+    app.router.add_get("/", index)
+    app.router.add_get("/api/lessons", list_lessons)
+    app.router.add_get("/api/lessons/{lesson_name:.+}", get_lesson)
+    app.router.add_post("/api/ask", ask)
+    app.router.add_post("/api/ask/stream", ask_stream)
+    app.router.add_static("/", WEB_DIR, show_index=False)
+    return app
+
+
+def main(host: str = "127.0.0.1", port: int = 5000) -> None:
+    PROMPT_SESSIONS.warm_in_background([WEB_SYSTEM_PROMPT])
+    web.run_app(create_app(), host=host, port=port)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,35 @@
 from __future__ import annotations
 
+import hashlib
+import json
 from pathlib import Path
 import re
-from typing import Optional
+import socket
+import threading
+from typing import Iterator, Optional
 
 import requests
 
+from http_pool import get_session, request_timeout, watch_sockets
+from lesson_catalog import LessonCatalog
+from prompt_session import KEEP_ALIVE, PromptSessionManager
+from response_cache import ResponseCache
+from retrieval import LessonIndex, format_context, hashing_embedder, ollama_embedder
+from safety_filter import INFIX, WORD, SafetyMatcher
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 LESSONS_DIR = BASE_DIR / "lessons"
-OLLAMA_URL = "http://127.0.0.1:11434/api/generate"
+WEB_DIR = BASE_DIR / "web"
+OLLAMA_CHAT_URL = "http://127.0.0.1:11434/api/chat"
 MODEL_NAME = "qwen2.5:7b"
+CACHE_PATH = BASE_DIR / ".cache" / "seniors_responses.sqlite3"
+CACHE_ENABLED = True
+CACHE_FUZZY = False  # also serve near-duplicate questions from the cache
+OLLAMA_EMBED_URL = "http://127.0.0.1:11434/api/embeddings"
+EMBED_MODEL: Optional[str] = None  # e.g. "nomic-embed-text"; None uses the local hashing vectorizer
+INDEX_DIR = BASE_DIR / ".cache" / "lesson_index"
+RETRIEVAL_ENABLED = True
+RETRIEVAL_TOP_K = 3
 
 SUPPORTED_LANGUAGES = {
     "English": "English",
@@ -39,7 +59,7 @@ ALLOWED_TOPICS = {
 DISALLOWED_AREAS = {
     "medical", "doctor", "diagnosis", "treatment", "medicine", "prescription",
     "legal", "lawyer", "lawsuit", "court", "contract", "attorney",
-    "financial", "investment", "stock", "crypto", "tax", "loan", "trading",
+    "financial", "investment", "stock", "crypto", "cryptocurrency", "tax", "loan", "trading",
     "médico", "médica", "legal", "financiero", "financiera",
     "médical", "juridique", "financier", "financière",
     "medizin", "rechtlich", "finanziell",
@@ -55,6 +75,19 @@ HARMFUL_KEYWORDS = {
     "武器", "炸弹", "毒",
 }
 
+# Harmful keywords match inside words too ("cyberweapon"), except in topic words we teach.
+HARMFUL_EXCEPTIONS = {"phishing"}
+
+SAFETY_MATCHER = SafetyMatcher(
+    {
+        "harmful": HARMFUL_KEYWORDS,
+        "disallowed": DISALLOWED_AREAS,
+        "allowed": ALLOWED_TOPICS,
+    },
+    modes={"harmful": INFIX, "disallowed": WORD},
+    exceptions=HARMFUL_EXCEPTIONS,
+)
+
 LESSON_REDIRECT = "Please choose a lesson from the left panel so we can stay on safe AI learning topics."
 
 BASE_SYSTEM_PROMPT = """You are an offline AI teacher for seniors.
@@ -91,13 +124,12 @@ def tokens(text: str) -> set[str]:
     return set(re.findall(r"\w+", text.lower(), flags=re.UNICODE))
 
 
-def contains_phrase(text: str, terms: set[str]) -> bool:
-    return any(term in text for term in terms)
+LESSON_CATALOG = LessonCatalog(LESSONS_DIR)
+RESPONSE_CACHE = ResponseCache(CACHE_PATH, normalize=normalize_text, tokenize=tokens)
 
 
 def topic_score(text: str) -> int:
-    words = tokens(text)
-    return sum(1 for term in ALLOWED_TOPICS if term in words or term in text)
+    return len(SAFETY_MATCHER.scan(text)["allowed"])
 
 
 def is_unclear(text: str) -> bool:
@@ -119,17 +151,18 @@ def language_instruction(language: str) -> str:
 
 def local_filter(user_input: str) -> Optional[str]:
     text = normalize_text(user_input)
+    hits = SAFETY_MATCHER.scan(text)
 
-    if contains_phrase(text, HARMFUL_KEYWORDS):
+    if hits["harmful"]:
         return f"I can’t help with harmful or illegal instructions. {LESSON_REDIRECT}"
 
-    if contains_phrase(text, DISALLOWED_AREAS):
+    if hits["disallowed"]:
         return (
             "I can’t provide medical, legal, or financial advice. "
             f"I can help with AI safety learning instead. {LESSON_REDIRECT}"
         )
 
-    if topic_score(text) == 0:
+    if not hits["allowed"]:
         return f"I’m limited to AI basics, safety, privacy, scams, and risks. {LESSON_REDIRECT}"
 
     if is_unclear(text):
@@ -144,23 +177,207 @@ def blocked_or_none(user_input: str) -> Optional[str]:
     return local_filter(user_input)
 
 
-def call_ollama(user_prompt: str, system_prompt: str, language: str = "English") -> str:
-    prompt = f"{system_prompt}\n- {language_instruction(language)}"
-    payload = {
-        "model": MODEL_NAME,
-        "prompt": f"{prompt}\n\nUser: {user_prompt}\nAssistant:",
-        "stream": False,
-        "options": {"temperature": 0.2},
-    }
-    response = requests.post(OLLAMA_URL, json=payload, timeout=120)
+def _post_embedding(payload: dict) -> dict:
+    response = get_session().post(OLLAMA_EMBED_URL, json=payload, timeout=request_timeout(60))
+    response.raise_for_status()
+    return response.json()
+
+
+LESSON_INDEX = LessonIndex(
+    LESSON_CATALOG,
+    INDEX_DIR,
+    ollama_embedder(_post_embedding, EMBED_MODEL) if EMBED_MODEL else hashing_embedder(),
+)
+
+
+def lesson_hits(user_prompt: str) -> list[dict]:
+    if not RETRIEVAL_ENABLED:
+        return []
+    try:
+        return LESSON_INDEX.search(user_prompt, k=RETRIEVAL_TOP_K)
+    except (requests.RequestException, KeyError, OSError):
+        # No embeddings or an unwritable index: answer without lesson notes.
+        return []
+
+
+def lesson_context(user_prompt: str) -> Optional[str]:
+    return format_context(lesson_hits(user_prompt))
+
+
+def grounded_variant(variant: str, hits: list[dict]) -> str:
+    """Cache variant that changes when the retrieved lesson chunks, or their lessons' ETags, change."""
+    if not hits:
+        return variant
+    sources = sorted({f"{hit['lesson']}@{hit['etag']}" for hit in hits})
+    return f"{variant}|lessons:{hashlib.sha256('|'.join(sources).encode('utf-8')).hexdigest()[:16]}"
+
+
+def post_json(url: str, payload: dict, timeout: float = 120) -> dict:
+    response = get_session().post(url, json=payload, timeout=request_timeout(timeout))
     response.raise_for_status()
-    data = response.json()
-    return data.get("response", "I could not generate a response right now.").strip()
+    return response.json()
+
+
+PROMPT_SESSIONS = PromptSessionManager(
+    OLLAMA_CHAT_URL,
+    MODEL_NAME,
+    post_json,
+    keep_alive=KEEP_ALIVE,
+    options={"temperature": 0.2},
+)
+
+
+def system_text(system_prompt: str, language: str = "English") -> str:
+    return f"{system_prompt}\n- {language_instruction(language)}"
+
+
+def build_messages(user_prompt: str, system_prompt: str, language: str = "English", context: Optional[str] = None) -> list[dict]:
+    user_text = f"{context}\n\nQuestion: {user_prompt}" if context else user_prompt
+    return PROMPT_SESSIONS.messages(system_text(system_prompt, language), user_text)
+
+
+def chat_text(data: dict) -> str:
+    return data.get("message", {}).get("content", "") or data.get("response", "")
+
+
+def call_ollama(user_prompt: str, system_prompt: str, language: str = "English", context: Optional[str] = None) -> str:
+    messages = build_messages(user_prompt, system_prompt, language, context)
+    data = post_json(OLLAMA_CHAT_URL, PROMPT_SESSIONS.payload(messages), timeout=120)
+    return chat_text(data).strip() or "I could not generate a response right now."
+
+
+def warm_model(language: str = "English") -> None:
+    PROMPT_SESSIONS.warm_in_background([
+        system_text(BASE_SYSTEM_PROMPT, language),
+        system_text(BASE_ANCHOR_PROMPT, language),
+    ])
+
+
+class CancelToken:
+    """Lets another thread abort a streaming generation.
+
+    stream_chat() hands the request's socket to the token before sending, so
+    cancel() can shut it down at any point: while Ollama is still loading the
+    model and has sent no headers, or while a read waits for the next token.
+    Ollama stops generating for the dropped connection.
+    """
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._response: Optional[requests.Response] = None
+        self._sock: Optional[socket.socket] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        self._event.set()
+        with self._lock:
+            response, sock = self._response, self._sock
+        if sock is not None:
+            self._shutdown(sock)
+        if response is not None:
+            self._abort(response)
+
+    def attach_socket(self, sock: socket.socket) -> None:
+        with self._lock:
+            self._sock = sock
+        if self.cancelled:
+            self._shutdown(sock)
+
+    def detach_socket(self) -> None:
+        with self._lock:
+            self._sock = None
+
+    @staticmethod
+    def _shutdown(sock: socket.socket) -> None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def attach(self, response: requests.Response) -> None:
+        with self._lock:
+            self._response = response
+        if self.cancelled:
+            self._abort(response)
+
+    @staticmethod
+    def _abort(response: requests.Response) -> None:
+        shutdown = getattr(response.raw, "shutdown", None)
+        try:
+            if shutdown is not None:
+                shutdown()
+            response.close()
+        except Exception:
+            pass
+
+
+def stream_chat(messages: list[dict], timeout: int = 120, cancel: Optional[CancelToken] = None) -> Iterator[str]:
+    payload = PROMPT_SESSIONS.payload(messages, stream=True)
+    if cancel is not None and cancel.cancelled:
+        return
+    try:
+        with watch_sockets(cancel.attach_socket if cancel is not None else None):
+            response = get_session().post(OLLAMA_CHAT_URL, json=payload, timeout=request_timeout(timeout), stream=True)
+    except requests.RequestException:
+        if cancel is not None and cancel.cancelled:
+            return
+        raise
+    try:
+        with response:
+            response.raise_for_status()
+            if cancel is not None:
+                cancel.attach(response)
+            for chunk in _read_chunks(response, cancel):
+                token = chat_text(chunk)
+                if token:
+                    yield token
+                if chunk.get("done"):
+                    break
+    finally:
+        if cancel is not None:
+            # The socket goes back to the pool; a late cancel() must not cut another request.
+            cancel.detach_socket()
+
+
+def _read_chunks(response: requests.Response, cancel: Optional[CancelToken]) -> Iterator[dict]:
+    try:
+        for line in response.iter_lines():
+            if cancel is not None and cancel.cancelled:
+                return
+            if not line:
+                continue
+            try:
+                chunk = json.loads(line)
+            except ValueError as exc:
+                raise requests.RequestException(f"Malformed stream chunk from Ollama: {exc}") from exc
+            if chunk.get("error"):
+                raise requests.RequestException(chunk["error"])
+            yield chunk
+    except Exception:
+        # A cancelled read fails with whatever the closed socket raises.
+        if cancel is not None and cancel.cancelled:
+            return
+        raise
+
+
+def stream_ollama(
+    user_prompt: str,
+    system_prompt: str,
+    language: str = "English",
+    cancel: Optional[CancelToken] = None,
+    context: Optional[str] = None,
+) -> Iterator[str]:
+    messages = build_messages(user_prompt, system_prompt, language, context)
+    yield from stream_chat(messages, cancel=cancel)
 
 
 def ollama_health() -> dict:
     try:
-        response = requests.get("http://127.0.0.1:11434/api/tags", timeout=5)
+        response = get_session().get("http://127.0.0.1:11434/api/tags", timeout=request_timeout(5))
         response.raise_for_status()
         tags = response.json().get("models", [])
         has_model = any(model.get("name", "").startswith(MODEL_NAME) for model in tags)
@@ -170,28 +387,204 @@ def ollama_health() -> dict:
 
 
 def list_lessons() -> list[str]:
-    return sorted(path.name for path in LESSONS_DIR.glob("*.md"))
+    return LESSON_CATALOG.names()
 
 
 def read_lesson(name: str) -> str:
-    return (LESSONS_DIR / Path(name).name).read_text(encoding="utf-8")
+    lesson = LESSON_CATALOG.get(name)
+    if lesson is None:
+        raise FileNotFoundError(LESSONS_DIR / Path(name).name)
+    return lesson.text
 
 
-def answer_question(user_input: str, language: str = "English") -> str:
+MODEL_UNAVAILABLE = "Local model unavailable. Please start Ollama and confirm qwen2.5:7b is installed."
+ANCHOR_UNAVAILABLE = "Anchor mode is unavailable because Ollama is not reachable. Start Ollama and try again."
+
+
+def cache_lookup(user_input: str, language: str, variant: str) -> Optional[str]:
+    if not CACHE_ENABLED:
+        return None
+    return RESPONSE_CACHE.get(user_input, normalize_language(language), variant, MODEL_NAME, fuzzy=CACHE_FUZZY)
+
+
+def cache_store(user_input: str, language: str, variant: str, answer: str) -> None:
+    if CACHE_ENABLED and answer:
+        RESPONSE_CACHE.put(user_input, normalize_language(language), variant, MODEL_NAME, answer)
+
+
+def _answer_or_fallback(user_input: str, system_prompt: str, language: str, variant: str, unavailable: str) -> str:
     blocked = blocked_or_none(user_input)
     if blocked:
         return blocked
+    hits = lesson_hits(user_input)
+    variant = grounded_variant(variant, hits)
+    cached = cache_lookup(user_input, language, variant)
+    if cached is not None:
+        return cached
     try:
-        return call_ollama(user_input, BASE_SYSTEM_PROMPT, language)
+        answer = call_ollama(user_input, system_prompt, language, format_context(hits))
     except requests.RequestException:
-        return "Local model unavailable. Please start Ollama and confirm qwen2.5:7b is installed."
-
-
-def make_anchor_script(topic: str, language: str = "English") -> str:
-    blocked = blocked_or_none(topic)
+        return unavailable
+    cache_store(user_input, language, variant, answer)
+    return answer
+
+
+def _stream_or_fallback(
+    user_input: str,
+    system_prompt: str,
+    language: str,
+    variant: str,
+    unavailable: str,
+    cancel: Optional[CancelToken] = None,
+) -> Iterator[str]:
+    blocked = blocked_or_none(user_input)
     if blocked:
-        return blocked
+        yield blocked
+        return
+    hits = lesson_hits(user_input)
+    variant = grounded_variant(variant, hits)
+    cached = cache_lookup(user_input, language, variant)
+    if cached is not None:
+        yield cached
+        return
+    parts = []
     try:
-        return call_ollama(topic, BASE_ANCHOR_PROMPT, language)
+        for token in stream_ollama(user_input, system_prompt, language, cancel, format_context(hits)):
+            parts.append(token)
+            yield token
     except requests.RequestException:
-        return "Anchor mode is unavailable because Ollama is not reachable. Start Ollama and try again."
+        yield f"\n\n{unavailable}" if parts else unavailable
+        return
+    if cancel is not None and cancel.cancelled:
+        return
+    cache_store(user_input, language, variant, "".join(parts).strip())
+
+
+def answer_question(user_input: str, language: str = "English") -> str:
+    return _answer_or_fallback(user_input, BASE_SYSTEM_PROMPT, language, "answer", MODEL_UNAVAILABLE)
+
+
+def answer_question_stream(
+    user_input: str,
+    language: str = "English",
+    cancel: Optional[CancelToken] = None,
+) -> Iterator[str]:
+    yield from _stream_or_fallback(user_input, BASE_SYSTEM_PROMPT, language, "answer", MODEL_UNAVAILABLE, cancel)
+
+
+def make_anchor_script(topic: str, language: str = "English") -> str:
+    return _answer_or_fallback(topic, BASE_ANCHOR_PROMPT, language, "anchor", ANCHOR_UNAVAILABLE)
+
+
+def make_anchor_script_stream(
+    topic: str,
+    language: str = "English",
+    cancel: Optional[CancelToken] = None,
+) -> Iterator[str]:
+    yield from _stream_or_fallback(topic, BASE_ANCHOR_PROMPT, language, "anchor", ANCHOR_UNAVAILABLE, cancel)
+
+
+# --- Web servers ---
+# app.py (Flask) and async_app.py (aiohttp) share the topic filter, prompt and
+# SSE framing below, so the async server does not have to import Flask.
+
+WEB_ALLOWED_TOPICS = {
+    "ai", "artificial intelligence", "model", "prompt", "llm", "chatbot",
+    "safety", "safe", "privacy", "private", "data", "scam", "fraud", "phishing",
+    "deepfake", "risk", "risks", "misinformation", "security", "online fraud",
+}
+
+WEB_DISALLOWED_AREAS = {
+    "medical", "doctor", "diagnosis", "treatment", "medicine",
+    "legal", "lawyer", "lawsuit", "court", "contract",
+    "financial", "investment", "stock", "crypto", "cryptocurrency", "tax", "loan",
+}
+
+WEB_HARMFUL_KEYWORDS = {
+    "hack", "bypass", "weapon", "bomb", "poison", "steal", "malware", "exploit",
+}
+
+WEB_SAFETY_MATCHER = SafetyMatcher(
+    {
+        "harmful": WEB_HARMFUL_KEYWORDS,
+        "disallowed": WEB_DISALLOWED_AREAS,
+        "allowed": WEB_ALLOWED_TOPICS,
+    },
+    modes={"harmful": INFIX, "disallowed": WORD},
+)
+
+WEB_LESSON_REDIRECT = "Please choose a lesson on the left to continue learning safely."
+
+WEB_SYSTEM_PROMPT = """You are a local offline teaching assistant for seniors.
+Rules you must always follow:
+1) Only discuss AI basics, AI safety, privacy, scams, misinformation, and risks.
+2) If user asks outside scope, politely refuse and direct them to lessons.
+3) Refuse any medical, legal, or financial advice.
+4) Refuse harmful, illegal, or unsafe instructions.
+5) If the user request is unclear, ask exactly ONE clarifying question.
+6) Use plain language, short sentences, and supportive tone for seniors.
+7) Never tell the user to go online.
+"""
+
+
+def web_is_unclear(text: str) -> bool:
+    words = text.split()
+    if len(words) < 4:
+        return True
+    vague = {"help", "explain", "tell me", "question", "what about"}
+    return text in vague
+
+
+def web_local_filter(user_input: str) -> Optional[str]:
+    text = normalize_text(user_input)
+    hits = WEB_SAFETY_MATCHER.scan(text)
+
+    if hits["harmful"]:
+        return (
+            "I can’t help with harmful or illegal instructions. "
+            f"{WEB_LESSON_REDIRECT}"
+        )
+
+    if hits["disallowed"]:
+        return (
+            "I can’t provide medical, legal, or financial advice. "
+            "I can explain AI safety topics instead. "
+            f"{WEB_LESSON_REDIRECT}"
+        )
+
+    if not hits["allowed"]:
+        return (
+            "I’m limited to AI basics, safety, privacy, scams, and risks. "
+            f"{WEB_LESSON_REDIRECT}"
+        )
+
+    if web_is_unclear(text):
+        return "Could you clarify what AI safety topic you want: basics, privacy, scams, or risks?"
+
+    return None
+
+
+def web_precheck(user_input: str) -> Optional[str]:
+    if not user_input:
+        return "Please type a question about AI safety, privacy, scams, or risks."
+    return web_local_filter(user_input)
+
+
+def web_flight_key(user_input: str, language: str = "English") -> tuple[str, str, str, str]:
+    return (MODEL_NAME, WEB_SYSTEM_PROMPT, language, normalize_text(user_input))
+
+
+def web_build_messages(user_input: str) -> list[dict]:
+    return PROMPT_SESSIONS.messages(WEB_SYSTEM_PROMPT, user_input)
+
+
+def web_unavailable_message() -> str:
+    return (
+        "The local AI model is unavailable. Please start Ollama and ensure model "
+        f"'{MODEL_NAME}' is installed."
+    )
+
+
+def sse_event(data: dict, event: Optional[str] = None) -> str:
+    head = f"event: {event}\n" if event else ""
+    return f"{head}data: {json.dumps(data, ensure_ascii=False)}\n\n"
@@ -1,19 +1,24 @@
 from __future__ import annotations
 
+import queue
 import subprocess
 import tempfile
 import tkinter as tk
-from tkinter import messagebox
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import messagebox, ttk
 from tkinter.scrolledtext import ScrolledText
+from typing import Callable, Iterator
 
 from core import (
     MODEL_NAME,
     SUPPORTED_LANGUAGES,
-    answer_question,
+    CancelToken,
+    answer_question_stream,
     list_lessons,
-    make_anchor_script,
+    make_anchor_script_stream,
     ollama_health,
     read_lesson,
+    warm_model,
 )
 
 BG = "#000000"
@@ -22,19 +27,65 @@ TEXT = "#FFFFFF"
 ACCENT = "#FFD400"
 
 
+class UiWorker:
+    """Runs blocking work on a small thread pool and hands results back to Tk.
+
+    Worker threads never touch widgets: they queue callbacks, and the Tk main
+    thread drains that queue on a short root.after timer.
+    """
+
+    def __init__(self, root: tk.Tk, max_workers: int = 2, poll_ms: int = 40) -> None:
+        self.root = root
+        self.poll_ms = poll_ms
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="seniors-ui")
+        self.inbox: queue.SimpleQueue = queue.SimpleQueue()
+        self.root.after(self.poll_ms, self._drain)
+
+    def call_soon(self, fn: Callable, *args) -> None:
+        self.inbox.put((fn, args))
+
+    def submit(self, fn: Callable, on_done: Callable, on_error: Callable[[Exception], None] | None = None) -> None:
+        def run() -> None:
+            try:
+                result = fn()
+            except Exception as exc:
+                if on_error is not None:
+                    self.call_soon(on_error, exc)
+                return
+            self.call_soon(on_done, result)
+
+        self.pool.submit(run)
+
+    def _drain(self) -> None:
+        while True:
+            try:
+                fn, args = self.inbox.get_nowait()
+            except queue.Empty:
+                break
+            fn(*args)
+        self.root.after(self.poll_ms, self._drain)
+
+    def shutdown(self) -> None:
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
 class SeniorsApp:
     def __init__(self, root: tk.Tk) -> None:
         self.root = root
         self.root.title("AI for Seniors - Offline Desktop")
         self.root.geometry("1500x860")
         self.root.configure(bg=BG)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
         self.lesson_content = ""
         self.language_var = tk.StringVar(value="English")
+        self.worker = UiWorker(root)
+        self.jobs: dict[str, CancelToken] = {}
 
         self.build_layout()
         self.load_health()
         self.load_lessons()
+        warm_model(self.current_language())
 
     def build_layout(self) -> None:
         self.root.grid_columnconfigure(0, weight=1)
@@ -81,7 +132,13 @@ class SeniorsApp:
         self.question_text = ScrolledText(right, font=("Arial", 16), height=5, bg="#FFF", fg="#000", wrap="word")
         self.question_text.pack(fill="x", padx=10)
 
-        tk.Button(right, text="Ask", font=("Arial", 14, "bold"), bg=ACCENT, fg="#000", command=self.ask_question).pack(fill="x", padx=10, pady=6)
+        ask_row = tk.Frame(right, bg=PANEL)
+        ask_row.pack(fill="x", padx=10, pady=6)
+        tk.Button(ask_row, text="Ask", font=("Arial", 14, "bold"), bg=ACCENT, fg="#000", command=self.ask_question).pack(side="left", fill="x", expand=True)
+        self.cancel_button = tk.Button(ask_row, text="Cancel", font=("Arial", 14, "bold"), bg="#444", fg=TEXT, state="disabled", command=self.cancel_jobs)
+        self.cancel_button.pack(side="left", padx=(6, 0))
+        self.progress = ttk.Progressbar(right, mode="indeterminate")
+        self.progress.pack(fill="x", padx=10)
 
         btn_row = tk.Frame(right, bg=PANEL)
         btn_row.pack(fill="x", padx=10)
@@ -104,7 +161,9 @@ class SeniorsApp:
         return self.language_var.get()
 
     def load_health(self) -> None:
-        state = ollama_health()
+        self.worker.submit(ollama_health, self.show_health)
+
+    def show_health(self, state: dict) -> None:
         if state["ollama"] == "ok" and state["model_ready"]:
             self.health_var.set(f"Ollama ready: {MODEL_NAME}")
         elif state["ollama"] == "ok":
@@ -131,17 +190,68 @@ class SeniorsApp:
         self.question_text.delete("1.0", tk.END)
         self.question_text.insert("1.0", f"{current}\n{text}".strip())
 
+    def set_busy(self) -> None:
+        if self.jobs:
+            self.progress.start(12)
+            self.cancel_button.configure(state="normal", bg=ACCENT, fg="#000")
+        else:
+            self.progress.stop()
+            self.cancel_button.configure(state="disabled", bg="#444", fg=TEXT)
+
+    def stream_into(self, name: str, widget: ScrolledText, start: Callable[[CancelToken], Iterator[str]]) -> None:
+        previous = self.jobs.pop(name, None)
+        if previous is not None:
+            previous.cancel()
+        cancel = CancelToken()
+        self.jobs[name] = cancel
+        widget.delete("1.0", tk.END)
+        widget.insert("1.0", "Thinking...")
+        first = [True]
+
+        def append(token: str) -> None:
+            if cancel.cancelled:
+                return
+            if first[0]:
+                widget.delete("1.0", tk.END)
+                first[0] = False
+            widget.insert(tk.END, token)
+            widget.see(tk.END)
+
+        def run() -> None:
+            for token in start(cancel):
+                self.worker.call_soon(append, token)
+
+        def finish(_result: None) -> None:
+            if self.jobs.get(name) is cancel:
+                del self.jobs[name]
+            self.set_busy()
+
+        def failed(exc: Exception) -> None:
+            append(f"\n\nSomething went wrong: {exc}")
+            finish(None)
+
+        self.worker.submit(run, finish, failed)
+        self.set_busy()
+
+    def cancel_jobs(self) -> None:
+        for cancel in self.jobs.values():
+            cancel.cancel()
+        self.jobs.clear()
+        self.set_busy()
+        for widget in (self.answer_text, self.anchor_text):
+            if widget.get("1.0", tk.END).strip() == "Thinking...":
+                widget.delete("1.0", tk.END)
+                widget.insert("1.0", "Cancelled.")
+
     def ask_question(self) -> None:
         q = self.question_text.get("1.0", tk.END).strip()
-        ans = answer_question(q, self.current_language())
-        self.answer_text.delete("1.0", tk.END)
-        self.answer_text.insert("1.0", ans)
+        language = self.current_language()
+        self.stream_into("answer", self.answer_text, lambda cancel: answer_question_stream(q, language, cancel))
 
     def run_anchor(self) -> None:
         topic = self.question_text.get("1.0", tk.END).strip()
-        script = make_anchor_script(topic, self.current_language())
-        self.anchor_text.delete("1.0", tk.END)
-        self.anchor_text.insert("1.0", script)
+        language = self.current_language()
+        self.stream_into("anchor", self.anchor_text, lambda cancel: make_anchor_script_stream(topic, language, cancel))
 
     def play_voice(self) -> None:
         text = self.anchor_text.get("1.0", tk.END).strip()
@@ -159,6 +269,11 @@ class SeniorsApp:
         except OSError:
             messagebox.showwarning("Voice playback", "Could not start local voice playback.")
 
+    def on_close(self) -> None:
+        self.cancel_jobs()
+        self.worker.shutdown()
+        self.root.destroy()
+
     def print_lesson(self) -> None:
         text = self.lesson_text.get("1.0", tk.END).strip()
         if not text:
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import contextvars
+import socket
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool
+from urllib3.util.retry import Retry
+
+# One keep-alive session is shared by every Ollama caller in the process.
+# pool_block=True makes callers wait for a free connection instead of opening
+# extra sockets, which caps how many requests hit the local Ollama at once.
+POOL_SIZE = 8
+RETRIES = 2
+BACKOFF = 0.5
+CONNECT_TIMEOUT = 5
+RETRY_STATUSES = (502, 503, 504)
+
+_session: Optional[requests.Session] = None
+_lock = threading.Lock()
+_socket_watcher: contextvars.ContextVar[Optional[Callable[[socket.socket], None]]] = contextvars.ContextVar(
+    "socket_watcher", default=None
+)
+
+
+@contextmanager
+def watch_sockets(callback: Optional[Callable[[socket.socket], None]]) -> Iterator[None]:
+    """Call ``callback(sock)`` with the socket of each request this thread sends meanwhile.
+
+    The socket is handed over before the request is written, so a caller can
+    shut it down while the server has not even sent response headers yet.
+    """
+    token = _socket_watcher.set(callback)
+    try:
+        yield
+    finally:
+        _socket_watcher.reset(token)
+
+
+class _WatchedConnection(HTTPConnection):
+    def connect(self) -> None:
+        super().connect()
+        self._report()
+
+    def request(self, *args, **kwargs):
+        # A reused keep-alive connection is already connected.
+        if self.sock is not None:
+            self._report()
+        return super().request(*args, **kwargs)
+
+    def _report(self) -> None:
+        callback = _socket_watcher.get()
+        if callback is not None and self.sock is not None:
+            callback(self.sock)
+
+
+class _WatchedPool(HTTPConnectionPool):
+    ConnectionCls = _WatchedConnection
+
+
+class _WatchedAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {**self.poolmanager.pool_classes_by_scheme, "http": _WatchedPool}
+
+
+def build_session(pool_size: int = POOL_SIZE, retries: int = RETRIES, backoff: float = BACKOFF) -> requests.Session:
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=0,
+        status=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=None,
+        raise_on_status=False,
+    )
+    adapter = _WatchedAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry, pool_block=True)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"Content-Type": "application/json", "Connection": "keep-alive"})
+    return session
+
+
+def get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = build_session()
+    return _session
+
+
+def configure(pool_size: int = POOL_SIZE, retries: int = RETRIES, backoff: float = BACKOFF) -> requests.Session:
+    global _session
+    with _lock:
+        old, _session = _session, build_session(pool_size, retries, backoff)
+    if old is not None:
+        old.close()
+    return _session
+
+
+def request_timeout(read_seconds: float) -> tuple[float, float]:
+    return (CONNECT_TIMEOUT, read_seconds)
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+try:
+    import brotli
+except ImportError:  # optional: pre-compressed br bodies only when installed
+    brotli = None
+
+SCRIPT_LANGUAGES = [
+    (re.compile(r"[\u0600-\u06ff]"), "Arabic"),
+    (re.compile(r"[\u0900-\u097f]"), "Hindi"),
+    (re.compile(r"[\u4e00-\u9fff]"), "Chinese"),
+]
+
+STOPWORDS = {
+    "English": {"the", "and", "is", "are", "you", "to", "of"},
+    "Spanish": {"el", "la", "los", "que", "y", "es", "para"},
+    "French": {"le", "les", "et", "est", "des", "vous", "pour"},
+    "German": {"der", "die", "und", "ist", "nicht", "sie", "mit"},
+    "Portuguese": {"o", "os", "que", "não", "é", "para", "uma"},
+}
+
+
+def detect_language(text: str) -> str:
+    for pattern, language in SCRIPT_LANGUAGES:
+        if len(pattern.findall(text)) > 20:
+            return language
+    words = re.findall(r"\w+", text.lower())
+    scores = {language: sum(1 for w in words if w in stop) for language, stop in STOPWORDS.items()}
+    return max(scores, key=scores.get) if any(scores.values()) else "English"
+
+
+@dataclass(frozen=True)
+class Lesson:
+    name: str
+    title: str
+    sections: tuple[str, ...]
+    word_count: int
+    language: str
+    etag: str
+    mtime: float
+    body: bytes = field(repr=False)
+    gzip_body: bytes = field(repr=False)
+    brotli_body: Optional[bytes] = field(default=None, repr=False)
+
+    @property
+    def text(self) -> str:
+        return self.body.decode("utf-8")
+
+    def meta(self) -> dict:
+        return {
+            "name": self.name,
+            "title": self.title,
+            "sections": list(self.sections),
+            "word_count": self.word_count,
+            "language": self.language,
+            "etag": self.etag,
+        }
+
+    def encoded(self, accept_encoding: str) -> tuple[bytes, Optional[str], str]:
+        """Return (body, content-encoding, etag) for the best encoding the client accepts."""
+        accepted = {part.split(";")[0].strip() for part in (accept_encoding or "").lower().split(",")}
+        if self.brotli_body is not None and "br" in accepted:
+            return self.brotli_body, "br", f"{self.etag}-br"
+        if "gzip" in accepted:
+            return self.gzip_body, "gzip", f"{self.etag}-gz"
+        return self.body, None, self.etag
+
+
+def parse_lesson(path: Path, body: bytes, mtime: float) -> Lesson:
+    text = body.decode("utf-8")
+    title = path.stem
+    sections = []
+    for line in text.splitlines():
+        if line.startswith("# ") and title == path.stem:
+            title = line[2:].strip()
+        elif line.startswith("## "):
+            sections.append(line[3:].strip())
+    return Lesson(
+        name=path.name,
+        title=title,
+        sections=tuple(sections),
+        word_count=len(re.findall(r"\w+", text)),
+        language=detect_language(text),
+        etag=hashlib.sha256(body).hexdigest()[:32],
+        mtime=mtime,
+        body=body,
+        gzip_body=gzip.compress(body, mtime=0),
+        brotli_body=brotli.compress(body) if brotli is not None else None,
+    )
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """One consistent view of the catalog: the lessons and the validators that describe them."""
+
+    lessons: tuple[Lesson, ...] = ()
+    by_name: Mapping[str, Lesson] = field(default_factory=lambda: MappingProxyType({}))
+    listing_etag: str = ""
+    last_modified: float = 0.0
+
+
+class LessonCatalog:
+    """In-memory index of ``lessons/*.md``.
+
+    Lessons are parsed once and kept with their metadata and pre-compressed
+    bodies. The directory is re-stat'ed at most every ``check_interval``
+    seconds; only files whose mtime or size changed are read again. Each
+    refresh publishes a new :class:`CatalogSnapshot` in one assignment, so
+    readers that take :meth:`snapshot` never pair one listing with another's ETag.
+    """
+
+    def __init__(self, directory: Path, check_interval: float = 2.0) -> None:
+        self.directory = Path(directory)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._snapshot = CatalogSnapshot()
+        self._stats: dict[str, tuple[int, int]] = {}
+        self._checked = 0.0
+
+    def refresh(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._checked < self.check_interval:
+            return
+        with self._lock:
+            self._checked = now
+            seen: dict[str, tuple[int, int]] = {}
+            try:
+                entries = [e for e in os.scandir(self.directory) if e.name.endswith(".md") and e.is_file()]
+            except FileNotFoundError:
+                entries = []
+            lessons = dict(self._snapshot.by_name)
+            for entry in entries:
+                stat = entry.stat()
+                seen[entry.name] = (stat.st_mtime_ns, stat.st_size)
+                if self._stats.get(entry.name) == seen[entry.name]:
+                    continue
+                path = Path(entry.path)
+                lessons[entry.name] = parse_lesson(path, path.read_bytes(), stat.st_mtime)
+            for gone in set(lessons) - set(seen):
+                del lessons[gone]
+            if seen == self._stats:
+                return
+            self._stats = seen
+            ordered = tuple(lessons[name] for name in sorted(lessons))
+            digest = hashlib.sha256()
+            for lesson in ordered:
+                digest.update(f"{lesson.name}:{lesson.etag};".encode("utf-8"))
+            self._snapshot = CatalogSnapshot(
+                lessons=ordered,
+                by_name=MappingProxyType(lessons),
+                listing_etag=digest.hexdigest()[:32],
+                last_modified=max((lesson.mtime for lesson in ordered), default=0.0),
+            )
+
+    def snapshot(self) -> CatalogSnapshot:
+        self.refresh()
+        return self._snapshot
+
+    @property
+    def listing_etag(self) -> str:
+        return self._snapshot.listing_etag
+
+    @property
+    def last_modified(self) -> float:
+        return self._snapshot.last_modified
+
+    def names(self) -> list[str]:
+        return [lesson.name for lesson in self.snapshot().lessons]
+
+    def lessons(self) -> list[Lesson]:
+        return list(self.snapshot().lessons)
+
+    def get(self, name: str) -> Optional[Lesson]:
+        return self.snapshot().by_name.get(Path(name).name)
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+KEEP_ALIVE = "30m"
+KEEP_ALIVE_SECONDS = 30 * 60
+
+PostJson = Callable[[str, dict, float], dict]
+
+
+class PromptSessionManager:
+    """Keeps the chat model loaded and the fixed system prompts hot.
+
+    Requests go to /api/chat with the system prompt as its own, byte-stable
+    first message. Ollama reuses the evaluated KV cache for an identical
+    prefix, so the system prompt is only prefilled once per model load
+    instead of on every question. Per-request text (the question and any
+    lesson notes) always goes in the user message, after that prefix.
+
+    Every request carries ``keep_alive`` so the model stays in memory between
+    classes. ``warm()`` loads the model and primes the given system prompts
+    ahead of the first learner question.
+    """
+
+    def __init__(
+        self,
+        chat_url: str,
+        model: str,
+        post_json: PostJson,
+        keep_alive: str = KEEP_ALIVE,
+        keep_alive_seconds: float = KEEP_ALIVE_SECONDS,
+        options: Optional[dict] = None,
+    ) -> None:
+        self.chat_url = chat_url
+        self.model = model
+        self.post_json = post_json
+        self.keep_alive = keep_alive
+        self.keep_alive_seconds = keep_alive_seconds
+        self.options = dict(options or {})
+        self._lock = threading.Lock()
+        self._systems: dict[str, dict] = {}
+        self._primed: dict[str, float] = {}
+        self.last_used = 0.0
+
+    def system_message(self, system_text: str) -> dict:
+        with self._lock:
+            message = self._systems.get(system_text)
+            if message is None:
+                message = {"role": "system", "content": system_text}
+                self._systems[system_text] = message
+            return message
+
+    def messages(self, system_text: str, user_text: str) -> list[dict]:
+        return [self.system_message(system_text), {"role": "user", "content": user_text}]
+
+    def payload(self, messages: list[dict], stream: bool = False, **options) -> dict:
+        self.last_used = time.monotonic()
+        return {
+            "model": self.model,
+            "messages": messages,
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+            "options": {**self.options, **options},
+        }
+
+    def is_primed(self, system_text: str) -> bool:
+        primed = self._primed.get(system_text)
+        return primed is not None and time.monotonic() - max(primed, self.last_used) < self.keep_alive_seconds
+
+    def warm(self, system_texts: Iterable[str] = (), timeout: float = 300) -> None:
+        # An empty message list only loads the model.
+        self.post_json(self.chat_url, {"model": self.model, "messages": [], "keep_alive": self.keep_alive}, timeout)
+        for text in system_texts:
+            if self.is_primed(text):
+                continue
+            self.post_json(self.chat_url, self.payload(self.messages(text, "Hello"), num_predict=1), timeout)
+            self._primed[text] = time.monotonic()
+
+    def warm_in_background(self, system_texts: Iterable[str] = ()) -> threading.Thread:
+        texts = list(system_texts)
+
+        def run() -> None:
+            try:
+                self.warm(texts)
+            except Exception:
+                pass  # warming is best effort; the first real request loads the model instead
+
+        thread = threading.Thread(target=run, name="ollama-warmup", daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    bucket TEXT NOT NULL,
+    question TEXT NOT NULL,
+    tokens TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_bucket ON responses(bucket);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses(last_used);
+"""
+
+# Words that flip or qualify a question's meaning while barely moving its token
+# overlap ("is it safe ..." vs "is it not safe ..."). \w+ tokenizing splits
+# "don't" into "don" and "t", hence the bare stems.
+GUARD_WORDS = frozenset({
+    "not", "no", "never", "nor", "none", "nothing", "without", "cannot", "t",
+    "don", "doesn", "didn", "isn", "aren", "wasn", "weren", "shouldn", "won", "wouldn", "couldn", "mustn",
+    "always", "only", "unless", "except", "before", "after", "stop",
+    "nunca", "nada", "sin", "jamais", "pas", "ne", "sans", "nicht", "kein", "keine", "nie", "ohne", "não", "nem", "sem",
+})
+
+
+def jaccard(a: set[str], b: set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class ResponseCache:
+    """SQLite-backed answer cache with LRU/TTL eviction.
+
+    Entries are keyed by (normalized question, language, prompt variant, model).
+    With ``fuzzy`` lookups (off by default) a near-duplicate question in the same
+    (language, variant, model) bucket can also be served when its token overlap
+    reaches ``similarity`` and the two questions agree on every word in
+    ``guard_words``. Only the ``max_fuzzy_candidates`` most recently used
+    entries of the bucket are compared.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        normalize: Callable[[str], str],
+        tokenize: Callable[[str], set[str]],
+        max_entries: int = 2000,
+        ttl_seconds: float = 30 * 24 * 3600,
+        similarity: float = 0.85,
+        min_fuzzy_tokens: int = 4,
+        max_fuzzy_candidates: int = 256,
+        guard_words: frozenset[str] = GUARD_WORDS,
+    ) -> None:
+        self.path = Path(path)
+        self.normalize = normalize
+        self.tokenize = tokenize
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity = similarity
+        self.min_fuzzy_tokens = min_fuzzy_tokens
+        self.max_fuzzy_candidates = max_fuzzy_candidates
+        self.guard_words = guard_words
+        self.hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.path), check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+            self._db = db
+        return self._db
+
+    @staticmethod
+    def bucket(language: str, variant: str, model: str) -> str:
+        return f"{model}|{variant}|{language}"
+
+    def key(self, question: str, language: str, variant: str, model: str) -> str:
+        raw = f"{self.bucket(language, variant, model)}|{self.normalize(question)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, question: str, language: str, variant: str, model: str, fuzzy: bool = False) -> Optional[str]:
+        now = time.time()
+        oldest = now - self.ttl_seconds
+        key = self.key(question, language, variant, model)
+        with self._lock:
+            db = self._conn()
+            row = db.execute("SELECT answer FROM responses WHERE key = ? AND created >= ?", (key, oldest)).fetchone()
+            if row is None and fuzzy:
+                key, row = self._nearest(db, question, self.bucket(language, variant, model), oldest)
+            if row is None:
+                self.misses += 1
+                return None
+            db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            db.commit()
+            self.hits += 1
+            return row[0]
+
+    def _nearest(self, db: sqlite3.Connection, question: str, bucket: str, oldest: float):
+        wanted = self.tokenize(self.normalize(question))
+        if len(wanted) < self.min_fuzzy_tokens:
+            return None, None
+        # Jaccard >= s needs s*|A| <= |B| <= |A|/s, so most rows are skipped before building a set.
+        shortest = self.similarity * len(wanted)
+        longest = len(wanted) / self.similarity if self.similarity else float("inf")
+        best_key, best_answer, best_score = None, None, self.similarity
+        rows = db.execute(
+            "SELECT key, tokens, answer FROM responses WHERE bucket = ? AND created >= ? "
+            "ORDER BY last_used DESC LIMIT ?",
+            (bucket, oldest, self.max_fuzzy_candidates),
+        )
+        for key, token_text, answer in rows:
+            count = token_text.count(" ") + 1
+            if count < shortest or count > longest:
+                continue
+            candidate = set(token_text.split(" "))
+            if (wanted ^ candidate) & self.guard_words:
+                continue
+            score = jaccard(wanted, candidate)
+            if score >= best_score:
+                best_key, best_answer, best_score = key, answer, score
+        if best_key is None:
+            return None, None
+        self.fuzzy_hits += 1
+        return best_key, (best_answer,)
+
+    def put(self, question: str, language: str, variant: str, model: str, answer: str) -> None:
+        now = time.time()
+        normalized = self.normalize(question)
+        with self._lock:
+            db = self._conn()
+            db.execute(
+                "INSERT OR REPLACE INTO responses (key, bucket, question, tokens, answer, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    self.key(question, language, variant, model),
+                    self.bucket(language, variant, model),
+                    normalized,
+                    " ".join(sorted(self.tokenize(normalized))),
+                    answer,
+                    now,
+                    now,
+                ),
+            )
+            self._evict(db, now)
+            db.commit()
+
+    def _evict(self, db: sqlite3.Connection, now: float) -> None:
+        db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+        db.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def clear(self) -> None:
+        with self._lock:
+            db = self._conn()
+            db.execute("DELETE FROM responses")
+            db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = self._conn().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {"entries": size, "hits": self.hits, "fuzzy_hits": self.fuzzy_hits, "misses": self.misses}
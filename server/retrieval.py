@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import threading
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+
+from lesson_catalog import Lesson, LessonCatalog
+
+HASH_DIM = 1024
+CHUNK_WORDS = 120
+STOPWORDS = {
+    "a", "an", "and", "are", "about", "be", "can", "do", "does", "for", "from", "how", "i", "if", "in",
+    "is", "it", "me", "my", "of", "on", "or", "tell", "that", "the", "this", "to", "what", "when",
+    "which", "who", "why", "with", "you", "your",
+}
+
+Embedder = Callable[[list[str]], np.ndarray]
+
+
+def hashing_embedder(dim: int = HASH_DIM) -> Embedder:
+    """Local feature-hashing vectorizer over word unigrams and bigrams.
+
+    Needs no model, so retrieval keeps working when only the chat model is
+    installed. Stopwords are dropped and a trailing plural "s" is stripped.
+    Vectors are L2-normalized so a dot product is cosine similarity.
+    """
+
+    def embed(texts: list[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = [
+                w[:-1] if len(w) > 3 and w.endswith("s") else w
+                for w in re.findall(r"\w+", text.lower())
+                if w not in STOPWORDS
+            ]
+            features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+            for feature in features:
+                digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+                value = int.from_bytes(digest, "little")
+                matrix[row, value % dim] += 1.0 if (value >> 63) == 0 else -1.0
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    embed.backend = f"hashing-{dim}"
+    return embed
+
+
+def ollama_embedder(post_json: Callable[[dict], dict], model: str) -> Embedder:
+    """Embeddings from Ollama's /api/embeddings, one request per text."""
+
+    def embed(texts: list[str]) -> np.ndarray:
+        rows = [post_json({"model": model, "prompt": text})["embedding"] for text in texts]
+        matrix = np.asarray(rows, dtype=np.float32).reshape(len(texts), -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    embed.backend = f"ollama-{model}"
+    return embed
+
+
+def chunk_lesson(lesson: Lesson, max_words: int = CHUNK_WORDS) -> list[str]:
+    chunks = []
+    heading = ""
+    lines: list[str] = []
+
+    def flush() -> None:
+        words = " ".join(lines).split()
+        for start in range(0, len(words), max_words):
+            piece = " ".join(words[start : start + max_words])
+            chunks.append(f"{lesson.title} — {heading}: {piece}" if heading else f"{lesson.title}: {piece}")
+
+    for line in lesson.text.splitlines():
+        if line.startswith("# "):
+            continue
+        if line.startswith("## "):
+            flush()
+            heading, lines = line[3:].strip(), []
+        elif line.strip():
+            lines.append(line.strip().lstrip("-* ").strip())
+    flush()
+    return chunks
+
+
+class LessonIndex:
+    """Embedding index over lesson chunks, persisted under ``directory``.
+
+    The matrix is stored as ``lesson_index.npy`` with a JSON manifest of the
+    chunks and the lesson ETag they came from. On refresh only lessons whose
+    ETag changed are chunked and embedded again; other rows are reused. The
+    chunks and their matrix are published together as one tuple, so a query
+    never scores one build's rows against another build's chunk list.
+    """
+
+    def __init__(self, catalog: LessonCatalog, directory: Path, embedder: Embedder) -> None:
+        self.catalog = catalog
+        self.directory = Path(directory)
+        self.embedder = embedder
+        self.backend = getattr(embedder, "backend", "custom")
+        self._lock = threading.Lock()
+        self._listing = None
+        self._index: tuple[tuple[dict, ...], np.ndarray] = ((), np.zeros((0, 0), dtype=np.float32))
+        self._load()
+
+    @property
+    def chunks(self) -> tuple[dict, ...]:
+        return self._index[0]
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self._index[1]
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.directory / "lesson_index.json"
+
+    @property
+    def matrix_path(self) -> Path:
+        return self.directory / "lesson_index.npy"
+
+    def _load(self) -> None:
+        try:
+            manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+            matrix = np.load(self.matrix_path)
+        except (OSError, ValueError):
+            return
+        if manifest.get("backend") != self.backend or len(manifest.get("chunks", [])) != len(matrix):
+            return
+        matrix.setflags(write=False)
+        self._index = (tuple(manifest["chunks"]), matrix)
+
+    def _save(self, chunks: tuple[dict, ...], matrix: np.ndarray) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        manifest = {"backend": self.backend, "chunks": list(chunks)}
+        self.manifest_path.write_text(json.dumps(manifest, ensure_ascii=False), encoding="utf-8")
+        np.save(self.matrix_path, matrix)
+
+    def refresh(self) -> None:
+        catalog = self.catalog.snapshot()
+        if catalog.listing_etag == self._listing:
+            return
+        with self._lock:
+            if catalog.listing_etag == self._listing:
+                return
+            old_chunks, old_matrix = self._index
+            current = catalog.by_name
+            keep = [
+                i for i, chunk in enumerate(old_chunks)
+                if chunk["lesson"] in current and current[chunk["lesson"]].etag == chunk["etag"]
+            ]
+            fresh_lessons = {old_chunks[i]["lesson"] for i in keep}
+            chunks = [old_chunks[i] for i in keep]
+            parts = [old_matrix[keep]] if keep else []
+
+            new_chunks = []
+            for lesson in catalog.lessons:
+                if lesson.name in fresh_lessons:
+                    continue
+                new_chunks.extend({"lesson": lesson.name, "etag": lesson.etag, "text": text} for text in chunk_lesson(lesson))
+            if new_chunks:
+                parts.append(self.embedder([chunk["text"] for chunk in new_chunks]))
+                chunks.extend(new_chunks)
+
+            changed = bool(new_chunks) or len(keep) != len(old_chunks)
+            matrix = np.vstack(parts) if parts else np.zeros((0, 0), dtype=np.float32)
+            matrix.setflags(write=False)
+            self._index = (tuple(chunks), matrix)
+            if changed:
+                self._save(*self._index)
+            self._listing = catalog.listing_etag
+
+    def search(self, query: str, k: int = 3, min_score: float = 0.1) -> list[dict]:
+        self.refresh()
+        chunks, matrix = self._index
+        if not chunks or not query.strip():
+            return []
+        scores = matrix @ self.embedder([query])[0]
+        top = np.argsort(-scores)[:k]
+        return [{**chunks[i], "score": float(scores[i])} for i in top if scores[i] >= min_score]
+
+
+def format_context(hits: list[dict]) -> Optional[str]:
+    if not hits:
+        return None
+    lines = "\n".join(f"- {hit['text']}" for hit in hits)
+    return f"Lesson notes (use these facts when they help; keep the answer short):\n{lines}"
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import re
+from typing import Iterable
+
+# Characters that continue a word. Python's \w misses Devanagari/Arabic
+# combining marks, so their whole blocks are included explicitly.
+WORD_CHARS = r"\w\u0600-\u06ff\u0900-\u097f"
+WORD_RE = re.compile(rf"[{WORD_CHARS}]+")
+NO_SPACE_SCRIPTS = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff]")
+ASCII_WORD = re.compile(r"[a-z]+")
+LATIN_WORD = re.compile(r"[a-z\u00df-\u00f6\u00f8-\u00ff]+")
+SHORT_TERM = 3
+# Endings a "word" term may take: "lawyers", "medically", but not "contractor" or "courteous".
+INFLECTIONS = ("", "s", "es", "ed", "ing", "er", "ers", "ly")
+
+WORD_CACHE_SIZE = 50_000
+
+INFIX = "infix"
+PREFIX = "prefix"
+WORD = "word"
+
+
+class SafetyMatcher:
+    """All filter term lists compiled once and matched in a single pass.
+
+    Each category has a matching mode:
+    - ``infix``: a term matches anywhere, even inside a longer word
+      ("cyberweapon", "antimalware"), except inside the listed ``exceptions``.
+    - ``prefix`` (default): a term must start a word and may be followed by
+      any inflection ("hack" -> "hacking", "बम" -> "बमों").
+    - ``word``: Latin-script terms must be the whole word plus one of
+      ``INFLECTIONS`` ("court" matches "courts", not "courteous"); other
+      scripts fall back to ``prefix``.
+
+    In every mode except ``infix``, short ASCII terms must be the whole word
+    allowing only a plural suffix ("ai" does not match "again"), multi-word
+    phrases must start and end on word boundaries, and Chinese/Japanese terms,
+    having no word spaces, match anywhere. Every matching term of every
+    category is reported.
+    """
+
+    def __init__(
+        self,
+        categories: dict[str, Iterable[str]],
+        modes: dict[str, str] | None = None,
+        exceptions: Iterable[str] = (),
+    ) -> None:
+        modes = modes or {}
+        self.categories = list(categories)
+        self.infix_terms: dict[str, list[str]] = {}
+        self.prefix_terms: dict[str, list[str]] = {}
+        self.word_terms: dict[str, list[str]] = {}
+        self.whole_words: dict[str, list[tuple[str, str]]] = {}
+        self.anywhere_terms: dict[str, list[str]] = {}
+        self.phrases: dict[str, list[str]] = {}
+
+        for category, terms in categories.items():
+            mode = modes.get(category, PREFIX)
+            for term in {t.lower() for t in terms}:
+                if mode == INFIX:
+                    table = self.infix_terms
+                elif NO_SPACE_SCRIPTS.search(term):
+                    table = self.anywhere_terms
+                elif not WORD_RE.fullmatch(term):
+                    table = self.phrases
+                elif len(term) <= SHORT_TERM and ASCII_WORD.fullmatch(term):
+                    for form in (term, f"{term}s", f"{term}es"):
+                        self.whole_words.setdefault(form, []).append((category, term))
+                    continue
+                elif mode == WORD and LATIN_WORD.fullmatch(term):
+                    table = self.word_terms
+                else:
+                    table = self.prefix_terms
+                table.setdefault(term, []).append(category)
+
+        self.prefix_lengths = sorted({len(term) for term in self.prefix_terms})
+        # Matches the longest infix term at a position; ``infix_within`` adds the terms inside it.
+        self.infix_re = re.compile(_trie_pattern(self.infix_terms)) if self.infix_terms else None
+        self.infix_within = {
+            term: [inner for inner in self.infix_terms if inner in term] for term in self.infix_terms
+        }
+        self.phrase_re = self._boundary_re(self.phrases)
+        self.exception_re = self._boundary_re({word.lower() for word in exceptions})
+        # Questions reuse a small vocabulary, so per-word results are memoized.
+        self._word_cache: dict[str, tuple[tuple[str, str], ...]] = {}
+
+    @staticmethod
+    def _boundary_re(terms) -> re.Pattern | None:
+        if not terms:
+            return None
+        alternation = "|".join(re.escape(t) for t in sorted(terms, key=len, reverse=True))
+        return re.compile(rf"(?<![{WORD_CHARS}])(?:{alternation})(?![{WORD_CHARS}])")
+
+    def _match_word(self, word: str) -> tuple[tuple[str, str], ...]:
+        cached = self._word_cache.get(word)
+        if cached is not None:
+            return cached
+        found = list(self.whole_words.get(word, ()))
+        size = len(word)
+        for length in self.prefix_lengths:
+            if length > size:
+                break
+            head = word[:length]
+            categories = self.prefix_terms.get(head)
+            if categories:
+                found.extend((category, head) for category in categories)
+        if self.word_terms:
+            for suffix in INFLECTIONS:
+                if not word.endswith(suffix):
+                    continue
+                stem = word[: size - len(suffix)]
+                # "scammed" -> "scamm" -> "scam"
+                for candidate in (stem, stem[:-1]) if suffix and stem[-2:-1] == stem[-1:] else (stem,):
+                    categories = self.word_terms.get(candidate)
+                    if categories:
+                        found.extend((category, candidate) for category in categories)
+        if len(self._word_cache) >= WORD_CACHE_SIZE:
+            self._word_cache.clear()
+        result = self._word_cache[word] = tuple(found)
+        return result
+
+    def scan(self, text: str) -> dict[str, set[str]]:
+        hits: dict[str, set[str]] = {category: set() for category in self.categories}
+
+        def add(term: str, categories: Iterable[str]) -> None:
+            for category in categories:
+                hits[category].add(term)
+
+        for word in set(WORD_RE.findall(text)):
+            for category, term in self._match_word(word):
+                hits[category].add(term)
+        for term, categories in self.anywhere_terms.items():
+            if term in text:
+                add(term, categories)
+        if self.phrase_re is not None:
+            for phrase in set(self.phrase_re.findall(text)):
+                add(phrase, self.phrases[phrase])
+        if self.infix_re is not None:
+            masked = self.exception_re.sub(" ", text) if self.exception_re is not None else text
+            pos = 0
+            # Resume one character after each hit so overlapping terms ("malwarez") are all seen.
+            while (match := self.infix_re.search(masked, pos)) is not None:
+                for term in self.infix_within[match.group()]:
+                    add(term, self.infix_terms[term])
+                pos = match.start() + 1
+        return hits
+
+
+def _trie_pattern(terms: Iterable[str]) -> str:
+    """Regex alternation of ``terms`` factored into a trie, preferring the longest match.
+
+    ``re`` tries alternatives one by one, so a flat ``a|b|c`` costs every term
+    at every position; the trie only follows branches that match the text.
+    """
+    trie: dict = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)